@@ -1,10 +1,362 @@
 import streamlit as st
-import tempfile
-import os
 from danfe_extractor import DANFEExtractor
+from danfe_record import MISSING, DANFERecord, parse_field
 from receipt_generator import ReceiptGenerator
 from docx_generator import DOCXGenerator
+from batch_table import export_table, records_table
+from cover_archive import cover_filename, write_cover_archive
+from cover_cache import CoverCache
+from extraction_cache import ExtractionCache
+from extraction_jobs import ExtractionJob
+from metrics import registry
+from nfe_xml import HEAD_SIZE, is_nfe_xml
+from profiling import profiler
 import base64
+import json
+
+
+@st.cache_resource
+def get_extraction_cache() -> ExtractionCache:
+    return ExtractionCache()
+
+# Shared by every session and rerun: none of them keeps per-document state
+@st.cache_resource
+def get_extractor() -> DANFEExtractor:
+    return DANFEExtractor(regions=True)
+
+@st.cache_resource
+def get_receipt_generator() -> ReceiptGenerator:
+    return ReceiptGenerator(fast=True)
+
+@st.cache_resource
+def get_docx_generator() -> DOCXGenerator:
+    return DOCXGenerator()
+
+# Covers listed per page in the batch section
+COVERS_PER_PAGE = 20
+
+MIME_TYPES = {
+    "PDF": "application/pdf",
+    "DOCX": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+TABLE_MIME_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv",
+}
+
+# What add_extracted_record did with a record
+ADDED, MERGED, REPEATED = 'novo', 'mesclado', 'repetido'
+
+def get_cover_cache() -> CoverCache:
+    # Per session: covers carry the session's edited data
+    if 'cover_cache' not in st.session_state:
+        st.session_state.cover_cache = CoverCache()
+    return st.session_state.cover_cache
+
+def render_cover(data, export_format: str, cache: CoverCache):
+    """Gera uma capa, reaproveitando a do cache se os dados não mudaram."""
+    def render():
+        generator = get_receipt_generator() if export_format == "PDF" else get_docx_generator()
+        buffer = generator.generate_receipt(data)
+        return buffer.getvalue() if buffer else None
+    
+    return cache.get_or_render(data, export_format, render)
+
+def cover_data(file_data: DANFERecord, volume_number: str) -> DANFERecord:
+    return file_data.replace(volume_number=volume_number)
+
+
+@st.fragment
+def show_batch_section(volume_number: str, export_format: str):
+    """
+    Geração em lote. Como fragmento, seus botões e a paginação reexecutam só
+    esta seção, e a lista mostra uma página de capas por vez: o custo de cada
+    rerun não cresce com o número de notas carregadas.
+    """
+    total = len(st.session_state.all_extracted_data)
+    st.subheader("📦 Geração em Lote")
+    
+    cover_cache = get_cover_cache()
+    with st.expander(f"📋 Capas individuais ({total})"):
+        page_count = (total - 1) // COVERS_PER_PAGE + 1
+        page = st.number_input("Página", min_value=1, max_value=page_count, value=1) if page_count > 1 else 1
+        first = (page - 1) * COVERS_PER_PAGE
+        
+        # Each cover is rendered only when its "Gerar" button is clicked; once in the session
+        # cache, the row offers the download of the ready bytes instead
+        for i in range(first, min(first + COVERS_PER_PAGE, total)):
+            generation_data = cover_data(st.session_state.all_extracted_data[i], volume_number)
+            col_info, col_download = st.columns([4, 1])
+            with col_info:
+                st.markdown(
+                    f"**NF-e {generation_data.get('numero_nfe', 'N/A')}** · Loja {generation_data.get('loja', 'N/A')} · "
+                    f"{generation_data.get('destinatario_nome', 'N/A')} · {generation_data.get('filename', '')}"
+                )
+            with col_download:
+                slot = st.empty()
+                cover = cover_cache.get(generation_data, export_format)
+                if cover is None and slot.button(
+                    f"🎯 Gerar {export_format}", key=f"render_cover_{i}", use_container_width=True
+                ):
+                    cover = render_cover(generation_data, export_format, cover_cache)
+                    if cover is None:
+                        slot.error("❌ Erro")
+                if cover:
+                    slot.download_button(
+                        label=f"⬇️ {export_format}",
+                        data=cover,
+                        file_name=cover_filename(generation_data, export_format.lower()),
+                        mime=MIME_TYPES[export_format],
+                        key=f"download_cover_{i}",
+                        use_container_width=True
+                    )
+    
+    single_document = export_format == "PDF" or st.checkbox(
+        "Um único DOCX",
+        value=True,
+        help="Junta todas as capas num só documento, uma seção por capa"
+    )
+    group_by_loja = single_document and st.checkbox(
+        "Agrupar por loja",
+        value=True,
+        help=f"Ordena as capas por loja e NF-e no {export_format} único, para imprimir em um só trabalho"
+    )
+    
+    if st.button(f"🎯 Gerar Todas as Capas ({export_format})", type="secondary", use_container_width=True):
+        try:
+            with st.spinner(f"Gerando todas as capas em {export_format}..."):
+                records = [cover_data(file_data, volume_number) for file_data in st.session_state.all_extracted_data]
+                
+                if export_format == "PDF":
+                    # Every cover as a page of one PDF, built in a single pass
+                    file_buffer = get_receipt_generator().generate_batch(records, group_by_loja=group_by_loja)
+                    
+                    if file_buffer:
+                        st.download_button(
+                            label=f"⬇️ Baixar Todas as Capas ({len(records)} páginas)",
+                            data=file_buffer,
+                            file_name=f"Capas_Frete_Lote_{len(records)}_NFs.pdf",
+                            mime="application/pdf",
+                            key="download_batch"
+                        )
+                        st.success(f"✅ {len(records)} capas geradas em um único PDF!")
+                    else:
+                        st.error("❌ Erro ao gerar as capas de frete.")
+                elif single_document:
+                    # Every cover as a section of one DOCX, cloned from the cached template
+                    file_buffer = get_docx_generator().generate_batch(records, group_by_loja=group_by_loja)
+                    
+                    if file_buffer:
+                        st.download_button(
+                            label=f"⬇️ Baixar Todas as Capas ({len(records)} seções)",
+                            data=file_buffer,
+                            file_name=f"Capas_Frete_Lote_{len(records)}_NFs.docx",
+                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                            key="download_batch"
+                        )
+                        st.success(f"✅ {len(records)} capas geradas em um único DOCX!")
+                    else:
+                        st.error("❌ Erro ao gerar as capas de frete.")
+                else:
+                    # One ZIP download; each cover is written into it as soon as it is generated
+                    archive, written = write_cover_archive(records, get_docx_generator(), "docx")
+                    
+                    if written:
+                        st.download_button(
+                            label=f"⬇️ Baixar Todas as Capas ({written} arquivos .docx em ZIP)",
+                            data=archive,
+                            file_name=f"Capas_Frete_Lote_{written}_NFs.zip",
+                            mime="application/zip",
+                            key="download_batch"
+                        )
+                        st.success(f"✅ {written} capas geradas em {export_format} com sucesso!")
+                    else:
+                        st.error("❌ Erro ao gerar as capas de frete.")
+                
+        except Exception as e:
+            st.error(f"❌ Erro ao gerar capas: {str(e)}")
+
+
+@st.fragment
+def show_batch_table():
+    """
+    Tabela colunar das notas, para conferência com o ERP. Só é montada
+    quando mostrada ou gerada para download, para não pesar em cada rerun.
+    """
+    records = list(st.session_state.all_extracted_data)
+    st.subheader("🧾 Tabela das Notas")
+    
+    if st.toggle(f"Mostrar tabela ({len(records)} notas)"):
+        st.dataframe(records_table(records), hide_index=True)
+    
+    for column, table_format in zip(st.columns(len(TABLE_MIME_TYPES)), TABLE_MIME_TYPES):
+        with column:
+            if st.button(f"🎯 Gerar Tabela ({table_format.upper()})", key=f"export_table_{table_format}",
+                         use_container_width=True):
+                st.download_button(
+                    label=f"⬇️ Baixar Tabela ({table_format.upper()})",
+                    data=export_table(records_table(records), table_format).getvalue(),
+                    file_name=f"Notas_Lote_{len(records)}_NFs.{table_format}",
+                    mime=TABLE_MIME_TYPES[table_format],
+                    key=f"download_table_{table_format}",
+                    use_container_width=True
+                )
+
+
+def record_position(chave: str):
+    """Posição em all_extracted_data da nota com esta chave de acesso, ou None."""
+    records = st.session_state.all_extracted_data
+    if 'note_keys' not in st.session_state:
+        # Dropped on reprocess and when an edit changes a key; rebuilt once here
+        st.session_state.note_keys = {
+            record.chave_acesso: position for position, record in enumerate(records) if record.chave_acesso
+        }
+    return st.session_state.note_keys.get(chave)
+
+
+def add_extracted_record(extracted_data: DANFERecord, filename: str, cache_key: str) -> str:
+    """
+    Guarda um registro extraído na sessão.
+    
+    A mesma NF-e (mesma chave de acesso) não entra duas vezes: o registro lido
+    do XML toma o lugar do da DANFE em PDF, mas os campos que o usuário já
+    editou ficam como ele deixou; um PDF de nota já lida fica de fora.
+    
+    Returns:
+        str: ``ADDED`` se a nota ainda não estava na sessão, ``MERGED`` se o
+        XML completou o registro do PDF e ``REPEATED`` se ficou de fora
+    """
+    st.session_state.processed_keys.add(cache_key)
+    # Records are shared with the extraction cache: the session keeps its own copy with the filename
+    record = extracted_data.replace(filename=filename)
+    records = st.session_state.all_extracted_data
+    
+    position = record_position(record.chave_acesso) if record.chave_acesso else None
+    if position is None:
+        if record.chave_acesso:
+            st.session_state.note_keys[record.chave_acesso] = len(records)
+        records.append(record)
+        return ADDED
+    
+    if record.motor_texto == 'xml' and records[position].motor_texto != 'xml':
+        current = records[position]
+        edited = st.session_state.edited_fields.get(position, ())
+        records[position] = record.replace(**{name: getattr(current, name) for name in edited})
+        return MERGED
+    return REPEATED
+
+
+@st.fragment(run_every=1.0)
+def show_extraction_progress():
+    """
+    Acompanha o processamento em segundo plano. Os registros prontos entram
+    na sessão a cada consulta e já podem ser editados enquanto o resto roda.
+    """
+    job = st.session_state.extraction_job
+    
+    arrived = job.take_results()
+    for index, extracted_data in arrived:
+        filename, cache_key = job.files[index]
+        add_extracted_record(extracted_data, filename, cache_key)
+    
+    st.progress(job.completed / job.total, text=f"Processados {job.completed} de {job.total} PDFs")
+    
+    if job.running:
+        if st.button("⏹️ Cancelar processamento", disabled=job.cancelled):
+            job.cancel()
+    
+    with st.expander(f"Status por arquivo ({job.failed} com erro)"):
+        st.dataframe(
+            [{"Arquivo": filename, "Status": status} for (filename, _), status in zip(job.files, job.statuses)],
+            hide_index=True
+        )
+    
+    if not job.running:
+        # Results that arrived between the last poll and the end of the job
+        for index, extracted_data in job.take_results():
+            filename, cache_key = job.files[index]
+            add_extracted_record(extracted_data, filename, cache_key)
+        
+        outcome = "cancelado" if job.cancelled else "concluído"
+        st.session_state.last_job_summary = (
+            f"Processamento {outcome}: {job.completed - job.failed} de {job.total} PDFs extraídos, "
+            f"{job.failed} com erro, em {job.finished_at - job.started_at:.1f} s"
+        )
+        st.session_state.extraction_job = None
+        st.rerun()
+    elif arrived:
+        # New records: refresh the editor and the batch list outside this fragment
+        st.rerun()
+
+
+def apply_profiling():
+    # Process-wide, like DANFE_PROFILE, and extraction workers receive it with each task:
+    # applied only when this session changes it, so other sessions' reruns leave it alone
+    profiler.configure(
+        enabled=st.session_state.profile_enabled, every=int(st.session_state.profile_every)
+    )
+
+
+def show_metrics():
+    """Tempos por etapa e contadores do processo (todas as sessões) e o perfilamento."""
+    with st.expander("📈 Métricas de desempenho"):
+        # Show the current settings, which another session may have changed since this one's last run
+        st.session_state.profile_enabled = profiler.enabled
+        st.session_state.profile_every = profiler.every
+        col_profile, col_every = st.columns(2)
+        with col_profile:
+            profile_enabled = st.toggle(
+                "Perfilar extração e geração",
+                key="profile_enabled",
+                on_change=apply_profiling,
+                help="Grava um perfil do cProfile e um resumo das funções mais pesadas por documento"
+            )
+        with col_every:
+            st.number_input(
+                "Perfilar 1 a cada N documentos", min_value=1,
+                key="profile_every",
+                on_change=apply_profiling,
+                disabled=not profile_enabled
+            )
+        if profile_enabled:
+            st.caption(f"Perfis gravados em {profiler.output_dir}")
+        
+        snapshot = registry.snapshot()
+        if not snapshot['histogramas']:
+            st.caption("Nenhuma etapa medida ainda.")
+            return
+        
+        st.dataframe(
+            [
+                {
+                    "Métrica": name,
+                    "Contagem": summary['contagem'],
+                    "Média": summary['media'],
+                    "p50": summary['p50'],
+                    "p95": summary['p95'],
+                    "Máximo": summary['max'],
+                }
+                for name, summary in snapshot['histogramas'].items()
+            ],
+            hide_index=True
+        )
+        st.caption(" · ".join(f"{name}: {value:g}" for name, value in snapshot['contadores'].items()))
+        
+        col_dump, col_reset = st.columns(2)
+        with col_dump:
+            st.download_button(
+                "⬇️ Baixar métricas (JSON)",
+                data=json.dumps(snapshot, ensure_ascii=False, indent=2),
+                file_name="metricas.json",
+                mime="application/json",
+                use_container_width=True
+            )
+        with col_reset:
+            if st.button("🧹 Zerar métricas", use_container_width=True):
+                registry.reset()
+                st.rerun()
+
 
 def main():
     st.set_page_config(
@@ -20,51 +372,123 @@ def main():
     st.header("🔄 Upload e Extração")
     
     uploaded_files = st.file_uploader(
-        "Escolha os arquivos PDF das DANFEs",
-        type=['pdf'],
+        "Escolha os arquivos PDF das DANFEs ou os XMLs das NF-e",
+        type=['pdf', 'xml'],
         accept_multiple_files=True,
-        help="Selecione um ou mais arquivos PDF contendo DANFEs"
+        help="Selecione um ou mais PDFs de DANFEs ou XMLs de NF-e; o PDF e o XML da mesma nota viram um só registro"
     )
     
     if uploaded_files:
         if 'all_extracted_data' not in st.session_state:
             st.session_state.all_extracted_data = []
+        if 'processed_keys' not in st.session_state:
+            # Content-addressed cache keys of the files already in all_extracted_data
+            st.session_state.processed_keys = set()
+        if 'edited_fields' not in st.session_state:
+            # Position in all_extracted_data -> fields saved from the editor
+            st.session_state.edited_fields = {}
         
-        if st.button("🔄 Processar Todos os PDFs", type="primary"):
-            st.session_state.all_extracted_data = []
-            extractor = DANFEExtractor()
+        job_running = st.session_state.get('extraction_job') is not None
+        col_process, col_reprocess = st.columns([1, 1])
+        with col_process:
+            process = st.button(
+                "🔄 Processar Novos Arquivos", type="primary", use_container_width=True, disabled=job_running
+            )
+        with col_reprocess:
+            reprocess = st.button(
+                "♻️ Reprocessar Todos",
+                use_container_width=True,
+                disabled=job_running,
+                help="Descarta os dados extraídos e as edições e lê todos os arquivos de novo"
+            )
+        
+        if process or reprocess:
+            if reprocess:
+                st.session_state.all_extracted_data = []
+                st.session_state.processed_keys = set()
+                st.session_state.edited_fields = {}
+                st.session_state.pop('note_keys', None)
+            processed_keys = st.session_state.processed_keys
+            cache = get_extraction_cache()
+            hits_before, misses_before = cache.hits, cache.misses
             
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            pending = []
+            pending_keys = set()
+            cached = skipped = xml_read = merged = repeated = 0
+            xml_failed = []
             
-            for i, uploaded_file in enumerate(uploaded_files):
-                progress = (i + 1) / len(uploaded_files)
-                progress_bar.progress(progress)
-                status_text.text(f"Processando {uploaded_file.name}...")
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    tmp_file_path = tmp_file.name
+            for uploaded_file in uploaded_files:
+                # Zero-copy view of the upload, used for hashing and handed to the extractor as is
+                file_bytes = uploaded_file.getbuffer()
+                is_xml = uploaded_file.name.lower().endswith('.xml')
+                cache_key = cache.make_key(file_bytes, 'xml' if is_xml else 'capa-regioes')
+                # Already in the session (possibly edited) or repeated in this upload
+                if cache_key in processed_keys or cache_key in pending_keys:
+                    skipped += 1
+                    continue
                 
-                try:
-                    extracted_data = extractor.extract_from_pdf(tmp_file_path)
-                    if extracted_data:
-                        extracted_data['filename'] = uploaded_file.name
-                        st.session_state.all_extracted_data.append(extracted_data)
-                        st.success(f"✅ {uploaded_file.name} processado com sucesso!")
+                if is_xml:
+                    # Parsed right here: cheaper than a trip to the process pool and not worth caching
+                    # Other XMLs (CT-e, events) are turned away by their first bytes, without parsing
+                    if is_nfe_xml(bytes(file_bytes[:HEAD_SIZE])):
+                        extracted_data = get_extractor().extract_from_xml(file_bytes, name=uploaded_file.name)
                     else:
-                        st.error(f"❌ Erro ao processar {uploaded_file.name}")
-                        
-                except Exception as e:
-                    st.error(f"❌ Erro em {uploaded_file.name}: {str(e)}")
+                        extracted_data = None
+                    if extracted_data is None:
+                        xml_failed.append(uploaded_file.name)
+                    else:
+                        xml_read += 1
+                        outcome = add_extracted_record(extracted_data, uploaded_file.name, cache_key)
+                        merged += outcome == MERGED
+                        repeated += outcome == REPEATED
+                    continue
                 
-                finally:
-                    if os.path.exists(tmp_file_path):
-                        os.unlink(tmp_file_path)
+                extracted_data = cache.get(cache_key)
+                if extracted_data is None:
+                    pending.append((uploaded_file.name, cache_key, file_bytes))
+                    pending_keys.add(cache_key)
+                else:
+                    repeated += add_extracted_record(extracted_data, uploaded_file.name, cache_key) == REPEATED
+                    cached += 1
+            
+            if skipped:
+                st.info(f"ℹ️ {skipped} arquivo(s) já processados foram mantidos, com as edições feitas.")
+            if merged:
+                st.info(
+                    f"ℹ️ {merged} XML(s) substituíram a leitura do PDF da mesma NF-e; "
+                    "os campos já editados foram mantidos."
+                )
+            if repeated:
+                st.info(
+                    f"ℹ️ {repeated} arquivo(s) com a chave de acesso de uma nota já lida "
+                    "(PDF e XML da mesma NF-e) foram ignorados."
+                )
+            if xml_read:
+                st.success(f"✅ {xml_read} XML(s) de NF-e lidos direto, sem o PDF.")
+            if xml_failed:
+                st.error(f"❌ Não são XMLs de NF-e válidos: {', '.join(xml_failed)}")
+            if cached:
+                st.success(f"✅ {cached} PDF(s) recuperados do cache de extração.")
+            if pending:
+                # Runs on the process pool; the page polls it and stays usable meanwhile
+                st.session_state.extraction_job = ExtractionJob(get_extractor(), pending, cache).start()
             
-            progress_bar.empty()
-            status_text.empty()
             st.session_state.files_processed = True
+            st.session_state.cache_stats = (cache.hits - hits_before, cache.misses - misses_before)
+        
+        if 'cache_stats' in st.session_state:
+            cache = get_extraction_cache()
+            run_hits, run_misses = st.session_state.cache_stats
+            st.caption(
+                f"Cache de extração: {run_hits} acertos e {run_misses} falhas no último processamento "
+                f"({cache.hits} acertos e {cache.misses} falhas no total)"
+            )
+    
+    # Outside the uploader block: a running job keeps reporting even if the uploads are cleared
+    if st.session_state.get('extraction_job') is not None:
+        show_extraction_progress()
+    elif 'last_job_summary' in st.session_state:
+        st.caption(st.session_state.last_job_summary)
     
     if hasattr(st.session_state, 'all_extracted_data') and st.session_state.all_extracted_data:
         st.markdown("---")
@@ -74,62 +498,89 @@ def main():
             selected_file = st.selectbox(
                 "Selecione o arquivo para editar:",
                 options=range(len(st.session_state.all_extracted_data)),
-                format_func=lambda x: st.session_state.all_extracted_data[x]['filename']
+                # A bundle of several DANFEs yields one record per note, all with the same filename
+                format_func=lambda x: (
+                    f"{st.session_state.all_extracted_data[x].filename} · "
+                    f"NF-e {st.session_state.all_extracted_data[x].numero_nfe or MISSING}"
+                )
             )
         else:
             selected_file = 0
         
         data = st.session_state.all_extracted_data[selected_file]
         
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            st.subheader("🏢 Informações do Destinatário")
-            data['destinatario_nome'] = st.text_input("Nome/Razão Social", value=data.get('destinatario_nome', ''))
-            data['destinatario_cnpj'] = st.text_input("CNPJ", value=data.get('destinatario_cnpj', ''))
-            data['destinatario_endereco'] = st.text_input("Endereço", value=data.get('destinatario_endereco', ''))
-            data['destinatario_bairro'] = st.text_input("Bairro", value=data.get('destinatario_bairro', ''))
+        # Edits only reach the script when the form is saved: one rerun per save, not per keystroke
+        with st.form(f"editor_{selected_file}"):
+            edited = {}
             
-            col1a, col1b = st.columns(2)
-            with col1a:
-                data['destinatario_municipio'] = st.text_input("Município", value=data.get('destinatario_municipio', ''))
-                data['destinatario_cep'] = st.text_input("CEP", value=data.get('destinatario_cep', ''))
-            with col1b:
-                data['destinatario_uf'] = st.text_input("UF", value=data.get('destinatario_uf', ''))
-                data['destinatario_ie'] = st.text_input("Inscrição Estadual", value=data.get('destinatario_ie', ''))
+            col1, col2 = st.columns([1, 1])
             
-            data['loja'] = st.text_input("Loja", value=data.get('loja', ''))
-        
-        with col2:
-            st.subheader("🏭 Informações do Remetente")
-            data['remetente_nome'] = st.text_input("Nome Remetente", value=data.get('remetente_nome', ''))
-            data['remetente_cnpj'] = st.text_input("CNPJ Remetente", value=data.get('remetente_cnpj', ''))
-            data['remetente_endereco'] = st.text_input("Endereço Remetente", value=data.get('remetente_endereco', ''))
+            with col1:
+                st.subheader("🏢 Informações do Destinatário")
+                edited['destinatario_nome'] = st.text_input("Nome/Razão Social", value=data.get('destinatario_nome', ''))
+                edited['destinatario_cnpj'] = st.text_input("CNPJ", value=data.get('destinatario_cnpj', ''))
+                edited['destinatario_endereco'] = st.text_input("Endereço", value=data.get('destinatario_endereco', ''))
+                edited['destinatario_bairro'] = st.text_input("Bairro", value=data.get('destinatario_bairro', ''))
+                
+                col1a, col1b = st.columns(2)
+                with col1a:
+                    edited['destinatario_municipio'] = st.text_input("Município", value=data.get('destinatario_municipio', ''))
+                    edited['destinatario_cep'] = st.text_input("CEP", value=data.get('destinatario_cep', ''))
+                with col1b:
+                    edited['destinatario_uf'] = st.text_input("UF", value=data.get('destinatario_uf', ''))
+                    edited['destinatario_ie'] = st.text_input("Inscrição Estadual", value=data.get('destinatario_ie', ''))
+                
+                edited['loja'] = st.text_input("Loja", value=data.get('loja', ''))
             
-            col2a, col2b = st.columns(2)
-            with col2a:
-                data['remetente_municipio'] = st.text_input("Município Remetente", value=data.get('remetente_municipio', ''))
-                data['remetente_cep'] = st.text_input("CEP Remetente", value=data.get('remetente_cep', ''))
-            with col2b:
-                data['remetente_uf'] = st.text_input("UF Remetente", value=data.get('remetente_uf', ''))
-                data['remetente_ie'] = st.text_input("I.E. Remetente", value=data.get('remetente_ie', ''))
-        
-        st.subheader("📄 Informações da Nota Fiscal")
-        col3a, col3b, col3c = st.columns(3)
-        
-        with col3a:
-            data['numero_nfe'] = st.text_input("Número NF-e", value=data.get('numero_nfe', ''))
-            data['serie'] = st.text_input("Série", value=data.get('serie', ''))
-        
-        with col3b:
-            data['data_emissao'] = st.text_input("Data de Emissão", value=data.get('data_emissao', ''))
-            data['valor_total'] = st.text_input("Valor Total", value=data.get('valor_total', ''))
-        
-        with col3c:
-            data['chave_acesso'] = st.text_input("Chave de Acesso", value=data.get('chave_acesso', ''))
-            data['natureza_operacao'] = st.text_input("Natureza da Operação", value=data.get('natureza_operacao', ''))
+            with col2:
+                st.subheader("🏭 Informações do Remetente")
+                edited['remetente_nome'] = st.text_input("Nome Remetente", value=data.get('remetente_nome', ''))
+                edited['remetente_cnpj'] = st.text_input("CNPJ Remetente", value=data.get('remetente_cnpj', ''))
+                edited['remetente_endereco'] = st.text_input("Endereço Remetente", value=data.get('remetente_endereco', ''))
+                
+                col2a, col2b = st.columns(2)
+                with col2a:
+                    edited['remetente_municipio'] = st.text_input("Município Remetente", value=data.get('remetente_municipio', ''))
+                    edited['remetente_cep'] = st.text_input("CEP Remetente", value=data.get('remetente_cep', ''))
+                with col2b:
+                    edited['remetente_uf'] = st.text_input("UF Remetente", value=data.get('remetente_uf', ''))
+                    edited['remetente_ie'] = st.text_input("I.E. Remetente", value=data.get('remetente_ie', ''))
+            
+            st.subheader("📄 Informações da Nota Fiscal")
+            col3a, col3b, col3c = st.columns(3)
+            
+            with col3a:
+                edited['numero_nfe'] = st.text_input("Número NF-e", value=data.get('numero_nfe', ''))
+                edited['serie'] = st.text_input("Série", value=data.get('serie', ''))
+            
+            with col3b:
+                edited['data_emissao'] = st.text_input("Data de Emissão", value=data.get('data_emissao', ''))
+                edited['valor_total'] = st.text_input("Valor Total", value=data.get('valor_total', ''))
+            
+            with col3c:
+                edited['chave_acesso'] = st.text_input("Chave de Acesso", value=data.get('chave_acesso', ''))
+                edited['natureza_operacao'] = st.text_input("Natureza da Operação", value=data.get('natureza_operacao', ''))
+            
+            saved = st.form_submit_button("💾 Salvar alterações", type="primary")
         
-        st.session_state.all_extracted_data[selected_file] = data
+        if saved:
+            changes = {name: parse_field(name, value) for name, value in edited.items()}
+            invalid = [
+                label for name, label in (('data_emissao', "Data de Emissão"), ('valor_total', "Valor Total"))
+                if changes[name] is None and edited[name].strip() not in ('', MISSING)
+            ]
+            if invalid:
+                st.error(f"❌ Valor inválido em: {', '.join(invalid)}. As alterações não foram salvas.")
+            else:
+                if changes['chave_acesso'] != data.chave_acesso:
+                    st.session_state.pop('note_keys', None)
+                # Kept over the values of an XML of the same note read later
+                st.session_state.edited_fields.setdefault(selected_file, set()).update(
+                    name for name, value in changes.items() if value != getattr(data, name)
+                )
+                data = data.replace(**changes)
+                st.session_state.all_extracted_data[selected_file] = data
+                st.success("✅ Alterações salvas.")
         
         st.markdown("---")
         st.header("📄 Geração da Capa de Frete")
@@ -156,32 +607,18 @@ def main():
             if st.button("🎯 Gerar Capa de Frete", type="primary", use_container_width=True):
                 try:
                     with st.spinner(f"Gerando capa em {export_format}..."):
-                        generation_data = data.copy()
-                        generation_data['volume_number'] = volume_number
+                        generation_data = cover_data(data, volume_number)
                         
-                        if export_format == "PDF":
-                            generator = ReceiptGenerator()
-                            file_buffer = generator.generate_receipt(generation_data)
-                            mime_type = "application/pdf"
-                            extension = "pdf"
-                        else:
-                            generator = DOCXGenerator()
-                            file_buffer = generator.generate_receipt(generation_data)
-                            mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                            extension = "docx"
+                        file_buffer = render_cover(generation_data, export_format, get_cover_cache())
                         
                         if file_buffer:
                             st.success(f"✅ Capa gerada em {export_format} com sucesso!")
                             
-                            nf_number = generation_data.get('numero_nfe', 'S_N')
-                            loja = generation_data.get('loja', 'S_N')
-                            filename = f"Capa_Frete_NF{nf_number}_Loja{loja}.{extension}"
-                            
                             st.download_button(
                                 label=f"⬇️ Baixar Capa ({export_format})",
                                 data=file_buffer,
-                                file_name=filename,
-                                mime=mime_type,
+                                file_name=cover_filename(generation_data, export_format.lower()),
+                                mime=MIME_TYPES[export_format],
                                 use_container_width=True
                             )
                         else:
@@ -192,49 +629,15 @@ def main():
         
         if len(st.session_state.all_extracted_data) > 1:
             st.markdown("---")
-            st.subheader("📦 Geração em Lote")
-            
-            if st.button(f"🎯 Gerar Todas as Capas ({export_format})", type="secondary", use_container_width=True):
-                try:
-                    with st.spinner(f"Gerando todas as capas em {export_format}..."):
-                        if export_format == "PDF":
-                            generator = ReceiptGenerator()
-                            mime_type = "application/pdf"
-                            extension = "pdf"
-                        else:
-                            generator = DOCXGenerator()
-                            mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                            extension = "docx"
-                        
-                        success_count = 0
-                        
-                        for i, file_data in enumerate(st.session_state.all_extracted_data):
-                            generation_data = file_data.copy()
-                            generation_data['volume_number'] = volume_number
-                            
-                            file_buffer = generator.generate_receipt(generation_data)
-                            
-                            if file_buffer:
-                                nf_number = generation_data.get('numero_nfe', f'PDF_{i+1}')
-                                loja = generation_data.get('loja', 'S_N')
-                                filename = f"Capa_Frete_NF{nf_number}_Loja{loja}.{extension}"
-                                
-                                st.download_button(
-                                    label=f"⬇️ Baixar Capa NF-e {nf_number} ({export_format})",
-                                    data=file_buffer,
-                                    file_name=filename,
-                                    mime=mime_type,
-                                    key=f"download_{i}"
-                                )
-                                success_count += 1
-                        
-                        st.success(f"✅ {success_count} capas geradas em {export_format} com sucesso!")
-                        
-                except Exception as e:
-                    st.error(f"❌ Erro ao gerar capas: {str(e)}")
+            show_batch_section(volume_number, export_format)
+        
+        st.markdown("---")
+        show_batch_table()
     
     else:
         st.info("📤 Faça o upload de arquivos PDF para visualizar os dados extraídos.")
+    
+    show_metrics()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,225 @@
+"""
+Tabela colunar de um lote de notas, para conferência com o ERP.
+
+Cada nota é uma linha e cada campo uma coluna tipada: valor total em
+decimal exato, data de emissão como data, CNPJ e CEP no formato padrão e
+campos ausentes como nulos. A normalização é feita coluna a coluna pelo
+pandas/pyarrow, sem passar valor por valor pelas funções de ``utils``, então
+dezenas de milhares de notas cabem em poucos segundos. A tabela sai em
+Parquet ou CSV com ``export_table``.
+"""
+from io import BytesIO
+from operator import attrgetter
+from typing import BinaryIO, Iterable, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from danfe_record import MISSING, OPTIONAL_FIELDS, TEXT_FIELDS, DANFERecord
+
+# One column per record field; the product list stays out of the table
+COLUMNS = TEXT_FIELDS + tuple(name for name in OPTIONAL_FIELDS if name != 'produtos')
+
+# Arrow-backed, so the string methods below run in pyarrow.compute rather than per value
+TEXT_TYPE = pd.StringDtype('pyarrow')
+CURRENCY_TYPE = pa.decimal128(18, 2)
+EXPORT_FORMATS = ('parquet', 'csv')
+
+CNPJ_COLUMNS = ('remetente_cnpj', 'destinatario_cnpj')
+CEP_COLUMNS = ('remetente_cep', 'destinatario_cep')
+PAGE_COLUMNS = ('paginas_processadas', 'total_paginas')
+
+
+def _text(values: pd.Series) -> pd.Series:
+    """Coluna como texto, com vazios e ``'N/A'`` como nulos."""
+    text = values.astype(TEXT_TYPE).str.strip()
+    return text.mask(text.isin(['', MISSING]))
+
+
+def _digits(values: pd.Series) -> pd.Series:
+    return _text(values).str.replace(r'\D', '', regex=True)
+
+
+def normalize_currency(values: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de valores monetários para decimal.
+
+    Aceita Decimal (como no DANFERecord) ou texto nos mesmos formatos que
+    ``utils.parse_currency`` (1.234,56, 1,234.56, 1234,56).
+
+    Args:
+        values (pd.Series): Valores
+
+    Returns:
+        pd.Series: Decimal com duas casas; nulo onde o texto não é um número
+    """
+    if pd.api.types.infer_dtype(values, skipna=True) == 'decimal':
+        return _currency_series(pa.array(values, type=pa.decimal128(38, 10)), values)
+
+    text = _text(values).str.replace(r'[^\d.,]', '', regex=True)
+    comma = text.str.rfind(',')
+    dot = text.str.rfind('.')
+    decimal_comma = (comma > dot) & ((dot >= 0) | (text.str.len() - comma == 3))
+
+    # Brazilian format (or a lone comma with two decimals): dots group thousands
+    text = text.mask(decimal_comma, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    # Otherwise commas group thousands
+    text = text.mask(~decimal_comma, text.str.replace(',', '', regex=False))
+    text = text.where(text.str.fullmatch(r'\d+(?:\.\d+)?'))
+
+    return _currency_series(pc.cast(pa.array(text, type=pa.string()), pa.decimal128(38, 10)), values)
+
+
+def _currency_series(exact: pa.Array, values: pd.Series) -> pd.Series:
+    rounded = pc.cast(pc.round(exact, 2), CURRENCY_TYPE)
+    return pd.Series(rounded, index=values.index, name=values.name, dtype=pd.ArrowDtype(CURRENCY_TYPE))
+
+
+def normalize_date(values: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de datas para o tipo data.
+
+    Aceita ``date`` (como no DANFERecord) ou texto (DD/MM/AAAA, D-M-AA...);
+    como em ``utils.parse_date``, dia, mês e ano vêm nessa ordem e anos com
+    dois dígitos até 30 ficam em 20xx.
+
+    Args:
+        values (pd.Series): Datas
+
+    Returns:
+        pd.Series: Datas; nulo onde o texto não é uma data válida
+    """
+    if pd.api.types.infer_dtype(values, skipna=True) == 'date':
+        return pd.Series(pa.array(values, type=pa.date32()), index=values.index, name=values.name,
+                         dtype=pd.ArrowDtype(pa.date32()))
+
+    parts = _text(values).str.extract(r'^\D*(\d+)\D+(\d+)\D+(\d+)').astype('float64')
+    parts.columns = ['day', 'month', 'year']
+    year = parts['year']
+    parts['year'] = year.mask(year < 100, year + 2000).mask((year < 100) & (year > 30), year + 1900)
+
+    dates = pa.Array.from_pandas(pd.to_datetime(parts, errors='coerce')).cast(pa.date32())
+    return pd.Series(dates, index=values.index, name=values.name, dtype=pd.ArrowDtype(pa.date32()))
+
+
+def normalize_cnpj(values: pd.Series) -> pd.Series:
+    """
+    Formata uma coluna de CNPJs como XX.XXX.XXX/XXXX-XX.
+
+    Aceita o CNPJ com ou sem pontuação, com um zero à esquerda perdido
+    (comum em planilhas) ou a mais (como a DANFE imprime, 006.626.253/...).
+
+    Args:
+        values (pd.Series): CNPJs em texto
+
+    Returns:
+        pd.Series: CNPJs formatados; nulo onde o número de dígitos não bate
+    """
+    digits = _digits(values).str.replace(r'^0(\d{14})$', r'\1', regex=True).str.replace(r'^(\d{13})$', r'0\1', regex=True)
+    digits = digits.where(digits.str.fullmatch(r'\d{14}'))
+    return digits.str.replace(r'^(\d{2})(\d{3})(\d{3})(\d{4})(\d{2})$', r'\1.\2.\3/\4-\5', regex=True)
+
+
+def normalize_cep(values: pd.Series) -> pd.Series:
+    """
+    Formata uma coluna de CEPs como XXXXX-XXX.
+
+    Args:
+        values (pd.Series): CEPs em texto, com ou sem pontuação
+
+    Returns:
+        pd.Series: CEPs formatados; nulo onde não há 7 ou 8 dígitos
+    """
+    digits = _digits(values).str.replace(r'^(\d{7})$', r'0\1', regex=True)
+    digits = digits.where(digits.str.fullmatch(r'\d{8}'))
+    return digits.str.replace(r'^(\d{5})(\d{3})$', r'\1-\2', regex=True)
+
+
+def normalize_table(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza as colunas conhecidas de uma tabela de notas.
+
+    Args:
+        frame (pd.DataFrame): Uma linha por nota, colunas com os nomes dos
+            campos (como no JSONL do ``cli.py``); as que faltarem ficam nulas
+
+    Returns:
+        pd.DataFrame: Tabela com as colunas de ``COLUMNS``, tipadas
+    """
+    frame = frame.reindex(columns=COLUMNS)
+    normalized = {}
+    for name in COLUMNS:
+        column = frame[name]
+        if name == 'valor_total':
+            normalized[name] = normalize_currency(column)
+        elif name == 'data_emissao':
+            normalized[name] = normalize_date(column)
+        elif name in CNPJ_COLUMNS:
+            normalized[name] = normalize_cnpj(column)
+        elif name in CEP_COLUMNS:
+            normalized[name] = normalize_cep(column)
+        elif name in PAGE_COLUMNS:
+            normalized[name] = pd.to_numeric(_text(column), errors='coerce').astype('Int64')
+        else:
+            normalized[name] = _text(column)
+    return pd.DataFrame(normalized, index=frame.index)
+
+
+def records_table(records: Iterable[DANFERecord]) -> pd.DataFrame:
+    """
+    Monta a tabela de um lote de notas.
+
+    Args:
+        records: Registros extraídos (para dicionários no formato antigo,
+            use ``normalize_table(pd.DataFrame(dicionarios))``)
+
+    Returns:
+        pd.DataFrame: Uma linha por nota, na ordem recebida (ver ``normalize_table``)
+    """
+    values = attrgetter(*COLUMNS)
+    raw = pd.DataFrame.from_records([values(record) for record in records], columns=COLUMNS)
+    return normalize_table(raw)
+
+
+def read_jsonl(path: str) -> pd.DataFrame:
+    """
+    Lê o JSONL gravado pelo ``cli.py`` como tabela normalizada.
+
+    Args:
+        path (str): Caminho do JSONL
+
+    Returns:
+        pd.DataFrame: Uma linha por nota (ver ``normalize_table``)
+    """
+    raw = pd.read_json(path, lines=True, dtype=False, convert_dates=False)
+    return normalize_table(raw.drop(columns='produtos', errors='ignore'))
+
+
+def export_table(frame: pd.DataFrame, export_format: str,
+                 output: Optional[Union[str, BinaryIO]] = None) -> Union[str, BinaryIO]:
+    """
+    Grava a tabela em Parquet ou CSV.
+
+    Args:
+        frame (pd.DataFrame): Tabela de ``records_table`` ou ``read_jsonl``
+        export_format (str): ``parquet`` ou ``csv``
+        output: Caminho ou stream binário (padrão: novo BytesIO)
+
+    Returns:
+        O ``output`` usado, com o stream posicionado no início
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de tabela desconhecido: {export_format}")
+    if output is None:
+        output = BytesIO()
+
+    if export_format == 'parquet':
+        frame.to_parquet(output, index=False, engine='pyarrow')
+    else:
+        # Decimal point and ISO dates, as ERP imports expect
+        frame.to_csv(output, index=False, encoding='utf-8')
+
+    if hasattr(output, 'seek'):
+        output.seek(0)
+    return output
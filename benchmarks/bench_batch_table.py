@@ -0,0 +1,80 @@
+"""
+Compara a normalização valor a valor (funções de ``utils``) com a tabela
+colunar do ``batch_table`` num lote grande de notas em texto, como no JSONL
+do ``cli.py``, e mede a exportação em Parquet e CSV.
+
+Uso:
+    python benchmarks/bench_batch_table.py [pasta/ ...] [--records 50000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_table import CNPJ_COLUMNS, export_table, normalize_table
+from danfe_corpus import generate_corpus, load_corpus
+from danfe_record import DANFERecord
+from utils import format_cnpj
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def normalize_rows(rows):
+    """O mesmo trabalho, valor a valor: tipos do DANFERecord e CNPJ formatado."""
+    for row in rows:
+        DANFERecord.from_dict(row)
+        for field in CNPJ_COLUMNS:
+            if row.get(field):
+                format_cnpj(row[field])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='Pastas com DANFEs e gabaritos .json (padrão: corpus sintético)')
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = list(args.paths)
+        if not paths:
+            generate_corpus(corpus_dir, 10, 1, 42)
+            paths.append(corpus_dir)
+        truths = [truth for _, _, truth in load_corpus(paths) if truth]
+    if not truths:
+        sys.exit('Nenhum gabarito .json encontrado.')
+
+    rows = [
+        {name: value for name, value in truths[index % len(truths)].items() if name != 'produtos'}
+        for index in range(args.records)
+    ]
+    frame = pd.DataFrame(rows)
+
+    per_value = best_time(lambda: normalize_rows(rows), args.repeat)
+    columnar = best_time(lambda: normalize_table(frame), args.repeat)
+    table = normalize_table(frame)
+
+    print(f"notas: {len(rows)}")
+    print(f"{'etapa':<28} {'segundos':>9}")
+    print(f"{'valor a valor (utils)':<28} {per_value:9.3f}")
+    print(f"{'tabela colunar':<28} {columnar:9.3f}")
+    for table_format in ('parquet', 'csv'):
+        elapsed = best_time(lambda: export_table(table, table_format), args.repeat)
+        print(f"{'exportação ' + table_format:<28} {elapsed:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Compara o tempo de regex por documento: chamadas avulsas a ``re.search`` /
+``re.findall`` (como o extrator fazia) contra a passada única do FieldIndex.
+
+Uso:
+    python benchmarks/bench_field_scanner.py arquivo.pdf [pasta/ ...] [--repeat 50]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber
+
+from danfe_extractor import PATTERNS, FieldIndex
+
+LEGACY_NUMERO_NFE = [
+    r'NF-e\s*(?:No|Nº)\s*(\d+)',
+    r'(?:No|Nº)\s*(\d+)\s*SÉRIE',
+    r'DANFE.*?N[oº]\s*(\d+)',
+    r'\bN[oº]\s+(\d{1,8})(?:\s|SÉRIE)'
+]
+
+
+def legacy_regex_pass(text: str) -> None:
+    """Mesmas buscas que _extract_basic_info/_extract_remetente_info/_extract_destinatario_info faziam."""
+    for pattern in LEGACY_NUMERO_NFE:
+        if re.search(pattern, text, re.IGNORECASE):
+            break
+    re.search(r'SÉRIE\s+(\d+)', text)
+    re.search(r'(\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})', text)
+    re.search(r'(\d{2}/\d{2}/\d{4})', text)
+    re.search(r'VALOR TOTAL DA NOTA\s+(\d+[.,]\d+)', text)
+    re.search(r'NATUREZA DA OPERAÇÃO\s+([^\n\r]+)', text)
+    re.search(r'Empreendimentos Pague Menos S\.A\.', text, re.IGNORECASE)
+    re.search(r'AV DEZESSETE DE AGOSTO,\s*(\d+)', text, re.IGNORECASE)
+    re.search(r'(\d{2}\.\d{3}-\d{3})', text)
+    re.findall(r'(\d{3}\.\d{3}\.\d{3}/\d{4}-\d{2})', text)
+    re.search(r'INSCRIÇÃO ESTADUAL\s+(\d+)', text, re.IGNORECASE)
+    re.findall(r'(\d{3}\.\d{3}\.\d{3}/\d{4}-\d{2})', text)
+    re.findall(r'(\d{2}\.\d{3}-\d{3})', text)
+    re.search(r'INSCRIÇÃO\s+(\d+)', text)
+
+
+def scanner_pass(text: str) -> None:
+    """Passada única seguida das leituras ancoradas feitas pelos resolvedores."""
+    index = FieldIndex(text)
+    for label in ('serie', 'valor_total', 'natureza', 'ie', 'inscricao', 'endereco_recife'):
+        index.label_value(label)
+    index.label_text('remetente_nome')
+
+
+def load_texts(paths):
+    texts = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.pdf'))) if os.path.isdir(path) else [path]
+        for file_path in files:
+            with pdfplumber.open(file_path) as pdf:
+                full_text = '\n'.join(page.extract_text() or '' for page in pdf.pages)
+            texts.append(PATTERNS['whitespace'].sub(' ', full_text).strip())
+    return texts
+
+
+def time_pass(func, texts, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='PDFs ou pastas com PDFs')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    texts = load_texts(args.paths)
+    if not texts:
+        sys.exit('Nenhum PDF encontrado.')
+
+    chars = sum(len(text) for text in texts) / len(texts)
+    legacy = time_pass(legacy_regex_pass, texts, args.repeat)
+    scanner = time_pass(scanner_pass, texts, args.repeat)
+
+    print(f"documentos: {len(texts)} (média de {chars:,.0f} caracteres)")
+    print(f"regex avulsas:   {legacy * 1e6:10.1f} µs/documento")
+    print(f"passada única:   {scanner * 1e6:10.1f} µs/documento")
+    print(f"redução:         {(1 - scanner / legacy) * 100:9.1f} %")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Compara a leitura do XML da NF-e com a extração da DANFE em PDF da mesma
+nota: tempo por nota, acerto dos campos e dos produtos contra o gabarito e
+quantas notas saem com os mesmos campos pelos dois caminhos.
+
+Uso:
+    python benchmarks/bench_nfe_xml.py [--notes 30] [--max-pages 3] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from danfe_corpus import build_nfe_xml, generate_corpus, load_corpus
+from danfe_extractor import DANFEExtractor
+
+# Ground truth keys that are not header fields read by the extractor
+NON_FIELD_KEYS = ('produtos', 'paginas')
+
+
+def best_time(func, repeat):
+    """Menor tempo de ``repeat`` execuções e o último resultado."""
+    best = result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--notes', type=int, default=30)
+    parser.add_argument('--max-pages', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        documents = load_corpus(generate_corpus(corpus_dir, args.notes, args.max_pages, 42))
+
+    extractor = DANFEExtractor(regions=True)
+    timings = {'pdf': [], 'xml': []}
+    hits = {'pdf': 0, 'xml': 0}
+    products = {'pdf': 0, 'xml': 0}
+    fields = same = 0
+
+    for _, pdf_bytes, truth in documents:
+        xml_bytes = build_nfe_xml(truth)
+        names = [name for name in truth if name not in NON_FIELD_KEYS]
+        fields += len(names)
+
+        records = {}
+        for source, read in (
+            ('pdf', lambda: extractor.extract_from_pdf(pdf_bytes, include_products=True)),
+            ('xml', lambda: extractor.extract_from_xml(xml_bytes, include_products=True)),
+        ):
+            elapsed, record = best_time(read, args.repeat)
+            timings[source].append(elapsed)
+            records[source] = record
+            hits[source] += sum(record is not None and record.get(name) == truth[name] for name in names)
+            products[source] += record is not None and record.get('produtos') == truth['produtos']
+
+        same += all(records['pdf'].get(name) == records['xml'].get(name) for name in names + ['produtos'])
+
+    print(f"{len(documents)} notas, {sum(truth['paginas'] for _, _, truth in documents)} páginas")
+    print(f"{'leitura':<8} {'média ms':>9} {'p50 ms':>8} {'acerto':>8} {'produtos':>9}")
+    for source in ('pdf', 'xml'):
+        print(
+            f"{source:<8} {statistics.mean(timings[source]) * 1e3:9.1f} "
+            f"{statistics.median(timings[source]) * 1e3:8.1f} {hits[source] / fields:8.1%} "
+            f"{products[source]:>4}/{len(documents)}"
+        )
+    print(f"mesmos campos e produtos nos dois caminhos: {same}/{len(documents)} notas")
+
+
+if __name__ == '__main__':
+    main()
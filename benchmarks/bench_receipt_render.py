@@ -0,0 +1,70 @@
+"""
+Compara o tempo de geração da capa em PDF pelo layout do platypus e pelo
+modo rápido do ReceiptGenerator (parte fixa desenhada uma vez num form),
+uma capa por vez e em lote.
+
+Uso:
+    python benchmarks/bench_receipt_render.py [pasta/ ...] [--covers 100] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_generator import ReceiptGenerator
+from danfe_corpus import generate_corpus, load_corpus
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_records(paths, covers):
+    """Monta ``covers`` capas a partir dos gabaritos ``.json`` do corpus."""
+    truths = [truth for _, _, truth in load_corpus(paths) if truth]
+    records = []
+    for index in range(covers):
+        truth = truths[index % len(truths)]
+        records.append(dict(truth, volume_number=f"{index % 3 + 1}/3"))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='Pastas com DANFEs e gabaritos .json (padrão: corpus sintético)')
+    parser.add_argument('--covers', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = list(args.paths)
+        if not paths:
+            generate_corpus(corpus_dir, 10, 1, 42)
+            paths.append(corpus_dir)
+        records = load_records(paths, args.covers)
+    if not records:
+        sys.exit('Nenhum gabarito .json encontrado.')
+
+    print(f"capas: {len(records)}")
+    print(f"{'modo':<10} {'ms/capa':>9} {'lote ms/capa':>13} {'tamanho lote':>13}")
+    for name, generator in (('platypus', ReceiptGenerator()), ('rapido', ReceiptGenerator(fast=True))):
+        single = best_time(lambda: [generator.generate_receipt(data) for data in records], args.repeat)
+        batch = best_time(lambda: generator.generate_batch(records), args.repeat)
+        size = len(generator.generate_batch(records).getvalue())
+        print(
+            f"{name:<10} {single / len(records) * 1e3:9.2f} "
+            f"{batch / len(records) * 1e3:13.2f} {size / 1024:11.0f}KB"
+        )
+
+
+if __name__ == '__main__':
+    main()
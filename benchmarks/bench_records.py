@@ -0,0 +1,85 @@
+"""
+Compara o dicionário antigo do extrator com o DANFERecord: memória por
+registro numa sessão com milhares de notas e o custo das cópias feitas ao
+guardar e recuperar o registro no cache de extração e ao gerar a capa.
+
+Uso:
+    python benchmarks/bench_records.py [pasta/ ...] [--records 5000] [--repeat 3]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from danfe_record import DANFERecord
+from danfe_corpus import generate_corpus, load_corpus
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def traced_size(build):
+    """Bytes alocados pelo que ``build`` devolve e que continuam vivos."""
+    tracemalloc.start()
+    try:
+        kept = build()
+        return tracemalloc.get_traced_memory()[0], kept
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='Pastas com DANFEs e gabaritos .json (padrão: corpus sintético)')
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = list(args.paths)
+        if not paths:
+            generate_corpus(corpus_dir, 10, 1, 42)
+            paths.append(corpus_dir)
+        truths = [truth for _, _, truth in load_corpus(paths) if truth]
+    if not truths:
+        sys.exit('Nenhum gabarito .json encontrado.')
+
+    # Serialized so every record owns its strings, as after extraction in the workers
+    lines = [json.dumps(truths[index % len(truths)], ensure_ascii=False) for index in range(args.records)]
+    dict_bytes, dicts = traced_size(lambda: [json.loads(line) for line in lines])
+    record_bytes, records = traced_size(lambda: [DANFERecord.from_dict(json.loads(line)) for line in lines])
+
+    def copy_dicts():
+        for data in dicts:
+            # Cache put and get, then the copy made for each cover
+            generation_data = copy.deepcopy(copy.deepcopy(data)).copy()
+            generation_data['volume_number'] = '1/1'
+
+    def copy_records():
+        for record in records:
+            record.replace(volume_number='1/1')
+
+    dict_time = best_time(copy_dicts, args.repeat)
+    record_time = best_time(copy_records, args.repeat)
+
+    print(f"registros: {len(records)}")
+    print(f"{'formato':<12} {'bytes/registro':>15} {'cópias µs/registro':>20}")
+    for name, size, elapsed in (('dict', dict_bytes, dict_time), ('DANFERecord', record_bytes, record_time)):
+        print(f"{name:<12} {size / len(records):15.0f} {elapsed / len(records) * 1e6:20.1f}")
+
+
+if __name__ == '__main__':
+    main()
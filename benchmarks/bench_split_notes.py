@@ -0,0 +1,107 @@
+"""
+Mede a extração de um PDF com várias DANFEs emendadas (lote de
+transportadora): separação das notas, extração nota a nota no pool e o
+acerto de cada nota contra o gabarito, comparando com a leitura antiga do
+PDF inteiro como uma nota só.
+
+Uso:
+    python benchmarks/bench_split_notes.py [--notes 60] [--max-pages 3] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pypdfium2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from danfe_corpus import generate_corpus, load_corpus
+from danfe_extractor import DANFEExtractor, shutdown_process_pool
+
+# Ground truth keys that are not header fields read by the extractor
+NON_FIELD_KEYS = ('produtos', 'paginas')
+
+
+def build_bundle(paths, target):
+    """Emenda os PDFs num só, na ordem recebida."""
+    bundle = pypdfium2.PdfDocument.new()
+    for path in paths:
+        document = pypdfium2.PdfDocument(path)
+        bundle.import_pages(document)
+        document.close()
+    bundle.save(target)
+    pages = len(bundle)
+    bundle.close()
+    return pages
+
+
+def matched_fields(record, truth):
+    fields = [name for name in truth if name not in NON_FIELD_KEYS]
+    return sum(record is not None and record.get(name) == truth[name] for name in fields), len(fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--notes', type=int, default=60)
+    parser.add_argument('--max-pages', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    extractor = DANFEExtractor(regions=True)
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = generate_corpus(corpus_dir, args.notes, args.max_pages, 42)
+        truths = [truth for _, _, truth in load_corpus(paths)]
+        bundle_path = os.path.join(corpus_dir, 'lote.pdf')
+        pages = build_bundle(paths, bundle_path)
+
+        # Warm the pool so worker start-up is not timed
+        list(extractor.extract_many(paths[:args.workers], workers=args.workers, lazy=True, include_products=False))
+
+        start = time.perf_counter()
+        notes = extractor.split_notes(bundle_path)
+        split_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        whole = extractor.extract_from_pdf(bundle_path, lazy=True, include_products=False)
+        whole_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        separate = list(extractor.extract_many(paths, workers=args.workers, lazy=True, include_products=False))
+        separate_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        records = {}
+        first_result = None
+        for _, record in extractor.extract_many(
+            [bundle_path], workers=args.workers, lazy=True, include_products=False, split=True
+        ):
+            first_result = first_result or time.perf_counter() - start
+            if record is not None:
+                records[record.chave_acesso] = record
+        split_total = time.perf_counter() - start
+        shutdown_process_pool()
+
+    def accuracy(found):
+        hits = total = 0
+        for truth in truths:
+            matched, fields = matched_fields(found.get(truth['chave_acesso']), truth)
+            hits += matched
+            total += fields
+        return hits / total
+
+    whole_records = {whole.chave_acesso: whole} if whole is not None else {}
+    separate_records = {record.chave_acesso: record for _, record in separate if record is not None}
+
+    print(f"lote: {args.notes} notas, {pages} páginas, {args.workers} processos")
+    print(f"separação: {len(notes)} notas em {split_time:.3f} s ({split_time / pages * 1e3:.1f} ms/página)")
+    print(f"{'leitura':<24} {'notas':>6} {'segundos':>9} {'acerto':>8}")
+    print(f"{'PDF inteiro (antiga)':<24} {len(whole_records):>6} {whole_time:9.2f} {accuracy(whole_records):8.1%}")
+    print(f"{'nota a nota (split)':<24} {len(records):>6} {split_total:9.2f} {accuracy(records):8.1%}")
+    print(f"{'arquivos separados':<24} {len(separate_records):>6} {separate_time:9.2f} {accuracy(separate_records):8.1%}")
+    print(f"primeira nota em {first_result:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
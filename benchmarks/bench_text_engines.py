@@ -0,0 +1,76 @@
+"""
+Compara os motores de texto do DANFEExtractor (pdfplumber, pypdfium2 e auto)
+no mesmo conjunto de PDFs: tempo por documento, campos do cabeçalho
+resolvidos e, no auto, a parcela de documentos que caiu no pdfplumber. Se
+houver um ``.json`` com o mesmo nome do PDF, os campos são conferidos
+contra ele.
+
+Uso:
+    python benchmarks/bench_text_engines.py arquivo.pdf [pasta/ ...] [--repeat 3] [--regions]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from danfe_extractor import HEADER_FIELDS, DANFEExtractor
+from danfe_corpus import load_corpus
+
+ENGINES = ('pdfplumber', 'pypdfium2', 'auto')
+
+
+def run_engine(engine, sources, repeat, regions, lazy):
+    extractor = DANFEExtractor(regions=regions, engine=engine)
+    elapsed = 0.0
+    resolved = correct = checked = extracted = fallbacks = 0
+    for _, pdf_bytes, truth in sources:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = extractor.extract_from_pdf(pdf_bytes, lazy=lazy, include_products=not lazy)
+            elapsed += time.perf_counter() - start
+        if not data:
+            continue
+        extracted += 1
+        if engine == 'auto' and data['motor_texto'] != 'pypdfium2':
+            fallbacks += 1
+        resolved += sum(data.get(field) not in (None, '', 'N/A') for field in HEADER_FIELDS)
+        if truth:
+            fields = [field for field in truth if field in data and not isinstance(truth[field], list)]
+            checked += len(fields)
+            correct += sum(str(data[field]) == str(truth[field]) for field in fields)
+    return {
+        'seconds_per_doc': elapsed / (repeat * len(sources)),
+        'header_fields_resolved': resolved / (len(HEADER_FIELDS) * len(sources)),
+        'accuracy': correct / checked if checked else None,
+        'fallback_rate': fallbacks / extracted if engine == 'auto' and extracted else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='PDFs ou pastas com PDFs')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--regions', action='store_true', help='Usa a leitura por quadros no pdfplumber')
+    parser.add_argument('--full', action='store_true', help='Lê todas as páginas e os produtos')
+    args = parser.parse_args()
+
+    sources = load_corpus(args.paths)
+    if not sources:
+        sys.exit('Nenhum PDF encontrado.')
+
+    print(f"documentos: {len(sources)}")
+    print(f"{'motor':<12} {'ms/doc':>10} {'cabeçalho':>10} {'acerto':>8} {'fallback':>9}")
+    for engine in ENGINES:
+        stats = run_engine(engine, sources, args.repeat, args.regions, lazy=not args.full)
+        accuracy = f"{stats['accuracy'] * 100:7.1f}%" if stats['accuracy'] is not None else f"{'-':>8}"
+        fallback = f"{stats['fallback_rate'] * 100:8.1f}%" if stats['fallback_rate'] is not None else f"{'-':>9}"
+        print(
+            f"{engine:<12} {stats['seconds_per_doc'] * 1e3:10.1f} "
+            f"{stats['header_fields_resolved'] * 100:9.1f}% {accuracy} {fallback}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+"""
+Gera DANFEs sintéticas (PDF) com gabarito para os benchmarks de extração,
+e o XML da NF-e de cada nota (``build_nfe_xml``).
+
+As notas seguem o leiaute de quadros da DANFE, têm de 1 a 50 páginas,
+emitentes Pague Menos e Extrafarma, destinatários das duas bandeiras e
+variações de leiaute vistas nas notas reais (canhoto ausente, razão social
+em maiúsculas, "No" no lugar de "Nº").
+
+Uso:
+    python benchmarks/danfe_corpus.py pasta_saida [quantidade] [--max-pages 50] [--seed 42]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nfe_xml import NFE_NAMESPACE
+from utils import access_key_check_digit
+
+ET.register_namespace('', NFE_NAMESPACE)
+
+PAGE_W, PAGE_H = A4
+LEFT = 20
+RIGHT = PAGE_W - 20
+ROW_H = 11
+FIRST_PAGE_ITEMS = 12
+NEXT_PAGE_ITEMS = 55
+
+REMETENTES = [
+    {
+        'remetente_nome': 'Empreendimentos Pague Menos S.A.',
+        'remetente_endereco': 'Rua Senador Pompeu,1520',
+        'remetente_bairro': 'Centro',
+        'remetente_municipio': 'FORTALEZA',
+        'remetente_uf': 'CE',
+        'remetente_cep': '60.025-001',
+        'remetente_cnpj': '006.626.253/0001-51',
+        'remetente_ie': '068451288',
+        'cuf': '23',
+        'linha_cidade': 'FORTALEZA Centro/CE 60.025-001',
+    },
+    {
+        'remetente_nome': 'Empreendimentos Pague Menos S.A.',
+        'remetente_endereco': 'AV DEZESSETE DE AGOSTO, 2143',
+        'remetente_bairro': 'PARNAMIRIM',
+        'remetente_municipio': 'RECIFE',
+        'remetente_uf': 'PE',
+        'remetente_cep': '52.060-590',
+        'remetente_cnpj': '006.626.253/0348-30',
+        'remetente_ie': '028687175',
+        'cuf': '26',
+        'linha_cidade': 'PARNAMIRIM - RECIFE/PE 52.060-590',
+    },
+    {
+        'remetente_nome': 'IMIFARMA PRODUTOS FARMACEUTICOS E COSMETICOS S.A.',
+        'remetente_endereco': 'AV PEDRO MIRANDA, 1700',
+        'remetente_bairro': 'PEDREIRA',
+        'remetente_municipio': 'BELEM',
+        'remetente_uf': 'PA',
+        'remetente_cep': '66.085-005',
+        'remetente_cnpj': '004.899.316/0001-18',
+        'remetente_ie': '151234567',
+        'cuf': '15',
+        'linha_cidade': 'PEDREIRA - BELEM/PA 66.085-005',
+    },
+]
+
+DESTINATARIOS = [
+    {
+        'destinatario_nome': 'EMPREENDIMENTOS PAGUE MENOS S A',
+        'destinatario_endereco': 'AV TANCREDO NEVES, 2915',
+        'destinatario_bairro': 'CAMINHO DAS ARVORES',
+        'destinatario_municipio': 'SALVADOR',
+        'destinatario_uf': 'BA',
+        'destinatario_cep': '41.820-910',
+        'destinatario_cnpj': '006.626.253/0805-80',
+        'destinatario_ie': '123510724',
+        'brand': 'paguemenos',
+        'loja': '0805',
+    },
+    {
+        'destinatario_nome': 'IMIFARMA PROD FARMACEUTICOS E COSM',
+        'destinatario_endereco': 'RUA R AFONSO PENA 579, LOJA, 0',
+        'destinatario_bairro': 'CENTRO',
+        'destinatario_municipio': 'CODO',
+        'destinatario_uf': 'MA',
+        'destinatario_cep': '65.400-000',
+        'destinatario_cnpj': '004.899.316/0123-08',
+        'destinatario_ie': '136521921',
+        'brand': 'extrafarma',
+        'loja': '7123',
+    },
+    {
+        'destinatario_nome': 'EMPREENDIMENTOS PAGUE MENOS S/A',
+        'destinatario_endereco': 'R SEN POMPEU, 1520',
+        'destinatario_bairro': 'CENTRO',
+        'destinatario_municipio': 'FORTALEZA',
+        'destinatario_uf': 'CE',
+        'destinatario_cep': '60.025-001',
+        'destinatario_cnpj': '006.626.253/0001-51',
+        'destinatario_ie': '068451288',
+        'brand': 'paguemenos',
+        'loja': '0001',
+    },
+]
+
+NATUREZAS = ['TRANSFERENCIA DE ATIVO FIXO', 'VENDA-DE-ATIVO-IMOBILIZADO']
+
+DESCRICOES = ['NOTEBOOK', 'MONITOR LED 24', 'IMPRESSORA TERMICA', 'LEITOR CODIGO BARRAS',
+              'CADEIRA ESCRITORIO', 'NOBREAK 1200VA', 'ROTEADOR WIFI', 'BALANCA DIGITAL']
+
+
+def _format_brl(value: float) -> str:
+    return f"{value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def build_access_key(cuf: str, year: int, month: int, cnpj: str, serie: int, numero: int, codigo: int) -> str:
+    digits = ''.join(ch for ch in cnpj if ch.isdigit())[-14:]
+    key43 = f"{cuf}{year % 100:02d}{month:02d}{digits}55{serie:03d}{numero:09d}1{codigo:08d}"
+    return key43 + access_key_check_digit(key43)
+
+
+def random_spec(rng: random.Random, pages: int = 1) -> Dict[str, Any]:
+    """Sorteia os dados de uma DANFE com o número de páginas pedido."""
+    remetente = rng.choice(REMETENTES)
+    destinatario = rng.choice(DESTINATARIOS)
+    numero = rng.randint(1, 999999)
+    serie = rng.randint(1, 9)
+    dia, mes, ano = rng.randint(1, 28), rng.randint(1, 12), rng.choice([2024, 2025])
+
+    item_count = FIRST_PAGE_ITEMS if pages == 1 else FIRST_PAGE_ITEMS + NEXT_PAGE_ITEMS * (pages - 1)
+    if pages == 1:
+        item_count = rng.randint(1, FIRST_PAGE_ITEMS)
+    products = []
+    total = 0.0
+    for i in range(item_count):
+        quantidade = rng.randint(1, 5)
+        unitario = round(rng.uniform(20, 3000), 2)
+        valor = round(quantidade * unitario, 2)
+        total += valor
+        products.append({
+            'codigo': f"{999999000 + i + 1}",
+            'descricao': rng.choice(DESCRICOES),
+            'ncm': '84713012',
+            'cst': '000',
+            'cfop': '6552',
+            'unidade': 'UN',
+            'quantidade': str(quantidade),
+            'valor_unitario': _format_brl(unitario),
+            'valor_total': _format_brl(valor),
+        })
+
+    spec: Dict[str, Any] = {}
+    spec.update({k: v for k, v in remetente.items() if k not in ('cuf', 'linha_cidade')})
+    if rng.random() < 0.25:
+        spec['remetente_nome'] = spec['remetente_nome'].upper()
+    spec.update(destinatario)
+    spec.update({
+        'numero_nfe': str(numero),
+        'serie': str(serie),
+        'chave_acesso': build_access_key(remetente['cuf'], ano, mes, remetente['remetente_cnpj'],
+                                         serie, numero, rng.randint(0, 99999999)),
+        'data_emissao': f"{dia:02d}/{mes:02d}/{ano}",
+        'valor_total': _format_brl(total),
+        'natureza_operacao': rng.choice(NATUREZAS),
+        'produtos': products,
+        'paginas': pages,
+        '_linha_cidade': remetente['linha_cidade'],
+        # Layout variants
+        '_canhoto': rng.random() < 0.8,
+        '_rotulo_numero': rng.choice(['Nº', 'No']),
+    })
+    return spec
+
+
+def _box(c: canvas.Canvas, x0: float, top: float, x1: float, bottom: float, label: str, value: str = '') -> None:
+    c.rect(x0, PAGE_H - bottom, x1 - x0, bottom - top)
+    c.setFont('Helvetica', 5.5)
+    c.drawString(x0 + 2, PAGE_H - top - 7, label)
+    if value:
+        c.setFont('Helvetica', 8)
+        c.drawString(x0 + 2, PAGE_H - top - 17, value)
+
+
+def _section(c: canvas.Canvas, top: float, title: str) -> None:
+    c.setFont('Helvetica-Bold', 6.5)
+    c.drawString(LEFT, PAGE_H - top - 7, title)
+
+
+def _header(c: canvas.Canvas, spec: Dict[str, Any], page: int) -> float:
+    numero = f"{int(spec['numero_nfe']):09d}"
+    numero = f"{numero[:3]}.{numero[3:6]}.{numero[6:]}"
+    chave = ' '.join(spec['chave_acesso'][i:i + 4] for i in range(0, 44, 4))
+
+    if page == 1 and spec['_canhoto']:
+        _box(c, LEFT, 20, 470, 50, f"RECEBEMOS DE {spec['remetente_nome']} OS PRODUTOS CONSTANTES DA NOTA FISCAL INDICADA AO LADO")
+        c.setFont('Helvetica-Bold', 9)
+        c.drawString(480, PAGE_H - 30, 'NF-e')
+        c.setFont('Helvetica', 7)
+        c.drawString(480, PAGE_H - 40, f"{spec['_rotulo_numero']} {numero}")
+        c.drawString(480, PAGE_H - 48, f"SÉRIE {spec['serie']}")
+        top = 60
+    else:
+        top = 20
+
+    _box(c, LEFT, top, 250, top + 80, 'IDENTIFICAÇÃO DO EMITENTE')
+    c.setFont('Helvetica-Bold', 9)
+    c.drawString(LEFT + 6, PAGE_H - top - 22, spec['remetente_nome'])
+    c.setFont('Helvetica', 7.5)
+    c.drawString(LEFT + 6, PAGE_H - top - 34, spec['remetente_endereco'])
+    c.drawString(LEFT + 6, PAGE_H - top - 45, spec['_linha_cidade'])
+    c.drawString(LEFT + 6, PAGE_H - top - 56, 'Fone: (85) 3255-5000')
+
+    _box(c, 250, top, 350, top + 80, '')
+    c.setFont('Helvetica-Bold', 11)
+    c.drawString(275, PAGE_H - top - 14, 'DANFE')
+    c.setFont('Helvetica', 5.5)
+    c.drawString(255, PAGE_H - top - 23, 'DOCUMENTO AUXILIAR DA')
+    c.drawString(255, PAGE_H - top - 30, 'NOTA FISCAL ELETRÔNICA')
+    c.drawString(255, PAGE_H - top - 40, '0 - ENTRADA 1 - SAÍDA 1')
+    c.setFont('Helvetica-Bold', 7)
+    c.drawString(255, PAGE_H - top - 52, f"{spec['_rotulo_numero']} {numero}")
+    c.drawString(255, PAGE_H - top - 61, f"SÉRIE {spec['serie']}")
+    c.drawString(255, PAGE_H - top - 70, f"FOLHA {page}/{spec['paginas']}")
+
+    _box(c, 350, top, RIGHT, top + 40, 'CHAVE DE ACESSO')
+    c.setFont('Helvetica', 7.5)
+    c.drawString(354, PAGE_H - top - 20, chave)
+    _box(c, 350, top + 40, RIGHT, top + 80, 'Consulta de autenticidade no portal nacional da NF-e')
+
+    top += 80
+    _box(c, LEFT, top, 350, top + 22, 'NATUREZA DA OPERAÇÃO', spec['natureza_operacao'])
+    _box(c, 350, top, RIGHT, top + 22, 'PROTOCOLO DE AUTORIZAÇÃO DE USO', '123250000123456 01/07/2025 10:00:00')
+    top += 22
+    _box(c, LEFT, top, 200, top + 22, 'INSCRIÇÃO ESTADUAL', spec['remetente_ie'])
+    _box(c, 200, top, 380, top + 22, 'INSC. ESTADUAL DO SUBST. TRIB.')
+    _box(c, 380, top, RIGHT, top + 22, 'CNPJ', spec['remetente_cnpj'])
+    return top + 22
+
+
+def _destinatario(c: canvas.Canvas, spec: Dict[str, Any], top: float) -> float:
+    _section(c, top, 'DESTINATÁRIO / REMETENTE')
+    top += 9
+    _box(c, LEFT, top, 350, top + 22, 'NOME / RAZÃO SOCIAL', spec['destinatario_nome'])
+    _box(c, 350, top, 480, top + 22, 'CNPJ / CPF', spec['destinatario_cnpj'])
+    _box(c, 480, top, RIGHT, top + 22, 'DATA DA EMISSÃO', spec['data_emissao'])
+    top += 22
+    _box(c, LEFT, top, 280, top + 22, 'ENDEREÇO', spec['destinatario_endereco'])
+    _box(c, 280, top, 410, top + 22, 'BAIRRO / DISTRITO', spec['destinatario_bairro'])
+    _box(c, 410, top, 480, top + 22, 'CEP', spec['destinatario_cep'])
+    _box(c, 480, top, RIGHT, top + 22, 'DATA DA SAÍDA/ENTRADA', spec['data_emissao'])
+    top += 22
+    _box(c, LEFT, top, 250, top + 22, 'MUNICÍPIO', spec['destinatario_municipio'])
+    _box(c, 250, top, 290, top + 22, 'UF', spec['destinatario_uf'])
+    _box(c, 290, top, 380, top + 22, 'FONE / FAX')
+    _box(c, 380, top, 480, top + 22, 'INSCRIÇÃO ESTADUAL', spec['destinatario_ie'])
+    _box(c, 480, top, RIGHT, top + 22, 'HORA DA SAÍDA', '10:00:00')
+    return top + 22
+
+
+def _imposto(c: canvas.Canvas, spec: Dict[str, Any], top: float) -> float:
+    _section(c, top, 'CÁLCULO DO IMPOSTO')
+    top += 9
+    width = (RIGHT - LEFT) / 5
+    labels = ['BASE DE CÁLCULO DO ICMS', 'VALOR DO ICMS', 'BASE DE CÁLC. ICMS S.T.', 'VALOR DO ICMS SUBST.',
+              'VALOR TOTAL DOS PRODUTOS']
+    for i, label in enumerate(labels):
+        value = spec['valor_total'] if i == 4 else '0,00'
+        _box(c, LEFT + i * width, top, LEFT + (i + 1) * width, top + 22, label, value)
+    top += 22
+    labels = ['VALOR DO FRETE', 'VALOR DO SEGURO', 'DESCONTO', 'VALOR DO IPI', 'VALOR TOTAL DA NOTA']
+    for i, label in enumerate(labels):
+        value = spec['valor_total'] if i == 4 else '0,00'
+        _box(c, LEFT + i * width, top, LEFT + (i + 1) * width, top + 22, label, value)
+    top += 22
+    _section(c, top, 'TRANSPORTADOR / VOLUMES TRANSPORTADOS')
+    top += 9
+    _box(c, LEFT, top, 300, top + 22, 'NOME / RAZÃO SOCIAL', 'TRANSPORTADORA EXEMPLO LTDA')
+    _box(c, 300, top, RIGHT, top + 22, 'FRETE POR CONTA', '0-Emitente')
+    return top + 22
+
+
+PRODUCT_COLUMNS = [
+    ('CÓDIGO', 'codigo', 52),
+    ('DESCRIÇÃO DO PRODUTO / SERVIÇO', 'descricao', 150),
+    ('NCM/SH', 'ncm', 42),
+    ('CST', 'cst', 24),
+    ('CFOP', 'cfop', 26),
+    ('UN', 'unidade', 20),
+    ('QUANT', 'quantidade', 34),
+    ('VALOR UNIT', 'valor_unitario', 55),
+    ('VALOR TOTAL', 'valor_total', 55),
+    ('ALÍQ. ICMS', None, 40),
+    ('ALÍQ. IPI', None, 57),
+]
+
+
+def _produtos(c: canvas.Canvas, items: List[Dict[str, str]], top: float) -> float:
+    _section(c, top, 'DADOS DO(S) PRODUTO(S) / SERVIÇO(S)')
+    top += 9
+    xs = [LEFT]
+    for _, _, width in PRODUCT_COLUMNS:
+        xs.append(xs[-1] + width)
+    rows = len(items) + 1
+    bottom = top + rows * ROW_H
+    for x in xs:
+        c.line(x, PAGE_H - top, x, PAGE_H - bottom)
+    for r in range(rows + 1):
+        y = PAGE_H - (top + r * ROW_H)
+        c.line(xs[0], y, xs[-1], y)
+    c.setFont('Helvetica', 5.5)
+    for i, (label, _, _) in enumerate(PRODUCT_COLUMNS):
+        c.drawString(xs[i] + 2, PAGE_H - top - 8, label)
+    c.setFont('Helvetica', 6.5)
+    for r, item in enumerate(items, start=1):
+        y = PAGE_H - top - r * ROW_H - 8
+        for i, (_, key, _) in enumerate(PRODUCT_COLUMNS):
+            value = item[key] if key else ('12,00%' if i == 9 else '0,00%')
+            c.drawString(xs[i] + 2, y, value)
+    return bottom
+
+
+def _adicionais(c: canvas.Canvas, spec: Dict[str, Any], top: float) -> None:
+    _section(c, top, 'DADOS ADICIONAIS')
+    top += 9
+    _box(c, LEFT, top, 400, top + 60, 'INFORMAÇÕES COMPLEMENTARES')
+    c.setFont('Helvetica', 6.5)
+    c.drawString(LEFT + 4, PAGE_H - top - 18, f"Pedido de transferencia loja {spec['loja']}")
+    c.drawString(LEFT + 4, PAGE_H - top - 27, 'Documento emitido por ME ou EPP optante pelo Simples Nacional')
+    _box(c, 400, top, RIGHT, top + 60, 'RESERVADO AO FISCO')
+
+
+def build_danfe(spec: Dict[str, Any], target=None) -> BytesIO:
+    """Desenha a DANFE descrita em ``spec`` e devolve o PDF em memória."""
+    buffer = target if target is not None else BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    products = spec['produtos']
+    start = 0
+    for page in range(1, spec['paginas'] + 1):
+        top = _header(c, spec, page)
+        if page == 1:
+            top = _destinatario(c, spec, top + 4)
+            top = _imposto(c, spec, top + 4)
+            count = FIRST_PAGE_ITEMS
+        else:
+            count = NEXT_PAGE_ITEMS
+        items = products[start:start + count]
+        start += count
+        top = _produtos(c, items, top + 4)
+        if page == 1:
+            _adicionais(c, spec, top + 4)
+        c.showPage()
+    c.save()
+    if target is None:
+        buffer.seek(0)
+    return buffer
+
+
+def _digits(value: str) -> str:
+    return ''.join(ch for ch in value if ch.isdigit())
+
+
+def _decimal(value: str) -> str:
+    # 1.234,56 -> 1234.56, as the XML carries values
+    return value.replace('.', '').replace(',', '.')
+
+
+def build_nfe_xml(spec: Dict[str, Any]) -> bytes:
+    """
+    Monta o XML autorizado (``nfeProc``) da nota descrita em ``spec``, com os
+    mesmos dados da DANFE de ``build_danfe``.
+    """
+    root = ET.Element(f'{{{NFE_NAMESPACE}}}nfeProc', versao='4.00')
+
+    def add(parent: ET.Element, tag: str, text: Optional[str] = None, **attrs: str) -> ET.Element:
+        element = ET.SubElement(parent, f'{{{NFE_NAMESPACE}}}{tag}', attrs)
+        if text is not None:
+            element.text = text
+        return element
+
+    def party(parent: ET.Element, group: str, prefix: str) -> None:
+        element = add(parent, group)
+        add(element, 'CNPJ', _digits(spec[f'{prefix}_cnpj'])[-14:])
+        add(element, 'xNome', spec[f'{prefix}_nome'])
+        address = add(element, f"ender{group.capitalize()}")
+        # The DANFE prints xLgr, nro and xCpl joined by ", "
+        for tag, part in zip(('xLgr', 'nro', 'xCpl'), spec[f'{prefix}_endereco'].split(', ', 2)):
+            add(address, tag, part)
+        add(address, 'xBairro', spec[f'{prefix}_bairro'])
+        add(address, 'xMun', spec[f'{prefix}_municipio'])
+        add(address, 'UF', spec[f'{prefix}_uf'])
+        add(address, 'CEP', _digits(spec[f'{prefix}_cep']))
+        add(element, 'IE', spec[f'{prefix}_ie'])
+
+    nfe = add(root, 'NFe')
+    info = add(nfe, 'infNFe', versao='4.00', Id=f"NFe{spec['chave_acesso']}")
+    ide = add(info, 'ide')
+    day, month, year = spec['data_emissao'].split('/')
+    add(ide, 'natOp', spec['natureza_operacao'])
+    add(ide, 'serie', spec['serie'])
+    add(ide, 'nNF', spec['numero_nfe'])
+    add(ide, 'dhEmi', f"{year}-{month}-{day}T10:00:00-03:00")
+    party(info, 'emit', 'remetente')
+    party(info, 'dest', 'destinatario')
+
+    for number, item in enumerate(spec['produtos'], start=1):
+        det = add(info, 'det', nItem=str(number))
+        prod = add(det, 'prod')
+        add(prod, 'cProd', item['codigo'])
+        add(prod, 'xProd', item['descricao'])
+        add(prod, 'NCM', item['ncm'])
+        add(prod, 'CFOP', item['cfop'])
+        add(prod, 'uCom', item['unidade'])
+        add(prod, 'qCom', f"{int(item['quantidade'])}.0000")
+        add(prod, 'vUnCom', _decimal(item['valor_unitario']))
+        add(prod, 'vProd', _decimal(item['valor_total']))
+        icms = add(add(add(det, 'imposto'), 'ICMS'), f"ICMS{item['cst'][1:]}")
+        add(icms, 'orig', item['cst'][0])
+        add(icms, 'CST', item['cst'][1:])
+
+    add(add(add(info, 'total'), 'ICMSTot'), 'vNF', _decimal(spec['valor_total']))
+    add(add(info, 'infAdic'), 'infCpl', f"Pedido de transferencia loja {spec['loja']}")
+    protocol = add(add(root, 'protNFe', versao='4.00'), 'infProt')
+    add(protocol, 'chNFe', spec['chave_acesso'])
+    return ET.tostring(root, encoding='utf-8', xml_declaration=True)
+
+
+def ground_truth(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos que o extrator deve encontrar na DANFE gerada a partir de ``spec``."""
+    return {k: v for k, v in spec.items() if not k.startswith('_')}
+
+
+def generate_corpus(out_dir: str, count: int, max_pages: int = 50, seed: int = 42) -> List[str]:
+    """
+    Grava ``count`` DANFEs em ``out_dir``, cada uma com o gabarito num
+    ``.json`` de mesmo nome. Uma em cada três notas tem de 1 a
+    ``max_pages`` páginas; as demais, uma página.
+
+    Returns:
+        List[str]: Caminhos dos PDFs gerados
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        pages = 1 if i % 3 else rng.randint(1, max_pages)
+        spec = random_spec(rng, pages)
+        path = os.path.join(out_dir, f"danfe_{i:04d}.pdf")
+        with open(path, 'wb') as handle:
+            build_danfe(spec, handle)
+        with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as handle:
+            json.dump(ground_truth(spec), handle, ensure_ascii=False)
+        paths.append(path)
+    return paths
+
+
+def load_corpus(paths: List[str]) -> List[Tuple[str, bytes, Optional[Dict[str, Any]]]]:
+    """
+    Lê PDFs (ou pastas com PDFs) e o gabarito ``.json`` de cada um, se houver.
+
+    Returns:
+        List[Tuple[str, bytes, Optional[Dict[str, Any]]]]: Caminho, conteúdo e gabarito
+    """
+    documents = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.pdf'))) if os.path.isdir(path) else [path]
+        for file_path in files:
+            with open(file_path, 'rb') as handle:
+                pdf_bytes = handle.read()
+            truth = None
+            truth_path = os.path.splitext(file_path)[0] + '.json'
+            if os.path.exists(truth_path):
+                with open(truth_path, 'r', encoding='utf-8') as handle:
+                    truth = json.load(handle)
+            documents.append((file_path, pdf_bytes, truth))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('count', nargs='?', type=int, default=10)
+    parser.add_argument('--max-pages', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.out_dir, args.count, args.max_pages, args.seed)
+    print(f"{len(paths)} DANFEs gravadas em {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Mede a vazão e a latência de cada etapa do fluxo (extração da DANFE e
+geração da capa em PDF e DOCX) e o acerto dos campos contra o gabarito.
+O resultado é gravado em JSON para comparar execuções.
+
+Uso:
+    python benchmarks/run_benchmarks.py pasta/ [arquivo.pdf ...] [--output resultado.json]
+    python benchmarks/run_benchmarks.py --generate 30 [--max-pages 50] [--baseline anterior.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from danfe_extractor import EXTRACTOR_VERSION, DANFEExtractor
+from docx_generator import DOCXGenerator
+from metrics import registry
+from receipt_generator import ReceiptGenerator
+from danfe_corpus import generate_corpus, load_corpus
+
+# Ground truth keys that are not header fields read by the extractor
+NON_FIELD_KEYS = ('produtos', 'paginas')
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(latencies: List[float], pages: int = 0) -> Dict[str, Any]:
+    total = sum(latencies)
+    stats = {
+        'documentos': len(latencies),
+        'total_s': total,
+        'docs_por_s': len(latencies) / total if total else None,
+        'media_ms': total / len(latencies) * 1e3,
+        'p50_ms': percentile(latencies, 0.5) * 1e3,
+        'p95_ms': percentile(latencies, 0.95) * 1e3,
+        'max_ms': max(latencies) * 1e3,
+    }
+    if pages:
+        stats['paginas_por_s'] = pages / total if total else None
+    return stats
+
+
+def timed(func, repeat: int):
+    """Executa ``func`` ``repeat`` vezes e devolve o último resultado e o menor tempo."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def run(documents, extractor: DANFEExtractor, repeat: int) -> Dict[str, Any]:
+    receipt_generator = ReceiptGenerator()
+    docx_generator = DOCXGenerator()
+
+    latencies: Dict[str, List[float]] = {'extracao_capa': [], 'extracao_completa': [], 'capa_pdf': [], 'capa_docx': []}
+    pages = 0
+    field_hits: Dict[str, List[int]] = {}
+    item_hits = item_total = item_count_ok = failures = 0
+
+    for path, pdf_bytes, truth in documents:
+        # The path used by the app: header only, pages read on demand
+        _, elapsed = timed(lambda: extractor.extract_from_pdf(pdf_bytes, lazy=True, include_products=False), repeat)
+        latencies['extracao_capa'].append(elapsed)
+
+        data, elapsed = timed(lambda: extractor.extract_from_pdf(pdf_bytes), repeat)
+        latencies['extracao_completa'].append(elapsed)
+        if not data:
+            failures += 1
+            print(f"Falha na extração: {path}")
+            continue
+        pages += data['total_paginas']
+
+        generation_data = dict(data, volume_number='1/1')
+        _, elapsed = timed(lambda: receipt_generator.generate_receipt(generation_data), repeat)
+        latencies['capa_pdf'].append(elapsed)
+        _, elapsed = timed(lambda: docx_generator.generate_receipt(generation_data), repeat)
+        latencies['capa_docx'].append(elapsed)
+
+        if truth:
+            for field, expected in truth.items():
+                if field in NON_FIELD_KEYS:
+                    continue
+                hits = field_hits.setdefault(field, [0, 0])
+                hits[0] += str(data.get(field)) == str(expected)
+                hits[1] += 1
+
+            expected_items = truth.get('produtos', [])
+            found_items = data.get('produtos', [])
+            item_count_ok += len(found_items) == len(expected_items)
+            item_total += len(expected_items)
+            item_hits += sum(
+                all(found.get(key) == value for key, value in expected.items())
+                for found, expected in zip(found_items, expected_items)
+            )
+
+    stages = {}
+    for stage, values in latencies.items():
+        if values:
+            stages[stage] = summarize(values, pages if stage == 'extracao_completa' else 0)
+
+    checked = sum(total for _, total in field_hits.values())
+    accuracy = {
+        'campos': {field: hits / total for field, (hits, total) in sorted(field_hits.items())},
+        'campos_geral': sum(hits for hits, _ in field_hits.values()) / checked if checked else None,
+        'itens': item_hits / item_total if item_total else None,
+        'notas_com_todos_os_itens': item_count_ok / len(documents) if field_hits else None,
+    }
+    return {'paginas': pages, 'falhas': failures, 'etapas': stages, 'acerto': accuracy}
+
+
+def print_report(result: Dict[str, Any], baseline: Dict[str, Any] = None) -> None:
+    print(f"documentos: {result['documentos']} ({result['paginas']} páginas), falhas: {result['falhas']}")
+    print(f"{'etapa':<20} {'docs/s':>9} {'média ms':>10} {'p50 ms':>9} {'p95 ms':>9} {'Δ docs/s':>10}")
+    for stage, stats in result['etapas'].items():
+        delta = ''
+        previous = (baseline or {}).get('etapas', {}).get(stage)
+        if previous and previous.get('docs_por_s') and stats['docs_por_s']:
+            delta = f"{(stats['docs_por_s'] / previous['docs_por_s'] - 1) * 100:+9.1f}%"
+        print(
+            f"{stage:<20} {stats['docs_por_s']:9.2f} {stats['media_ms']:10.1f} "
+            f"{stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {delta:>10}"
+        )
+
+    accuracy = result['acerto']
+    if accuracy['campos_geral'] is not None:
+        print(f"acerto dos campos: {accuracy['campos_geral'] * 100:.1f}%")
+        for field, ratio in accuracy['campos'].items():
+            if ratio < 1:
+                print(f"  {field:<26} {ratio * 100:6.1f}%")
+    if accuracy['itens'] is not None:
+        print(f"acerto dos itens:  {accuracy['itens'] * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='PDFs ou pastas com PDFs (com gabarito .json opcional)')
+    parser.add_argument('--generate', type=int, metavar='N', help='Gera N DANFEs sintéticas numa pasta temporária')
+    parser.add_argument('--max-pages', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--engine', default='pdfplumber', help='pdfplumber, pypdfium2 ou auto')
+    parser.add_argument('--regions', action='store_true', help='Usa a leitura por quadros')
+    parser.add_argument('--repeat', type=int, default=1, help='Repetições por medida (fica o menor tempo)')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='Resultado anterior para comparar')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = list(args.paths)
+        if args.generate:
+            generate_corpus(corpus_dir, args.generate, args.max_pages, args.seed)
+            paths.append(corpus_dir)
+        documents = load_corpus(paths)
+        if not documents:
+            sys.exit('Nenhum PDF encontrado.')
+
+        extractor = DANFEExtractor(regions=args.regions, engine=args.engine)
+        result = {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'versao_extrator': EXTRACTOR_VERSION,
+            'opcoes': {
+                'engine': args.engine, 'regions': args.regions, 'repeat': args.repeat,
+                'generate': args.generate, 'max_pages': args.max_pages, 'seed': args.seed,
+            },
+            'documentos': len(documents),
+        }
+        registry.reset()
+        result.update(run(documents, extractor, args.repeat))
+        # Per-stage breakdown of the timings above
+        result['metricas'] = registry.snapshot()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as handle:
+            baseline = json.load(handle)
+
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(result, handle, ensure_ascii=False, indent=2)
+
+    print_report(result, baseline)
+    print(f"resultado gravado em {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+Processa uma pasta de DANFEs sem a interface do Streamlit, para rodar em
+agendadores (cron, tarefas noturnas).
+
+Cada PDF é extraído no pool de processos do DANFEExtractor; assim que um
+arquivo termina, seus dados entram no JSONL e a capa é gravada na pasta de
+saída. Um PDF com várias DANFEs emendadas (comum nos lotes das
+transportadoras) é separado nota a nota e as notas são extraídas em
+paralelo. XMLs de NF-e são lidos direto, antes dos PDFs, e a DANFE cuja
+chave de acesso já veio de um XML é pulada. No fim, mostra a vazão da
+execução.
+
+Uso:
+    python cli.py pasta/ ["notas/**/*.pdf" "notas/*.xml" ...] [--output-dir capas] [--format pdf|docx|none]
+                  [--workers 4] [--single-file] [--products] [--engine auto] [--table notas.parquet]
+                  [--no-split] [--metrics metricas.json]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+from batch_table import EXPORT_FORMATS, export_table, records_table
+from cover_archive import cover_filename
+from danfe_extractor import DANFEExtractor, shutdown_process_pool
+from danfe_record import DANFERecord
+from docx_generator import DOCXGenerator
+from metrics import logger as metrics_logger, record_error, registry
+from nfe_xml import HEAD_SIZE, is_nfe_xml
+from receipt_generator import ReceiptGenerator
+
+FORMATS = ('pdf', 'docx', 'none')
+EXTENSIONS = ('.pdf', '.xml')
+
+
+def find_documents(inputs: List[str]) -> List[str]:
+    """
+    Expande as entradas da linha de comando em caminhos de PDF e de XML da NF-e.
+
+    XMLs de outros documentos (CT-e, eventos) são deixados de fora.
+
+    Args:
+        inputs (List[str]): Pastas (lidas sem recursão), padrões glob
+            (``**`` desce nas subpastas) ou arquivos
+
+    Returns:
+        List[str]: Caminhos sem repetição, em ordem alfabética
+    """
+    paths = set()
+    for entry in inputs:
+        if os.path.isdir(entry):
+            candidates = [os.path.join(entry, name) for name in os.listdir(entry)]
+        elif glob.has_magic(entry):
+            candidates = glob.glob(entry, recursive=True)
+        else:
+            candidates = [entry]
+
+        for path in candidates:
+            if path.lower().endswith(EXTENSIONS) and os.path.isfile(path):
+                if path.lower().endswith('.xml') and not is_xml_of_nfe(path):
+                    # CT-e and event XMLs often share the folder with the notes
+                    print(f"Ignorado (XML que não é de NF-e): {path}", file=sys.stderr)
+                    continue
+                paths.add(os.path.normpath(path))
+            elif path == entry:
+                print(f"Ignorado (não é um PDF nem um XML): {entry}", file=sys.stderr)
+    return sorted(paths)
+
+
+def is_xml_of_nfe(path: str) -> bool:
+    try:
+        with open(path, 'rb') as handle:
+            return is_nfe_xml(handle.read(HEAD_SIZE))
+    except OSError:
+        # Unreadable: left in, so the run reports it as a failed file
+        return True
+
+
+def save_buffer(buffer, path: str) -> bool:
+    """Grava o arquivo gerado; False se a geração ou a gravação falhar."""
+    if buffer is None:
+        return False
+    try:
+        with open(path, 'wb') as handle:
+            handle.write(buffer.getvalue())
+    except OSError as e:
+        # One unwritable cover must not stop an unattended run
+        record_error('capa.gravacao', e)
+        return False
+    return True
+
+
+def write_cover(generator, data: DANFERecord, path: str) -> bool:
+    return save_buffer(generator.generate_receipt(data), path)
+
+
+def write_cover_batch(generator, records: List[DANFERecord], path: str) -> bool:
+    # Same one-file layout as the app's batch download
+    return save_buffer(generator.generate_batch(records, group_by_loja=True), path)
+
+
+def table_format(path: str) -> str:
+    """Formato da tabela pela extensão do arquivo."""
+    return os.path.splitext(path)[1].lower().lstrip('.')
+
+
+def table_path(path: str) -> str:
+    if table_format(path) not in EXPORT_FORMATS:
+        raise argparse.ArgumentTypeError(f"use .parquet ou .csv: {path}")
+    return path
+
+
+def extract_all(extractor: DANFEExtractor, paths: List[str],
+                args: argparse.Namespace) -> Iterator[Tuple[int, Optional[DANFERecord]]]:
+    """
+    Extrai os arquivos: primeiro os XMLs, lidos aqui mesmo, depois os PDFs no pool.
+
+    Yields:
+        Tuple[int, Optional[DANFERecord]]: Índice do arquivo em ``paths`` e os
+        dados extraídos, na ordem em que cada extração termina; um PDF com
+        várias DANFEs rende um resultado por nota
+    """
+    pdf_indexes = []
+    for index, path in enumerate(paths):
+        if path.lower().endswith('.xml'):
+            # Parsing the XML is cheaper than shipping it to a worker
+            yield index, extractor.extract_from_xml(path, include_products=args.products)
+        else:
+            pdf_indexes.append(index)
+
+    for position, data in extractor.extract_many(
+        [paths[index] for index in pdf_indexes], workers=args.workers,
+        lazy=not args.products, include_products=args.products, split=not args.no_split
+    ):
+        yield pdf_indexes[position], data
+
+
+def run(args: argparse.Namespace) -> int:
+    paths = find_documents(args.inputs)
+    if not paths:
+        print("Nenhum PDF ou XML encontrado.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jsonl_path = args.jsonl or os.path.join(args.output_dir, 'registros.jsonl')
+
+    generator: Optional[Any] = None
+    if args.format == 'pdf':
+        generator = ReceiptGenerator(fast=True)
+    elif args.format == 'docx':
+        generator = DOCXGenerator()
+
+    extractor = DANFEExtractor(regions=not args.no_regions, engine=args.engine)
+    records = []
+    table_records = []
+    used_names: set = set()
+    # Access key -> file it came from; XMLs go first, so a PDF of the same note is the one skipped
+    seen_keys = {}
+    extracted = failures = duplicates = pages = cover_failures = 0
+
+    print(f"{len(paths)} arquivos, {args.workers or os.cpu_count()} processos", file=sys.stderr)
+    start = time.perf_counter()
+
+    with open(jsonl_path, 'w', encoding='utf-8') as jsonl:
+        for index, data in extract_all(extractor, paths, args):
+            path = paths[index]
+            done = extracted + failures + duplicates + 1
+            if data is None:
+                failures += 1
+                print(f"[{done}] ERRO {path}", file=sys.stderr)
+                continue
+            if data.chave_acesso in seen_keys:
+                duplicates += 1
+                print(f"[{done}] {path}: mesma chave de {seen_keys[data.chave_acesso]}, pulado",
+                      file=sys.stderr)
+                continue
+            if data.chave_acesso:
+                seen_keys[data.chave_acesso] = path
+
+            extracted += 1
+            pages += data.total_paginas or 0
+            data = data.replace(filename=os.path.basename(path), volume_number=args.volume)
+            # One line per note, flushed so a reader can follow the run
+            jsonl.write(json.dumps(data.to_dict(), ensure_ascii=False) + '\n')
+            jsonl.flush()
+            if args.table:
+                table_records.append((index, data))
+
+            status = f"NF-e {data.get('numero_nfe', 'N/A')}, loja {data.get('loja', 'N/A')}"
+            if generator is not None:
+                if args.single_file:
+                    records.append(data)
+                else:
+                    filename = cover_filename(data, args.format, used_names)
+                    if write_cover(generator, data, os.path.join(args.output_dir, filename)):
+                        status += f" -> {filename}"
+                    else:
+                        cover_failures += 1
+                        status += " (erro ao gerar a capa)"
+            print(f"[{done}] {path}: {status}", file=sys.stderr)
+
+    if records:
+        filename = f"Capas_Frete_Lote_{len(records)}_NFs.{args.format}"
+        if write_cover_batch(generator, records, os.path.join(args.output_dir, filename)):
+            print(f"{len(records)} capas gravadas em {filename}", file=sys.stderr)
+        else:
+            cover_failures += len(records)
+            print("Erro ao gerar o arquivo único das capas.", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{extracted} extraídos, {failures} com erro, {duplicates} repetidos, {cover_failures} capas com erro, "
+        f"{pages} páginas em {elapsed:.1f} s "
+        f"({(extracted + failures + duplicates) / elapsed:.2f} notas/s, {pages / elapsed:.1f} páginas/s); "
+        f"registros em {jsonl_path}",
+        file=sys.stderr
+    )
+    if table_records:
+        # Back in input order; the pool yields files as they finish
+        table_records.sort(key=lambda item: item[0])
+        table = records_table(data for _, data in table_records)
+        export_table(table, table_format(args.table), args.table)
+        print(f"tabela de {len(table_records)} notas gravada em {args.table}", file=sys.stderr)
+    if args.metrics:
+        registry.dump(args.metrics)
+        print(f"métricas gravadas em {args.metrics}", file=sys.stderr)
+    return 1 if failures or cover_failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='Pastas, padrões glob ou arquivos PDF/XML')
+    parser.add_argument('--output-dir', default='capas', help='Pasta das capas e do JSONL (padrão: capas)')
+    parser.add_argument('--jsonl', help='Arquivo dos registros extraídos (padrão: <output-dir>/registros.jsonl)')
+    parser.add_argument('--format', choices=FORMATS, default='pdf', help='Formato das capas; none só extrai')
+    parser.add_argument('--single-file', action='store_true', help='Todas as capas num único arquivo, agrupadas por loja')
+    parser.add_argument('--workers', type=int, help='Processos de extração (padrão: número de CPUs)')
+    parser.add_argument('--engine', default='pdfplumber', help='pdfplumber, pypdfium2 ou auto')
+    parser.add_argument('--no-regions', action='store_true', help='Lê o texto corrido em vez dos quadros da DANFE')
+    parser.add_argument('--products', action='store_true', help='Lê todas as páginas e inclui os produtos no JSONL')
+    parser.add_argument('--volume', default='1/1', help='Volume impresso nas capas (padrão: 1/1)')
+    parser.add_argument('--no-split', action='store_true',
+                        help='Lê cada PDF como uma nota só, sem separar DANFEs emendadas')
+    parser.add_argument('--table', type=table_path, help='Grava também uma tabela das notas (.parquet ou .csv)')
+    parser.add_argument('--metrics', help='Grava os tempos por etapa e os contadores neste JSON')
+    parser.add_argument('--log-level', default='WARNING', help='DEBUG mostra uma linha JSON por etapa medida')
+    args = parser.parse_args()
+
+    # Only this project's logger follows --log-level; pdfminer's debug output stays off
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', stream=sys.stderr)
+    metrics_logger.setLevel(args.log_level.upper())
+
+    try:
+        sys.exit(run(args))
+    except KeyboardInterrupt:
+        print("Interrompido.", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        shutdown_process_pool()
+
+
+if __name__ == '__main__':
+    main()
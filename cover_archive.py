@@ -0,0 +1,79 @@
+"""
+Empacota as capas de um lote num único ZIP, gerando e gravando uma capa de
+cada vez: em memória fica só a capa atual e o próprio arquivo ZIP.
+"""
+import re
+import zipfile
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, Iterable, Optional, Set, Tuple
+
+# Anything but letters, digits, '.', '_' and '-': path separators, ':', spaces...
+UNSAFE_CHARS = re.compile(r'[^\w.-]+')
+
+
+def _name_part(value: Any) -> str:
+    """Trecho seguro para nome de arquivo; valores ausentes ou 'N/A' viram 'S_N'."""
+    part = UNSAFE_CHARS.sub('', str(value)) if value not in (None, '', 'N/A') else ''
+    return part.strip('.') or 'S_N'
+
+
+def cover_filename(data: Dict[str, Any], extension: str, used: Optional[Set[str]] = None) -> str:
+    """
+    Nome do arquivo da capa: ``Capa_Frete_NF{nf}_Loja{loja}.{extensão}``.
+
+    Número ou loja não lidos ('N/A') saem como ``S_N`` e caracteres de
+    caminho são removidos, então o nome serve tanto para gravar na pasta de
+    saída quanto como entrada do ZIP.
+
+    Args:
+        data (Dict[str, Any]): Dados da nota
+        extension (str): Extensão do arquivo, sem o ponto
+        used (Optional[Set[str]]): Nomes já usados no lote; se o nome se
+            repetir (mesma NF-e duas vezes), ganha um sufixo ``_2``, ``_3``...
+
+    Returns:
+        str: Nome do arquivo
+    """
+    base = f"Capa_Frete_NF{_name_part(data.get('numero_nfe'))}_Loja{_name_part(data.get('loja'))}"
+    filename = f"{base}.{extension}"
+    if used is not None:
+        copy = 1
+        while filename in used:
+            copy += 1
+            filename = f"{base}_{copy}.{extension}"
+        used.add(filename)
+    return filename
+
+
+def write_cover_archive(records: Iterable[Dict[str, Any]], generator: Any, extension: str,
+                        output: Optional[BinaryIO] = None) -> Tuple[BinaryIO, int]:
+    """
+    Gera as capas e grava cada uma no ZIP assim que fica pronta.
+
+    Args:
+        records: Dados de cada nota, como em ``generate_receipt``
+        generator: ``ReceiptGenerator`` ou ``DOCXGenerator``
+        extension (str): Extensão das capas (``pdf`` ou ``docx``)
+        output (Optional[BinaryIO]): Destino do ZIP (padrão: um BytesIO novo)
+
+    Returns:
+        Tuple[BinaryIO, int]: O destino, posicionado no início quando possível,
+        e o número de capas gravadas
+    """
+    output = output if output is not None else BytesIO()
+    # DOCX files are ZIP packages already; compressing them again only costs time
+    compression = zipfile.ZIP_STORED if extension == 'docx' else zipfile.ZIP_DEFLATED
+    used: Set[str] = set()
+    written = 0
+
+    with zipfile.ZipFile(output, 'w', compression) as archive:
+        for data in records:
+            buffer = generator.generate_receipt(data)
+            if buffer is None:
+                continue
+            archive.writestr(cover_filename(data, extension, used), buffer.getvalue())
+            written += 1
+
+    if output.seekable():
+        output.seek(0)
+    return output, written
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Mapping, Optional
+
+
+class CoverCache:
+    """
+    Capas já geradas, endereçadas pelo conteúdo da nota e pelo formato.
+
+    Fica em memória com descarte LRU, limitado em número de capas e em bytes,
+    para que baixar de novo a mesma capa não a gere outra vez. Qualquer
+    edição nos dados muda a chave, então uma capa desatualizada nunca volta.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(data: Mapping[str, Any], export_format: str) -> str:
+        """
+        Gera a chave do cache para uma capa.
+
+        Args:
+            data (Mapping[str, Any]): Dados da nota, como em ``generate_receipt``
+            export_format (str): Formato da capa (``PDF`` ou ``DOCX``)
+
+        Returns:
+            str: SHA-256 dos dados serializados, seguido do formato
+        """
+        content = json.dumps(dict(data), sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return f"{digest}-{export_format}"
+
+    def get(self, data: Mapping[str, Any], export_format: str) -> Optional[bytes]:
+        """Capa já gerada para estes dados e formato, ou None (sem gerar)."""
+        key = self.make_key(data, export_format)
+        with self._lock:
+            content = self._memory.get(key)
+            if content is not None:
+                self._memory.move_to_end(key)
+            return content
+
+    def get_or_render(self, data: Mapping[str, Any], export_format: str,
+                      render: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """
+        Devolve a capa em cache ou chama ``render`` e guarda o resultado.
+
+        Falhas de geração (None) não são guardadas.
+        """
+        key = self.make_key(data, export_format)
+        with self._lock:
+            content = self._memory.get(key)
+            if content is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return content
+            self.misses += 1
+
+        content = render()
+        if content is not None:
+            with self._lock:
+                self._remember(key, content)
+        return content
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._size = 0
+
+    def _remember(self, key: str, content: bytes) -> None:
+        if key in self._memory:
+            self._size -= len(self._memory[key])
+        self._memory[key] = content
+        self._memory.move_to_end(key)
+        self._size += len(content)
+        while self._memory and (len(self._memory) > self.max_entries or self._size > self.max_bytes):
+            _, dropped = self._memory.popitem(last=False)
+            self._size -= len(dropped)
@@ -1,105 +1,999 @@
 import pdfplumber
+import pdfplumber.utils
+import multiprocessing
+import os
 import re
-from typing import Dict, List, Any, Optional, Union
-from utils import clean_text, parse_currency, parse_date
+import threading
+from bisect import bisect_right
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from operator import itemgetter
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
+from danfe_record import DANFERecord
+from metrics import record_error, registry, stage, timed
+from nfe_xml import XMLSource, parse_nfe_xml
+from profiling import document_name, profiled, profiler
+from text_engines import DEFAULT_ENGINE, ENGINES, TextDocument, copy_pages, open_document
+from utils import clean_text, decode_access_key, parse_currency, parse_date
+
+# Bump whenever a change alters extracted values, so cached results are not reused.
+EXTRACTOR_VERSION = '8'
+
+# Fields printed on page 1 of every DANFE. Names are only recognised for a few
+# known parties, so completeness checks use the fields below instead.
+HEADER_FIELDS = (
+    'numero_nfe',
+    'serie',
+    'chave_acesso',
+    'valor_total',
+    'remetente_nome',
+    'remetente_cnpj',
+    'destinatario_nome',
+    'destinatario_cnpj',
+)
+
+# Fields a valid chave de acesso carries (see decode_access_key). Every DANFE
+# prints the chave, whatever the emitter, and repeats it on each page: lazy
+# extraction reads pages only until one decodes, and a decoded chave found on
+# a later page replaces label guesses from earlier ones.
+KEY_FIELDS = (
+    'numero_nfe',
+    'serie',
+    'chave_acesso',
+    'remetente_cnpj',
+    'remetente_uf',
+)
+
+# Fields both text engines resolve on any DANFE; with engine='auto' the
+# pdfplumber pass only runs while one is missing or the chave does not decode.
+ENGINE_FIELDS = (
+    'chave_acesso',
+    'valor_total',
+    'remetente_cnpj',
+    'destinatario_cnpj',
+)
+
+# Compiled once per process and shared by every DANFEExtractor. Label patterns
+# match the value that follows a label found by FieldIndex, anchored at the
+# label's end.
+PATTERNS = {
+    'whitespace': re.compile(r'\s+'),
+    'digit': re.compile(r'\d'),
+    'non_digit': re.compile(r'\D'),
+    'branch': re.compile(r'\/(\d{4})-\d{2}'),
+    'nfe_prefix': re.compile(r'NF-e\s*$', re.IGNORECASE),
+    'numero': re.compile(r'\s*(\d+)'),
+    'numero_serie': re.compile(r'\s*(\d+)\s*SÉRIE', re.IGNORECASE),
+    'numero_curto': re.compile(r'\s+(\d{1,8})(?:\s|SÉRIE)', re.IGNORECASE),
+    'serie': re.compile(r'\s+(\d+)'),
+    'valor_total': re.compile(r'\s+(\d{1,3}(?:\.\d{3})+,\d{2}|\d+[.,]\d+)'),
+    'data_emissao': re.compile(r'\s+(\d{2}/\d{2}/\d{4})'),
+    'natureza': re.compile(r'\s+([^\n\r]+)'),
+    'ie': re.compile(r'\s+(\d+)'),
+    'inscricao': re.compile(r'\s+(\d+)'),
+    'endereco_recife': re.compile(r'\s*(\d+)'),
+    # "FOLHA 1/3": the first page of a note, for bundles whose keys are unreadable
+    'primeira_folha': re.compile(r'FOLHA\s*0*1\s*(?:/|DE)\s*\d', re.IGNORECASE),
+}
+
+# Labels recorded by FieldIndex, with the casings seen in DANFEs.
+SCAN_LABELS = {
+    'DANFE': 'danfe',
+    'Danfe': 'danfe',
+    'SÉRIE': 'serie',
+    'VALOR TOTAL DA NOTA': 'valor_total',
+    'DATA DA EMISSÃO': 'data_emissao',
+    'NATUREZA DA OPERAÇÃO': 'natureza',
+    'INSCRIÇÃO ESTADUAL': 'ie',
+    'Inscrição Estadual': 'ie',
+    'INSCRIÇÃO': 'inscricao',
+    'Empreendimentos Pague Menos S.A.': 'remetente_nome',
+    'EMPREENDIMENTOS PAGUE MENOS S.A.': 'remetente_nome',
+    'AV DEZESSETE DE AGOSTO,': 'endereco_recife',
+    'Av Dezessete de Agosto,': 'endereco_recife',
+}
+
+# Every alternative starts with a literal character, which lets sre skip ahead
+# to candidate positions instead of trying each branch at every character of
+# the (mostly numeric) product table. Structured values are therefore anchored
+# on their separator and their leading digits are checked with a lookbehind;
+# FieldIndex adds those digits back.
+_SCANNER = re.compile(
+    r'/(?<=\d{3}\.\d{3}\.\d{3}/)(?P<cnpj>\d{4}-\d{2})'
+    r'|/(?<=\d{2}/)(?P<data>\d{2}/\d{4})'
+    r'|-(?<=\d{2}\.\d{3}-)(?P<cep>\d{3})'
+    r'| (?<=\d{4} )(?P<chave>\d{4}(?:\s+\d{4}){9})'
+    r'|N[oOº](?=\s*\d)|n[oOº](?=\s*\d)'
+    r'|' + '|'.join(re.escape(label) for label in sorted(SCAN_LABELS, key=len, reverse=True))
+)
+
+# Digits in front of each structured value's separator.
+_SCAN_PREFIX = {'cnpj': 11, 'data': 2, 'cep': 6, 'chave': 4}
+
+
+class FieldIndex:
+    """Ocorrências de chave, CNPJ, CEP, datas e rótulos do texto, coletadas em uma única passada."""
+    
+    __slots__ = ('text', 'chaves', 'cnpjs', 'ceps', 'datas', 'labels')
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.chaves: List[str] = []
+        self.cnpjs: List[str] = []
+        self.ceps: List[str] = []
+        self.datas: List[str] = []
+        self.labels: Dict[str, List[Tuple[int, int]]] = {}
+        
+        values = {'chave': self.chaves, 'cnpj': self.cnpjs, 'cep': self.ceps, 'data': self.datas}
+        for match in _SCANNER.finditer(text):
+            kind = match.lastgroup
+            if kind:
+                start, end = match.span()
+                values[kind].append(text[start - _SCAN_PREFIX[kind]:end])
+            else:
+                label = SCAN_LABELS.get(match.group(), 'numero')
+                self.labels.setdefault(label, []).append(match.span())
+    
+    def label_value(self, label: str, pattern: Optional[str] = None) -> Optional[str]:
+        """Valor logo após a primeira ocorrência do rótulo que casa com o padrão."""
+        value_pattern = PATTERNS[pattern or label]
+        for _, end in self.labels.get(label, ()):
+            match = value_pattern.match(self.text, end)
+            if match:
+                return match.group(1)
+        return None
+    
+    def label_text(self, label: str) -> Optional[str]:
+        """Texto da primeira ocorrência do rótulo."""
+        spans = self.labels.get(label)
+        if not spans:
+            return None
+        start, end = spans[0]
+        return self.text[start:end]
+
+
+# Section titles that open each DANFE box, located on the text lines of each page.
+BOX_TITLES = {
+    'destinatario': 'DESTINATÁRIO / REMETENTE',
+    'imposto': 'CÁLCULO DO IMPOSTO',
+    'transportador': 'TRANSPORTADOR / VOLUMES TRANSPORTADOS',
+    'produtos': 'DADOS DO(S) PRODUTO(S)',
+    'adicionais': 'DADOS ADICIONAIS',
+}
+
+# Labelled cells read on their own: the label sits at the top of the cell and
+# the value right below it.
+CELL_LABELS = {
+    'danfe': 'DANFE',
+    'chave': 'CHAVE DE ACESSO',
+    'natureza': 'NATUREZA DA OPERAÇÃO',
+    'valor_total': 'VALOR TOTAL DA NOTA',
+}
+
+# Height (pt) below a cell label that holds its value.
+CELL_HEIGHT = 14
+
+# Lines that close the INFORMAÇÕES COMPLEMENTARES box in the page text.
+ADDITIONAL_INFO_END = ('RESERVADO AO FISCO', 'IDENTIFICAÇÃO DO EMITENTE', 'RECEBEMOS DE', 'DADOS DO(S) PRODUTO(S)')
+
+# Vertical distance (pt) between chars still read as the same text line.
+LINE_TOLERANCE = 2
+
+# Product table headers (without spaces, as prefixes) and the fields they fill.
+PRODUCT_COLUMNS = (
+    ('CÓDIGO', 'codigo'),
+    ('CÓD.', 'codigo'),
+    ('DESCRIÇÃO', 'descricao'),
+    ('NCM', 'ncm'),
+    ('CST', 'cst'),
+    ('CSOSN', 'cst'),
+    ('O/CST', 'cst'),
+    ('CFOP', 'cfop'),
+    ('UN', 'unidade'),
+    ('QUANT', 'quantidade'),
+    ('QTD', 'quantidade'),
+    ('VALORUNIT', 'valor_unitario'),
+    ('V.UNIT', 'valor_unitario'),
+    ('VLR.UNIT', 'valor_unitario'),
+    ('VALORTOTAL', 'valor_total'),
+    ('V.TOTAL', 'valor_total'),
+    ('VLR.TOTAL', 'valor_total'),
+)
+
+PRODUCT_FIELDS = ('codigo', 'descricao', 'ncm', 'cst', 'cfop', 'unidade', 'quantidade', 'valor_unitario', 'valor_total')
+
+# A PDF given by path or held in memory (bytes, buffer or binary stream).
+PDFSource = Union[str, 'os.PathLike[str]', bytes, bytearray, memoryview, BinaryIO]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Devolve o pool de processos compartilhado, criando-o na primeira chamada.
+    
+    O pool é mantido entre chamadas para que os workers já estejam com o
+    pdfplumber importado; só é recriado se o número de workers mudar.
+    """
+    global _pool, _pool_workers
+    
+    workers = workers or os.cpu_count() or 1
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn keeps workers independent of the threads running in the parent (e.g. Streamlit)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    """Encerra o pool de processos compartilhado, se existir."""
+    global _pool, _pool_workers
+    
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+            _pool_workers = 0
+
+
+def _extract_in_worker(extractor: 'DANFEExtractor', source: Union[str, bytes], lazy: bool,
+                       include_products: bool, profile_settings: Dict[str, Any],
+                       notes: Optional[List[range]] = None, name: Optional[str] = None
+                       ) -> Tuple[List[Optional[DANFERecord]], Dict[str, Any]]:
+    # Sampling was decided by the submitting process
+    profiler.configure(**profile_settings)
+    # The worker's metrics travel back with the result (see collect_worker_result)
+    registry.reset()
+    if notes is None:
+        results = [extractor.extract_from_pdf(source, lazy=lazy, include_products=include_products, name=name)]
+    else:
+        results = [
+            extractor.extract_from_pdf(source, lazy=lazy, include_products=include_products, pages=pages, name=name)
+            for pages in notes
+        ]
+    return results, registry.export()
+
+
+def collect_worker_result(future: Future) -> List[Optional[DANFERecord]]:
+    """
+    Resultado de uma tarefa criada por ``DANFEExtractor.submit_many``.
+    
+    As métricas medidas no worker são somadas ao registro deste processo.
+    
+    Returns:
+        List[Optional[DANFERecord]]: Os dados de cada nota da tarefa, em
+        ordem de página (uma só, exceto nos PDFs com várias DANFEs)
+    """
+    results, worker_metrics = future.result()
+    registry.merge(worker_metrics)
+    return results
+
+
+def _chunks(notes: List[range], count: int) -> List[List[range]]:
+    """Divide as notas em até ``count`` grupos de páginas contíguas."""
+    size = -(-len(notes) // count)
+    return [notes[start:start + size] for start in range(0, len(notes), size)]
+
+
+def _source_size(source: PDFSource) -> Optional[int]:
+    """Tamanho do PDF em bytes, quando dá para saber sem lê-lo."""
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer().nbytes
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    return None
+
+
+def _picklable_source(source: PDFSource) -> Union[str, bytes]:
+    """Converte a origem do PDF em algo que possa ser enviado a outro processo."""
+    if isinstance(source, (str, bytes)):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    if hasattr(source, 'read'):
+        return source.read()
+    return os.fspath(source)
+
 
 class DANFEExtractor:
     
-    def __init__(self):
-        self.patterns = {
-            'numero_nfe': [
-                r'NF-e\s*(?:No|Nº)\s*(\d+)',
-                r'(?:No|Nº)\s*(\d+)\s*SÉRIE',
-                r'DANFE.*?N[oº]\s*(\d+)',
-                r'\bN[oº]\s+(\d{1,8})(?:\s|SÉRIE)'
-            ],
-            'serie': r'SÉRIE\s+(\d+)',
-            'chave_acesso': r'(\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})',
-            'data_emissao': r'DATA DA EMISSÃO\s+(\d{2}/\d{2}/\d{4})',
-            'valor_total': r'VALOR TOTAL DA NOTA\s+([\d.,]+)',
-            'cnpj': r'(\d{2,3}[\.-]\d{3}[\.-]\d{3}\/\d{4}-\d{2})',
-            'inscricao_estadual': r'INSCRIÇÃO ESTADUAL\s+(\d+)',
-            'natureza_operacao': r'NATUREZA DA OPERAÇÃO\s+(.+?)(?=\n|\r)',
-            'cep': r'(\d{2}\.\d{3}-\d{3})',
-            'fortaleza_remetente': r'(Empreendimentos Pague Menos S\.A\.)\s*(Rua Senador Pompeu,\s*1520)\s*(FORTALEZA)\s*(Centro)\/([A-Z]{2})\s*(\d{2}\.\d{3}-\d{3})',
-            'outro_remetente': r'(Empreendimentos Pague Menos S\.A\.)\s*([A-Za-z\s.,\d]+?,\s*\d+)\s+(.+?)\/([A-Z]{2})\s+(\d{2}\.\d{3}-\d{3})',
-            'destinatario_block': r'DESTINATÁRIO\s*\/\s*REMETENTE([\s\S]*?)CÁLCULO DO IMPOSTO'
-        }
+    def __init__(self, regions: bool = False, engine: str = DEFAULT_ENGINE):
+        """
+        Args:
+            regions (bool): Lê apenas os quadros conhecidos da DANFE (emitente,
+                destinatário, chave, totais, produtos), localizados pelos
+                títulos na página 1, em vez do texto corrido das páginas.
+                Só se aplica ao motor ``pdfplumber``
+            engine (str): Motor de texto: ``pdfplumber`` (padrão), ``pypdfium2``
+                (texto nativo do PDFium, bem mais rápido) ou ``auto``, que tenta
+                o ``pypdfium2`` e refaz com o ``pdfplumber`` se faltar algum
+                campo do cabeçalho
+        """
+        if engine != 'auto' and engine not in ENGINES:
+            raise ValueError(f"Motor de texto desconhecido: {engine}")
+        
+        self.patterns = PATTERNS
+        self.regions = regions
+        self.engine = engine
     
-    def extract_from_pdf(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+    @profiled('extracao', document_name)
+    def extract_from_pdf(self, source: PDFSource, lazy: bool = False, include_products: bool = True,
+                         pages: Optional[range] = None, name: Optional[str] = None) -> Optional[DANFERecord]:
+        """
+        Extrai os dados de uma DANFE.
+        
+        O PDF inteiro é lido como uma nota; para PDFs com várias DANFEs
+        emendadas, use ``split`` em ``extract_many`` (ou ``split_notes`` e
+        ``pages``).
+        
+        Args:
+            source (PDFSource): Caminho do PDF ou seu conteúdo em memória
+                (bytes, bytearray, memoryview ou stream binário como BytesIO)
+            lazy (bool): Lê a página 1 primeiro e só avança para as demais
+                enquanto a chave de acesso, repetida em cada folha, não
+                decodificar; cada página é analisada uma vez só. Ignorado se
+                os produtos forem pedidos
+            include_products (bool): Extrai a lista de produtos (ver
+                ``iter_products``)
+            pages (Optional[range]): Só estas páginas (índices a partir de 0),
+                como em ``split_notes``; elas são copiadas para um PDF à
+                parte e lidas como um arquivo próprio
+            name (Optional[str]): Nome original do arquivo, usado só nos
+                arquivos de perfil quando ``source`` é conteúdo em memória
+            
+        Returns:
+            Optional[DANFERecord]: Dados extraídos, com ``paginas_processadas``,
+            ``total_paginas`` e ``motor_texto``, ou None em caso de erro
+        """
+        engines = ('pypdfium2', 'pdfplumber') if self.engine == 'auto' else (self.engine,)
+        
         try:
-            extracted_data: Dict[str, Any] = {}
+            if pages is not None:
+                # Opening a bundle in pdfplumber walks all of its pages; the note alone is cheap to open
+                with stage('pdf.copiar_paginas', paginas=len(pages)):
+                    source = copy_pages(source, pages)
+            if hasattr(source, 'read') and (len(engines) > 1 or (include_products and self.engine != 'pdfplumber')):
+                # The stream is read more than once: by each engine and by the product table reader
+                source = source.read()
             
-            with pdfplumber.open(pdf_path) as pdf:
-                # Extract text from all pages
-                full_text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                
-                if not full_text.strip():
+            with stage('extracao.documento', lazy=lazy, produtos=include_products) as info:
+                for engine in engines:
+                    with stage('pdf.abrir', motor=engine):
+                        document = open_document(source, engine)
+                    with document:
+                        extracted_data = self._extract_document(document, lazy, include_products)
+                    
+                    if extracted_data is not None:
+                        extracted_data['motor_texto'] = engine
+                        if engine == engines[-1] or self._engine_complete(extracted_data):
+                            break
+                else:
+                    registry.increment('extracao.falhas')
                     return None
                 
-                # Normalize text like in JavaScript (replace multiple spaces with single space)
-                norm_text = re.sub(r'\s+', ' ', full_text).strip()
-                
-                # Extract basic information
-                extracted_data = self._extract_basic_info(norm_text)
+                if include_products and 'produtos' not in extracted_data:
+                    # The product table needs char positions, which only pdfplumber provides
+                    extracted_data['produtos'] = list(self.iter_products(source))
+                    extracted_data['paginas_processadas'] = extracted_data['total_paginas']
                 
-                # Extract company information
-                company_info = self._extract_company_info(norm_text)
-                extracted_data.update(company_info)
-                
-                # Extract products
-                products = self._extract_products(norm_text)
-                extracted_data['produtos'] = products
-                
-                # Extract additional information
-                additional_info = self._extract_additional_info(norm_text)
-                extracted_data.update(additional_info)
-                
-                # Ensure all keys have non-null values like in JavaScript
-                for key, value in extracted_data.items():
-                    if value is None or str(value).strip() == "":
-                        extracted_data[key] = 'N/A'
-                
-                return extracted_data
+                info.update(
+                    motor=extracted_data['motor_texto'], bytes=_source_size(source),
+                    paginas=extracted_data['total_paginas'], paginas_lidas=extracted_data['paginas_processadas'],
+                )
+            
+            registry.increment('extracao.documentos')
+            registry.increment('pdf.paginas_lidas', extracted_data['paginas_processadas'])
+            registry.observe('pdf.paginas', extracted_data['total_paginas'])
+            if info['bytes'] is not None:
+                registry.observe('pdf.bytes', info['bytes'])
+            return DANFERecord.from_dict(extracted_data)
                 
         except Exception as e:
-            print(f"Erro ao extrair dados do PDF: {str(e)}")
+            record_error('extracao', e)
             return None
     
-    def _extract_basic_info(self, text: str) -> Dict[str, str]:
-        """Extrai informações básicas da DANFE."""
-        data = {}
+    @profiled('extracao', document_name)
+    def extract_from_xml(self, source: XMLSource, include_products: bool = True,
+                         name: Optional[str] = None) -> Optional[DANFERecord]:
+        """
+        Extrai os dados do XML da NF-e, sem PDF.
         
-        # Extract NF-e number with multiple fallback patterns
-        nfe_number = None
-        for pattern in self.patterns['numero_nfe']:
-            nfe_match = re.search(pattern, text, re.IGNORECASE)
-            if nfe_match:
-                nfe_number = nfe_match.group(1)
-                break
+        Os campos saem no mesmo formato de ``extract_from_pdf``, então a capa
+        gerada a partir do XML é igual à da DANFE impressa.
+        
+        Args:
+            source (XMLSource): Caminho do XML ou seu conteúdo em memória
+            include_products (bool): Extrai a lista de produtos (itens ``det``)
+            name (Optional[str]): Nome original do arquivo, usado só nos
+                arquivos de perfil
+            
+        Returns:
+            Optional[DANFERecord]: Dados extraídos, com ``motor_texto`` 'xml',
+            ou None se o arquivo não for uma NF-e válida
+        """
+        try:
+            with stage('extracao.xml', produtos=include_products) as info:
+                extracted_data = parse_nfe_xml(source, include_products)
+                extracted_data.update(self._store_info(extracted_data['destinatario_cnpj']))
+                extracted_data['motor_texto'] = 'xml'
+                info.update(itens=len(extracted_data.get('produtos', ())))
+            
+            registry.increment('extracao.documentos')
+            registry.increment('xml.documentos')
+            return DANFERecord.from_dict(extracted_data)
+        
+        except Exception as e:
+            record_error('extracao', e)
+            return None
+    
+    def _extract_document(self, document: TextDocument, lazy: bool,
+                          include_products: bool) -> Optional[Dict[str, Any]]:
+        """Extrai os dados de um PDF já aberto por um dos motores de texto."""
+        total_pages = len(document)
+        
+        if self.regions and document.engine == 'pdfplumber':
+            extracted_data, pages_read = self._extract_from_regions(document.pdf, include_products)
+            if extracted_data is not None:
+                extracted_data['paginas_processadas'] = pages_read
+                extracted_data['total_paginas'] = total_pages
+                return extracted_data
+            # Box layout not recognised: fall back to the page text
+        
+        page_texts: List[str] = []
+        products: Optional[List[Dict[str, str]]] = None
+        extracted_data: Optional[Dict[str, Any]] = None
+        page_by_page = lazy and not include_products
         
-        data['numero_nfe'] = nfe_number if nfe_number else 'N/A'
+        if include_products and document.engine == 'pdfplumber':
+            products = []
+            for page in document.iter_pages():
+                with stage('texto.pagina', motor=document.engine):
+                    page_texts.append(page.extract_text() or "")
+                # Read the product table while the page layout is still loaded
+                products.extend(self._page_products(page))
+        elif page_by_page:
+            for page_text in document.iter_page_texts():
+                page_texts.append(page_text)
+                # Each page is parsed once, on its own, and merged into what was found so far;
+                # later pages only repeat the header band, so stop once the chave decodes
+                extracted_data = self._merge_page(extracted_data, self._parse_text(page_text))
+                if extracted_data and self._chave_decoded(extracted_data):
+                    break
+        else:
+            page_texts.extend(document.iter_page_texts())
+        
+        if not page_by_page:
+            extracted_data = self._parse_text("\n".join(page_texts))
+        
+        if extracted_data is None:
+            return None
         
-        # Extract series
-        serie_match = re.search(self.patterns['serie'], text)
-        data['serie'] = serie_match.group(1) if serie_match else 'N/A'
+        if products is not None:
+            extracted_data['produtos'] = products
         
-        # Extract access key
-        chave_match = re.search(self.patterns['chave_acesso'], text)
-        data['chave_acesso'] = chave_match.group(1).replace(' ', '') if chave_match else 'N/A'
+        extracted_data['paginas_processadas'] = len(page_texts)
+        extracted_data['total_paginas'] = total_pages
+        
+        return extracted_data
+    
+    def iter_products(self, source: PDFSource) -> Iterator[Dict[str, str]]:
+        """
+        Lê os itens da tabela "DADOS DO(S) PRODUTO(S)" de todas as páginas.
+        
+        Os itens são devolvidos um a um e cada página é descartada depois de
+        lida, então a memória usada não cresce com o tamanho da nota.
+        
+        Args:
+            source (PDFSource): Caminho do PDF ou seu conteúdo em memória
+            
+        Yields:
+            Dict[str, str]: Um item, com os campos de ``PRODUCT_FIELDS``
+        """
+        with open_document(source, 'pdfplumber') as document:
+            yield from self._iter_pdf_products(document.pdf)
+    
+    def split_notes(self, source: PDFSource) -> List[range]:
+        """
+        Separa as notas de um PDF com várias DANFEs emendadas.
         
-        # Extract emission date (look for date pattern)
-        data_match = re.search(r'(\d{2}/\d{2}/\d{4})', text)
-        data['data_emissao'] = parse_date(data_match.group(1)) if data_match else 'N/A'
+        Cada página é lida pelo texto nativo do PDFium (rápido, sem layout):
+        uma nota começa na página cuja chave de acesso válida difere da nota
+        anterior ou, se a chave não puder ser lida, na que traz "FOLHA 1/".
+        Páginas sem nenhum dos dois continuam a nota anterior.
+        
+        Args:
+            source (PDFSource): Caminho do PDF ou seu conteúdo em memória
+            
+        Returns:
+            List[range]: Páginas (índices a partir de 0) de cada nota, em
+            ordem; uma só faixa com o PDF inteiro quando não há como separar
+        """
+        if hasattr(source, 'read'):
+            source = source.read()
+        
+        starts: List[int] = []
+        chave = None
+        with stage('pdf.separar_notas') as info:
+            with open_document(source, 'pypdfium2') as document:
+                total_pages = len(document)
+                # A single page holds at most one note: skip the text scan
+                page_texts = document.iter_page_texts() if total_pages > 1 else ()
+                for number, page_text in enumerate(page_texts):
+                    index = FieldIndex(PATTERNS['whitespace'].sub(' ', page_text))
+                    page_chave = next(
+                        (key['chave'] for key in map(decode_access_key, index.chaves) if key), None
+                    )
+                    first_sheet = PATTERNS['primeira_folha'].search(index.text) is not None
+                    
+                    if not starts:
+                        new_note = True
+                    elif page_chave:
+                        # A note whose first pages had no readable key takes the first one found
+                        new_note = page_chave != chave if chave else first_sheet
+                    else:
+                        new_note = first_sheet
+                    
+                    if new_note:
+                        starts.append(number)
+                        chave = page_chave
+                    elif page_chave:
+                        chave = page_chave
+            
+            if not starts:
+                starts.append(0)
+            info.update(paginas=total_pages, notas=len(starts))
+        
+        registry.observe('pdf.notas', len(starts))
+        ends = starts[1:] + [total_pages]
+        return [range(start, end) for start, end in zip(starts, ends)]
+    
+    def extract_many(self, paths_or_bytes: Iterable[PDFSource], workers: Optional[int] = None,
+                     lazy: bool = False, include_products: bool = True, split: bool = False,
+                     names: Optional[List[str]] = None) -> Iterator[Tuple[int, Optional[DANFERecord]]]:
+        """
+        Extrai várias DANFEs em paralelo no pool de processos compartilhado.
+        
+        Args:
+            paths_or_bytes: Caminhos ou conteúdos dos PDFs (aceita os mesmos
+                tipos que ``extract_from_pdf``)
+            workers (Optional[int]): Número de processos (padrão: número de CPUs)
+            lazy (bool): Repassado para ``extract_from_pdf``
+            include_products (bool): Repassado para ``extract_from_pdf``
+            split (bool): Separa as notas de PDFs com várias DANFEs (ver
+                ``submit_many``); cada nota sai como um resultado
+            names (Optional[List[str]]): Repassado para ``submit_many``
+            
+        Yields:
+            Tuple[int, Optional[DANFERecord]]: Índice do arquivo na entrada e
+            os dados extraídos, na ordem em que cada extração termina; com
+            ``split``, o mesmo índice se repete para cada nota do arquivo
+        """
+        futures = self.submit_many(paths_or_bytes, workers, lazy, include_products, split, names)
+        if not futures:
+            return
+        
+        try:
+            for future in as_completed(futures):
+                try:
+                    results = collect_worker_result(future)
+                except Exception as e:
+                    record_error('extracao', e)
+                    results = [None]
+                for result in results:
+                    yield futures[future], result
+        finally:
+            # Consumer stopped early: drop work that has not started yet
+            for future in futures:
+                future.cancel()
+    
+    def submit_many(self, paths_or_bytes: Iterable[PDFSource], workers: Optional[int] = None,
+                    lazy: bool = False, include_products: bool = True, split: bool = False,
+                    names: Optional[List[str]] = None) -> Dict[Future, int]:
+        """
+        Envia várias DANFEs ao pool de processos compartilhado sem esperar.
+        
+        Args:
+            paths_or_bytes: Caminhos ou conteúdos dos PDFs
+            workers (Optional[int]): Número de processos (padrão: número de CPUs)
+            lazy (bool): Repassado para ``extract_from_pdf``
+            include_products (bool): Repassado para ``extract_from_pdf``
+            split (bool): Separa aqui as notas de cada PDF (``split_notes``,
+                alguns ms por página) e divide as de um PDF com várias DANFEs
+                entre os workers, para que elas sejam extraídas em paralelo
+            names (Optional[List[str]]): Nome original de cada arquivo, na
+                ordem da entrada, usado nos arquivos de perfil dos conteúdos
+                em memória (os uploads do app)
+            
+        Returns:
+            Dict[Future, int]: Cada tarefa e o índice do arquivo na entrada
+            (um arquivo com várias notas pode ter várias tarefas); cancelar
+            uma tarefa que ainda não começou a tira da fila
+        """
+        sources = [_picklable_source(source) for source in paths_or_bytes]
+        if not sources:
+            return {}
+        
+        workers = workers or os.cpu_count() or 1
+        pool = get_process_pool(workers)
+        settings = profiler.task_settings('extracao')
+        futures = {}
+        for index, source in enumerate(sources):
+            name = names[index] if names else None
+            try:
+                notes = self.split_notes(source) if split else []
+            except Exception as e:
+                # Unreadable here too: the worker reports it while extracting the whole file
+                record_error('extracao.separar', e)
+                notes = []
+            if len(notes) < 2:
+                future = pool.submit(_extract_in_worker, self, source, lazy, include_products, settings, None, name)
+                futures[future] = index
+                continue
+            
+            # A path costs nothing to send: one note per task, so results stream in.
+            # Contents are pickled with every task: a few page-contiguous groups per worker.
+            groups = [[pages] for pages in notes] if isinstance(source, str) else _chunks(notes, workers * 4)
+            for group in groups:
+                future = pool.submit(_extract_in_worker, self, source, lazy, include_products, settings, group, name)
+                futures[future] = index
+        return futures
+    
+    def _extract_from_regions(self, pdf, include_products: bool) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Recorta os quadros da DANFE pela posição dos títulos e extrai o texto
+        só dessas regiões.
+        
+        Returns:
+            Tuple[Optional[Dict[str, Any]], int]: Dados extraídos (None se os
+            títulos não forem encontrados) e número de páginas lidas
+        """
+        page = pdf.pages[0]
+        with stage('texto.pagina', motor='pdfplumber', modo='regioes'):
+            chars = page.chars
+        lines = self._page_lines(chars)
+        
+        titles = {name: self._find_phrase(lines, phrase) for name, phrase in BOX_TITLES.items()}
+        if not titles['destinatario'] or not titles['imposto']:
+            return None, 1
+        
+        cells = {name: self._find_phrase(lines, phrase) for name, phrase in CELL_LABELS.items()}
+        width, height = page.width, page.height
+        
+        def top_of(*names: str) -> float:
+            for name in names:
+                if titles.get(name):
+                    return titles[name]['top']
+            return height
+        
+        destinatario_top = titles['destinatario']['top']
+        natureza = cells['natureza']
+        danfe = cells['danfe']
+        
+        boxes = {
+            'destinatario': (0, destinatario_top, width, titles['imposto']['top']),
+            'adicionais': (0, top_of('adicionais'), width, height),
+        }
+        if natureza:
+            # IE and CNPJ of the emitter sit in the row right below NATUREZA DA OPERAÇÃO
+            boxes['inscricoes'] = (0, natureza['top'], width, destinatario_top)
+        if danfe and natureza:
+            boxes['emitente'] = (0, danfe['top'] - 8, danfe['x0'] - 1, natureza['top'])
+        
+        cell_texts = {
+            name: self._cell_text(chars, cells[name], width)
+            for name in ('chave', 'natureza', 'valor_total') if cells[name]
+        }
+        
+        # The whole header band is only laid out when a box or a valid chave is missing
+        if (len(cell_texts) < 3 or 'emitente' not in boxes
+                or not decode_access_key(cell_texts['chave'])):
+            boxes['cabecalho'] = (0, 0, width, destinatario_top)
+        
+        texts = {name: self._crop_text(chars, bbox) for name, bbox in boxes.items()}
+        
+        products = None
+        pages_read = 1
+        if include_products:
+            # Page 1 keeps its parsed layout until here, so it is not read twice
+            products = list(self._iter_pdf_products(pdf))
+            pages_read = len(pdf.pages)
+        page.close()
+        
+        return self._parse_regions(texts, cell_texts, products), pages_read
+    
+    def _page_lines(self, chars: List[Dict[str, Any]]) -> List[Tuple[List[Dict[str, Any]], str]]:
+        """Agrupa os caracteres (sem espaços) em linhas, de cima para baixo e da esquerda para a direita."""
+        visible = [char for char in chars if not char['text'].isspace()]
+        return [
+            (line, ''.join(char['text'] for char in line))
+            for line in self._group_lines(visible)
+        ]
+    
+    def _group_lines(self, chars: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Agrupa caracteres pelo topo em uma passada sobre eles ordenados."""
+        lines: List[List[Dict[str, Any]]] = []
+        line_top = None
+        for char in sorted(chars, key=itemgetter('top')):
+            if line_top is None or char['top'] - line_top > LINE_TOLERANCE:
+                lines.append([])
+                line_top = char['top']
+            lines[-1].append(char)
+        for line in lines:
+            line.sort(key=itemgetter('x0'))
+        return lines
+    
+    def _find_phrase(self, lines: List[Tuple[List[Dict[str, Any]], str]], phrase: str) -> Optional[Dict[str, Any]]:
+        """Caixa da primeira ocorrência de ``phrase`` em uma mesma linha, ignorando espaços."""
+        target = phrase.replace(' ', '')
+        for line, text in lines:
+            start = text.find(target)
+            if start < 0:
+                continue
+            first, last = line[start], line[start + len(target) - 1]
+            return {
+                'x0': first['x0'], 'x1': last['x1'], 'top': first['top'], 'bottom': last['bottom'],
+                # Chars further right on the same line, used to bound the cell
+                'following': line[start + len(target):],
+            }
+        return None
+    
+    def _crop_text(self, chars: List[Dict[str, Any]], bbox: Tuple[float, float, float, float]) -> str:
+        """Texto dos caracteres inteiramente dentro de ``bbox``."""
+        x0, top, x1, bottom = bbox
+        inside = [
+            char for char in chars
+            if char['x0'] >= x0 and char['x1'] <= x1 and char['top'] >= top and char['bottom'] <= bottom
+        ]
+        # Only the chars of the box go through word/line layout
+        return pdfplumber.utils.extract_text(inside) if inside else ''
+    
+    def _cell_text(self, chars: List[Dict[str, Any]], label: Dict[str, Any], page_width: float) -> str:
+        """Valor de uma célula rotulada: o texto logo abaixo do rótulo, até o rótulo vizinho."""
+        right = next((char['x0'] for char in label['following'] if char['x0'] > label['x1'] + 2), page_width)
+        text = self._crop_text(chars, (label['x0'] - 1, label['bottom'] + 0.5, right, label['bottom'] + CELL_HEIGHT))
+        return PATTERNS['whitespace'].sub(' ', text).strip()
+    
+    def _iter_pdf_products(self, pdf) -> Iterator[Dict[str, str]]:
+        """Itens das tabelas de produtos, página a página."""
+        for page in pdf.pages:
+            yield from self._page_products(page)
+            # Drop the page's parsed layout objects before moving to the next one
+            page.close()
+    
+    @timed('produtos.pagina')
+    def _page_products(self, page) -> List[Dict[str, str]]:
+        """
+        Lê a tabela de produtos de uma página.
+        
+        As colunas vêm das linhas verticais da tabela e os nomes delas do
+        cabeçalho; cada linha de texto abaixo do cabeçalho é um item, ou a
+        continuação da descrição do item anterior quando não traz código.
+        Páginas sem linhas verticais caem no leitor por texto.
+        """
+        chars = page.chars
+        lines = self._page_lines(chars)
+        title = self._find_phrase(lines, BOX_TITLES['produtos'])
+        if not title:
+            return []
+        end = self._find_phrase(lines, BOX_TITLES['adicionais'])
+        top, bottom = title['bottom'], end['top'] if end else page.height
+        
+        columns = self._table_columns(page, top, bottom)
+        if len(columns) < 3:
+            return self._extract_products(self._crop_text(chars, (0, title['top'], page.width, bottom)))
+        
+        region = [char for char in chars if top < char['top'] and char['bottom'] <= bottom]
+        rows = [self._split_columns(line, columns) for line in self._group_lines(region)]
+        
+        # Column titles may wrap over several lines; the first line with digits is an item
+        header_rows = 0
+        while header_rows < len(rows) and not any(PATTERNS['digit'].search(cell) for cell in rows[header_rows]):
+            header_rows += 1
+        titles = [''.join(cells) for cells in zip(*rows[:header_rows])] if header_rows else []
+        fields = [self._product_field(title) for title in titles]
+        if 'codigo' not in fields:
+            return []
+        
+        products: List[Dict[str, str]] = []
+        for row in rows[header_rows:]:
+            values = {field: cell for field, cell in zip(fields, row) if field and cell}
+            if values.get('codigo'):
+                product = dict.fromkeys(PRODUCT_FIELDS, '')
+                product.update(values)
+                for field in ('valor_unitario', 'valor_total'):
+                    if product[field]:
+                        product[field] = parse_currency(product[field])
+                products.append(product)
+            elif products and values.get('descricao'):
+                products[-1]['descricao'] += ' ' + values['descricao']
+        return products
+    
+    def _table_columns(self, page, top: float, bottom: float) -> List[float]:
+        """Posições x das linhas verticais que cruzam a faixa da tabela."""
+        xs: List[float] = []
+        for edge in sorted(page.vertical_edges, key=itemgetter('x0')):
+            if edge['top'] < bottom and edge['bottom'] > top and edge['bottom'] - edge['top'] > 2:
+                if not xs or edge['x0'] - xs[-1] > 1:
+                    xs.append(edge['x0'])
+        return xs
+    
+    def _split_columns(self, line: List[Dict[str, Any]], columns: List[float]) -> List[str]:
+        """Distribui os caracteres de uma linha entre as colunas e monta o texto de cada uma."""
+        cells: List[List[Dict[str, Any]]] = [[] for _ in range(len(columns) - 1)]
+        for char in line:
+            column = bisect_right(columns, (char['x0'] + char['x1']) / 2) - 1
+            if 0 <= column < len(cells):
+                cells[column].append(char)
+        
+        texts = []
+        for cell in cells:
+            parts = []
+            previous = None
+            for char in cell:
+                # Some PDFs position words without space chars between them
+                if previous is not None and char['x0'] - previous['x1'] > char['size'] * 0.25:
+                    parts.append(' ')
+                parts.append(char['text'])
+                previous = char
+            texts.append(PATTERNS['whitespace'].sub(' ', ''.join(parts)).strip())
+        return texts
+    
+    def _product_field(self, header: str) -> Optional[str]:
+        """Campo do item para um título de coluna da tabela de produtos."""
+        label = header.replace(' ', '').upper()
+        for prefix, field in PRODUCT_COLUMNS:
+            if label.startswith(prefix):
+                return field
+        return None
+    
+    def _parse_regions(self, texts: Dict[str, str], cells: Dict[str, str],
+                       products: Optional[List[Dict[str, str]]]) -> Dict[str, Any]:
+        """Aplica os extratores de campos a cada quadro separadamente."""
+        def index_of(*names: str) -> FieldIndex:
+            joined = ' '.join(texts.get(name, '') for name in names)
+            with stage('texto.normalizacao', caracteres=len(joined)):
+                return FieldIndex(PATTERNS['whitespace'].sub(' ', joined).strip())
+        
+        chave = FieldIndex(cells['chave']) if cells.get('chave') else FieldIndex('')
+        header = index_of('cabecalho') if 'cabecalho' in texts else chave
+        key_info = self._decode_chave(chave) or self._decode_chave(header)
+        
+        extracted_data = self._extract_basic_info(header, key_info)
+        if not key_info and chave.chaves:
+            extracted_data['chave_acesso'] = chave.chaves[0].replace(' ', '')
+        
+        # DATA DA EMISSÃO is the first date of the destinatário box
+        destinatario = index_of('destinatario')
+        extracted_data['data_emissao'] = parse_date(destinatario.datas[0]) if destinatario.datas else 'N/A'
+        
+        if cells.get('valor_total'):
+            extracted_data['valor_total'] = parse_currency(cells['valor_total'])
+        if cells.get('natureza'):
+            extracted_data['natureza_operacao'] = cells['natureza']
+        
+        emitente = index_of('emitente', 'inscricoes') if 'emitente' in texts else header
+        extracted_data.update(self._extract_remetente_info(emitente, key_info))
+        extracted_data.update(self._extract_destinatario_info(destinatario, position=0))
+        
+        if products is not None:
+            extracted_data['produtos'] = products
+        
+        extracted_data.update(self._extract_additional_info(texts.get('adicionais', '')))
+        
+        for key, value in extracted_data.items():
+            if value is None or str(value).strip() == "":
+                extracted_data[key] = 'N/A'
+        
+        return extracted_data
+    
+    def _chave_decoded(self, data: Dict[str, Any]) -> bool:
+        """Verifica se a chave de acesso encontrada é válida (dígito verificador e UF)."""
+        chave = data.get('chave_acesso')
+        return bool(chave and chave != 'N/A' and decode_access_key(chave))
+    
+    def _engine_complete(self, data: Dict[str, Any]) -> bool:
+        """Verifica se o motor resolveu o que qualquer DANFE permite (ver ``ENGINE_FIELDS``)."""
+        return self._chave_decoded(data) and all(data.get(field) not in (None, '', 'N/A') for field in ENGINE_FIELDS)
+    
+    def _merge_page(self, found: Optional[Dict[str, Any]],
+                    page_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Junta os campos de uma página aos das páginas já lidas.
+        
+        A primeira página com texto fornece todos os campos; de uma página
+        seguinte só entram os campos da chave, quando ela decodifica ali e
+        ainda não tinha decodificado antes.
+        """
+        if found is None or page_data is None:
+            return found or page_data
+        if not self._chave_decoded(found) and self._chave_decoded(page_data):
+            for field in KEY_FIELDS:
+                found[field] = page_data[field]
+        return found
+    
+    def _parse_text(self, full_text: str) -> Optional[Dict[str, Any]]:
+        """Aplica os extratores de campos sobre o texto das páginas lidas."""
+        if not full_text.strip():
+            return None
+        
+        with stage('texto.normalizacao', caracteres=len(full_text)):
+            # Normalize text like in JavaScript (replace multiple spaces with single space)
+            norm_text = PATTERNS['whitespace'].sub(' ', full_text).strip()
+            
+            # One pass over the text collects every match the field resolvers need
+            index = FieldIndex(norm_text)
+        
+        # A valid chave de acesso already carries número, série and the emitter's CNPJ/UF
+        key_info = self._decode_chave(index)
+        
+        # Extract basic information
+        extracted_data = self._extract_basic_info(index, key_info)
+        
+        # Extract company information
+        company_info = self._extract_company_info(index, key_info)
+        extracted_data.update(company_info)
+        
+        # Extract additional information (line based, so it reads the text before normalization)
+        additional_info = self._extract_additional_info(full_text)
+        extracted_data.update(additional_info)
+        
+        # Ensure all keys have non-null values like in JavaScript
+        for key, value in extracted_data.items():
+            if value is None or str(value).strip() == "":
+                extracted_data[key] = 'N/A'
+        
+        return extracted_data
+    
+    @timed('campos.chave')
+    def _decode_chave(self, index: FieldIndex) -> Optional[Dict[str, str]]:
+        """Decodifica a primeira chave de acesso do texto com dígito verificador válido."""
+        for chave in index.chaves:
+            key_info = decode_access_key(chave)
+            if key_info:
+                return key_info
+        return None
+    
+    @timed('campos.basicos')
+    def _extract_basic_info(self, index: FieldIndex, key_info: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Extrai informações básicas da DANFE."""
+        data = {}
+        text = index.text
+        
+        if key_info:
+            data['numero_nfe'] = key_info['numero']
+            data['serie'] = key_info['serie']
+            data['chave_acesso'] = key_info['chave']
+        else:
+            # Extract NF-e number with multiple fallback patterns
+            nfe_number = self._resolve_numero_nfe(index)
+            data['numero_nfe'] = nfe_number if nfe_number else 'N/A'
+            
+            # Extract series
+            serie = index.label_value('serie')
+            data['serie'] = serie if serie else 'N/A'
+            
+            # Extract access key
+            data['chave_acesso'] = index.chaves[0].replace(' ', '') if index.chaves else 'N/A'
+        
+        # Extract emission date: the value under its label when the text keeps them
+        # together (pypdfium2), otherwise the first date in the text
+        data_emissao = index.label_value('data_emissao') or (index.datas[0] if index.datas else None)
+        data['data_emissao'] = parse_date(data_emissao) if data_emissao else 'N/A'
         
         # Extract total value - more flexible approach
-        valor_match = re.search(r'VALOR TOTAL DA NOTA\s+(\d+[.,]\d+)', text)
-        if valor_match:
-            data['valor_total'] = parse_currency(valor_match.group(1))
+        valor_total = index.label_value('valor_total')
+        if valor_total:
+            data['valor_total'] = parse_currency(valor_total)
         else:
             # Look for specific values in different PDFs
             if '2374.30' in text:
@@ -118,41 +1012,75 @@ class DANFEExtractor:
             data['natureza_operacao'] = 'VENDA-DE-ATIVO-IMOBILIZADO'
         else:
             # Try to find after NATUREZA DA OPERAÇÃO
-            natureza_match = re.search(r'NATUREZA DA OPERAÇÃO\s+([^\n\r]+)', text)
-            if natureza_match:
-                data['natureza_operacao'] = natureza_match.group(1).strip()
+            natureza = index.label_value('natureza')
+            if natureza:
+                data['natureza_operacao'] = natureza.strip()
             else:
                 data['natureza_operacao'] = 'N/A'
         
         return data
     
-    def _extract_company_info(self, text: str) -> Dict[str, str]:
+    def _resolve_numero_nfe(self, index: FieldIndex) -> Optional[str]:
+        """Número da NF-e a partir dos rótulos "Nº", em ordem de confiabilidade."""
+        text = index.text
+        tokens = index.labels.get('numero', [])
+        
+        # "NF-e Nº 123"
+        for start, end in tokens:
+            if PATTERNS['nfe_prefix'].search(text, max(0, start - 16), start):
+                return PATTERNS['numero'].match(text, end).group(1)
+        
+        # "Nº 123 SÉRIE"
+        for _, end in tokens:
+            match = PATTERNS['numero_serie'].match(text, end)
+            if match:
+                return match.group(1)
+        
+        # First "Nº 123" after "DANFE"
+        danfe = index.labels.get('danfe')
+        if danfe:
+            for start, end in tokens:
+                if start >= danfe[0][1]:
+                    return PATTERNS['numero'].match(text, end).group(1)
+        
+        # Standalone "Nº 123"
+        for start, end in tokens:
+            if start == 0 or not (text[start - 1].isalnum() or text[start - 1] == '_'):
+                match = PATTERNS['numero_curto'].match(text, end)
+                if match:
+                    return match.group(1)
+        
+        return None
+    
+    def _extract_company_info(self, index: FieldIndex, key_info: Optional[Dict[str, str]] = None) -> Dict[str, str]:
         """Extrai informações da empresa seguindo o padrão do JavaScript."""
         data = {}
         
         # Extract remetente information first (following JS logic)
-        remetente_data = self._extract_remetente_info(text)
+        remetente_data = self._extract_remetente_info(index, key_info)
         data.update(remetente_data)
         
         # Extract destinatario information
-        destinatario_data = self._extract_destinatario_info(text)
+        destinatario_data = self._extract_destinatario_info(index)
         data.update(destinatario_data)
         
         return data
     
-    def _extract_remetente_info(self, text: str) -> Dict[str, str]:
+    @timed('campos.remetente')
+    def _extract_remetente_info(self, index: FieldIndex, key_info: Optional[Dict[str, str]] = None) -> Dict[str, str]:
         """Extrai informações do remetente baseado no PDF real."""
         data = {}
+        text = index.text
         
         # Extract remetente data from the actual PDF structure
         # The first part has the emitter info (remetente)
-        remetente_nome_match = re.search(r'Empreendimentos Pague Menos S\.A\.', text, re.IGNORECASE)
-        data['remetente_nome'] = remetente_nome_match.group(0) if remetente_nome_match else 'N/A'
+        remetente_nome = index.label_text('remetente_nome')
+        data['remetente_nome'] = remetente_nome if remetente_nome else 'N/A'
         
         # Extract address - try multiple patterns
-        endereco_match = re.search(r'AV DEZESSETE DE AGOSTO,\s*(\d+)', text, re.IGNORECASE)
-        if endereco_match:
-            data['remetente_endereco'] = f"AV DEZESSETE DE AGOSTO, {endereco_match.group(1)}"
+        endereco_numero = index.label_value('endereco_recife')
+        if endereco_numero:
+            data['remetente_endereco'] = f"AV DEZESSETE DE AGOSTO, {endereco_numero}"
         elif 'Rua Senador Pompeu,1520' in text:
             data['remetente_endereco'] = 'Rua Senador Pompeu,1520'
         else:
@@ -173,12 +1101,19 @@ class DANFEExtractor:
             data['remetente_uf'] = 'N/A'
         
         # Extract CEP from first section
-        cep_match = re.search(r'(\d{2}\.\d{3}-\d{3})', text)
-        data['remetente_cep'] = cep_match.group(1) if cep_match else 'N/A'
+        data['remetente_cep'] = index.ceps[0] if index.ceps else 'N/A'
         
-        # Extract remetente CNPJ (first CNPJ in document)
-        cnpj_matches = re.findall(r'(\d{3}\.\d{3}\.\d{3}/\d{4}-\d{2})', text)
-        data['remetente_cnpj'] = cnpj_matches[0] if cnpj_matches else 'N/A'
+        if key_info:
+            # The chave carries the emitter's UF and CNPJ; keep the CNPJ as printed when it appears in the text
+            data['remetente_uf'] = key_info['uf']
+            key_digits = PATTERNS['non_digit'].sub('', key_info['cnpj'])
+            data['remetente_cnpj'] = next(
+                (cnpj for cnpj in index.cnpjs if PATTERNS['non_digit'].sub('', cnpj)[-14:] == key_digits),
+                key_info['cnpj']
+            )
+        else:
+            # Extract remetente CNPJ (first CNPJ in document)
+            data['remetente_cnpj'] = index.cnpjs[0] if index.cnpjs else 'N/A'
         
         # Extract IE from remetente section - look for multiple patterns
         if '028687175' in text:
@@ -186,14 +1121,24 @@ class DANFEExtractor:
         elif '068451288' in text:
             data['remetente_ie'] = '068451288'
         else:
-            ie_match = re.search(r'INSCRIÇÃO ESTADUAL\s+(\d+)', text, re.IGNORECASE)
-            data['remetente_ie'] = ie_match.group(1) if ie_match else 'N/A'
+            ie = index.label_value('ie')
+            data['remetente_ie'] = ie if ie else 'N/A'
         
         return data
     
-    def _extract_destinatario_info(self, text: str) -> Dict[str, str]:
-        """Extrai informações do destinatário baseado no PDF real."""
+    @timed('campos.destinatario')
+    def _extract_destinatario_info(self, index: FieldIndex, position: int = 1) -> Dict[str, str]:
+        """
+        Extrai informações do destinatário baseado no PDF real.
+        
+        Args:
+            index (FieldIndex): Ocorrências do texto analisado
+            position (int): Posição do CNPJ/CEP do destinatário entre os do
+                texto (1 no texto completo, logo após o emitente; 0 quando o
+                texto é só o quadro do destinatário)
+        """
         data = {}
+        text = index.text
         
         # Extract destinatario nome - multiple patterns
         if 'EMPREENDIMENTOS PAGUE MENOS S A' in text:
@@ -238,13 +1183,13 @@ class DANFEExtractor:
             data['destinatario_uf'] = 'N/A'
         
         # Extract destinatario CNPJ (second CNPJ in the document) 
-        cnpj_matches = re.findall(r'(\d{3}\.\d{3}\.\d{3}/\d{4}-\d{2})', text)
-        data['destinatario_cnpj'] = cnpj_matches[1] if len(cnpj_matches) > 1 else 'N/A'
+        cnpj_matches = index.cnpjs
+        data['destinatario_cnpj'] = cnpj_matches[position] if len(cnpj_matches) > position else 'N/A'
         
         # Extract CEP - look for different patterns
-        cep_matches = re.findall(r'(\d{2}\.\d{3}-\d{3})', text)
-        if len(cep_matches) > 1:
-            data['destinatario_cep'] = cep_matches[1]  # Second CEP is usually destinatario
+        cep_matches = index.ceps
+        if len(cep_matches) > position:
+            data['destinatario_cep'] = cep_matches[position]  # Second CEP is usually destinatario
         elif '65.400-000' in text:
             data['destinatario_cep'] = '65.400-000'
         elif '41.820-910' in text:
@@ -260,28 +1205,11 @@ class DANFEExtractor:
         elif '068451288' in text:
             data['destinatario_ie'] = '068451288'
         else:
-            ie_pattern = r'INSCRIÇÃO\s+(\d+)'
-            ie_match = re.search(ie_pattern, text)
-            data['destinatario_ie'] = ie_match.group(1) if ie_match else 'N/A'
+            ie = index.label_value('inscricao')
+            data['destinatario_ie'] = ie if ie else 'N/A'
         
         # Determine brand and loja (store number)
-        if data['destinatario_cnpj'] != 'N/A':
-            is_extrafarma = data['destinatario_cnpj'].startswith('004.899.316')
-            data['brand'] = 'extrafarma' if is_extrafarma else 'paguemenos'
-            
-            # Extract branch number from CNPJ
-            branch_match = re.search(r'\/(\d{4})-\d{2}', data['destinatario_cnpj'])
-            if branch_match:
-                branch_number = branch_match.group(1)
-                if is_extrafarma and len(branch_number) == 4:
-                    data['loja'] = f"7{branch_number[1:]}"
-                else:
-                    data['loja'] = branch_number
-            else:
-                data['loja'] = 'N/A'
-        else:
-            data['brand'] = 'N/A'
-            data['loja'] = 'N/A'
+        data.update(self._store_info(data['destinatario_cnpj']))
         
         # Set defaults for missing values
         for key in ['destinatario_nome', 'destinatario_endereco', 'destinatario_bairro', 
@@ -291,6 +1219,34 @@ class DANFEExtractor:
         
         return data
     
+    def _store_info(self, cnpj: str) -> Dict[str, str]:
+        """
+        Bandeira e loja do destinatário a partir do CNPJ no formato da DANFE.
+        
+        Args:
+            cnpj (str): CNPJ do destinatário (006.626.253/0001-51) ou 'N/A'
+            
+        Returns:
+            Dict[str, str]: ``brand`` e ``loja``
+        """
+        if cnpj == 'N/A':
+            return {'brand': 'N/A', 'loja': 'N/A'}
+        
+        is_extrafarma = cnpj.startswith('004.899.316')
+        data = {'brand': 'extrafarma' if is_extrafarma else 'paguemenos'}
+        
+        # Extract branch number from CNPJ
+        branch_match = PATTERNS['branch'].search(cnpj)
+        if branch_match:
+            branch_number = branch_match.group(1)
+            if is_extrafarma and len(branch_number) == 4:
+                data['loja'] = f"7{branch_number[1:]}"
+            else:
+                data['loja'] = branch_number
+        else:
+            data['loja'] = 'N/A'
+        return data
+    
     def _helper_get_match(self, text: str, regex: str, group: int = 1, default_value: str = 'N/A') -> str:
         """Helper function to match regex patterns like in JavaScript."""
         if not text:
@@ -300,6 +1256,7 @@ class DANFEExtractor:
         captured_value = match.group(group).strip() if match and match.group(group) else None
         return captured_value if captured_value and captured_value != "" else default_value
     
+    @timed('produtos.texto')
     def _extract_products(self, text: str) -> List[Dict[str, str]]:
         """Extrai informações dos produtos."""
         products = []
@@ -338,7 +1295,7 @@ class DANFEExtractor:
         
         # Product line pattern - adjust based on DANFE format
         # Example: 999999001 NOTEBOOK 84713012 000 6552 UN 1 2374,3000 2374,30 2374,30 284,92 12,00% 0,00%
-        parts = re.split(r'\s+', line)
+        parts = PATTERNS['whitespace'].split(line)
         
         if len(parts) >= 8:
             try:
@@ -371,6 +1328,7 @@ class DANFEExtractor:
         
         return None
     
+    @timed('campos.adicionais')
     def _extract_additional_info(self, text: str) -> Dict[str, str]:
         """Extrai informações complementares."""
         data = {}
@@ -386,7 +1344,8 @@ class DANFEExtractor:
                 continue
             
             if info_section_started:
-                if 'RESERVADO AO FISCO' in line:
+                # The box ends at the fiscal reserve or, in multi-page text, at the next page's header
+                if any(marker in line for marker in ADDITIONAL_INFO_END):
                     break
                 
                 line = line.strip()
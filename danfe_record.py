@@ -0,0 +1,245 @@
+"""
+Registro tipado dos dados extraídos de uma DANFE.
+
+Os campos ausentes são None, o valor total é um Decimal e a data de emissão
+um ``date``. Para o código que trabalha com o dicionário antigo (geradores
+de capa, JSONL, cache em disco), o registro também se lê como um mapeamento
+somente leitura com os valores no formato de antes: ``'N/A'`` nos campos
+ausentes, moeda formatada ("1.234,56") e data em DD/MM/AAAA.
+"""
+from collections.abc import Mapping
+from datetime import date
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from utils import currency_to_decimal, date_from_text, format_currency
+
+# Printed on every cover or read from the DANFE boxes; 'N/A' in the dict view when missing
+TEXT_FIELDS = (
+    'numero_nfe',
+    'serie',
+    'chave_acesso',
+    'data_emissao',
+    'valor_total',
+    'natureza_operacao',
+    'remetente_nome',
+    'remetente_endereco',
+    'remetente_municipio',
+    'remetente_bairro',
+    'remetente_uf',
+    'remetente_cep',
+    'remetente_cnpj',
+    'remetente_ie',
+    'destinatario_nome',
+    'destinatario_endereco',
+    'destinatario_bairro',
+    'destinatario_municipio',
+    'destinatario_uf',
+    'destinatario_cnpj',
+    'destinatario_cep',
+    'destinatario_ie',
+    'brand',
+    'loja',
+)
+
+# Left out of the dict view when missing, as the extractor did
+OPTIONAL_FIELDS = (
+    'informacoes_complementares',
+    'produtos',
+    'paginas_processadas',
+    'total_paginas',
+    'motor_texto',
+    'filename',
+    'volume_number',
+)
+
+FIELDS = TEXT_FIELDS + OPTIONAL_FIELDS
+
+MISSING = 'N/A'
+
+_FIELD_SET = frozenset(FIELDS)
+_FIELD_INDEX = {name: index for index, name in enumerate(FIELDS)}
+_OPTIONAL_SET = frozenset(OPTIONAL_FIELDS)
+
+
+def _blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and value.strip() in ('', MISSING))
+
+
+class Product(NamedTuple):
+    """Um item da tabela de produtos."""
+    codigo: Optional[str] = None
+    descricao: Optional[str] = None
+    ncm: Optional[str] = None
+    cst: Optional[str] = None
+    cfop: Optional[str] = None
+    unidade: Optional[str] = None
+    quantidade: Optional[str] = None
+    valor_unitario: Optional[Decimal] = None
+    valor_total: Optional[Decimal] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Product':
+        """Item a partir do dicionário do extrator (valores em texto, ``''`` quando vazios)."""
+        values = {}
+        for name in cls._fields:
+            value = data.get(name)
+            if _blank(value):
+                continue
+            if name in ('valor_unitario', 'valor_total') and not isinstance(value, Decimal):
+                value = currency_to_decimal(value)
+            values[name] = value
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, str]:
+        """Item no formato do extrator: texto, moeda formatada e ``''`` nos campos vazios."""
+        return {
+            name: '' if value is None else format_currency(value) if isinstance(value, Decimal) else value
+            for name, value in zip(self._fields, self)
+        }
+
+
+def parse_field(name: str, value: Any) -> Any:
+    """
+    Converte o valor de um campo para o tipo do registro.
+
+    Aceita tanto o texto do dicionário antigo (ou de um formulário) quanto o
+    valor já tipado.
+
+    Args:
+        name (str): Nome do campo (ver ``FIELDS``)
+        value (Any): Valor
+
+    Returns:
+        Any: None se o valor estiver vazio ou for ``'N/A'``; Decimal para
+        ``valor_total``, ``date`` para ``data_emissao``, tupla de Product
+        para ``produtos`` e int para as contagens de páginas. Texto de moeda
+        ou data inválido também vira None.
+    """
+    if _blank(value):
+        return None
+    if name == 'valor_total':
+        return value if isinstance(value, Decimal) else currency_to_decimal(value)
+    if name == 'data_emissao':
+        return value if isinstance(value, date) else date_from_text(value)
+    if name == 'produtos':
+        return tuple(item if isinstance(item, Product) else Product.from_dict(item) for item in value)
+    if name in ('paginas_processadas', 'total_paginas'):
+        return int(value)
+    return value
+
+
+def _legacy_value(name: str, value: Any) -> Any:
+    if value is None:
+        return MISSING
+    if name == 'valor_total':
+        return format_currency(value)
+    if name == 'data_emissao':
+        return value.strftime('%d/%m/%Y')
+    if name == 'produtos':
+        return [product.to_dict() for product in value]
+    return value
+
+
+def _restore(values: Iterable[Any]) -> 'DANFERecord':
+    record = object.__new__(DANFERecord)
+    for set_value, value in zip(_SLOT_SETTERS, values):
+        set_value(record, value)
+    return record
+
+
+class DANFERecord(Mapping):
+    """
+    Dados de uma DANFE, um atributo por campo.
+
+    O registro é imutável: ``replace`` devolve uma cópia com os campos
+    alterados, então a mesma instância pode ser compartilhada pelo cache de
+    extração, pela sessão e pelos geradores sem cópias defensivas.
+
+    Como mapeamento (``record['loja']``, ``record.get(...)``, ``dict(record)``)
+    devolve os valores no formato do dicionário antigo; ``to_dict`` monta
+    esse dicionário de uma vez.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, **fields: Any):
+        """
+        Args:
+            **fields: Valores tipados dos campos de ``FIELDS``; os omitidos
+                ficam None (use ``from_dict`` para valores em texto)
+        """
+        unknown = fields.keys() - _FIELD_SET
+        if unknown:
+            raise TypeError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+        for set_value, name in zip(_SLOT_SETTERS, FIELDS):
+            set_value(self, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DANFERecord':
+        """
+        Registro a partir do dicionário do extrator, do JSONL ou do cache.
+
+        Chaves fora de ``FIELDS`` são ignoradas.
+        """
+        return _restore(tuple(parse_field(name, data.get(name)) for name in FIELDS))
+
+    def replace(self, **changes: Any) -> 'DANFERecord':
+        """
+        Cópia do registro com os campos alterados.
+
+        Args:
+            **changes: Novos valores, já tipados (ver ``parse_field``)
+        """
+        unknown = changes.keys() - _FIELD_SET
+        if unknown:
+            raise TypeError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+        values = list(_field_values(self))
+        for name, value in changes.items():
+            values[_FIELD_INDEX[name]] = value
+        return _restore(values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dicionário no formato antigo do extrator (ver a classe)."""
+        data = {}
+        for name in FIELDS:
+            value = getattr(self, name)
+            if value is not None or name not in _OPTIONAL_SET:
+                data[name] = _legacy_value(name, value)
+        return data
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"DANFERecord é imutável; use replace({name}=...)")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"DANFERecord é imutável; use replace({name}=None)")
+
+    def __reduce__(self):
+        # Slots without __dict__ and a blocked __setattr__: pickle (process pool) as a plain tuple
+        return _restore, (_field_values(self),)
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in _FIELD_SET:
+            raise KeyError(name)
+        value = getattr(self, name)
+        if value is None and name in _OPTIONAL_SET:
+            raise KeyError(name)
+        return _legacy_value(name, value)
+
+    def __iter__(self) -> Iterator[str]:
+        for name in FIELDS:
+            if name not in _OPTIONAL_SET or getattr(self, name) is not None:
+                yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in FIELDS if getattr(self, name) is not None)
+        return f"DANFERecord({fields})"
+
+
+# Slot descriptors write straight into a new record, past the blocked __setattr__
+_SLOT_SETTERS = tuple(DANFERecord.__dict__[name].__set__ for name in FIELDS)
+_field_values = attrgetter(*FIELDS)
@@ -5,91 +5,219 @@ from docx.enum.section import WD_ORIENT
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 from io import BytesIO
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
+from xml.sax.saxutils import escape
+import re
+import zipfile
+
+from metrics import record_error, registry, stage
+from profiling import cover_name, profiled
+from utils import cover_sort_key
+
+DOCUMENT_PART = 'word/document.xml'
+
+# Placeholders written into the template in place of each field value
+PLACEHOLDER = '{{%s}}'
+PLACEHOLDER_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+# Characters python-docx refuses to write; PDFs sometimes carry them in text
+INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _DocxTemplate:
+    """
+    Capa montada uma vez pelo python-docx e guardada como pacote pronto.
+    
+    Todas as partes fixas do pacote ficam num ZIP já comprimido; cada capa só
+    acrescenta o ``document.xml`` com os valores substituídos.
+    """
+    
+    def __init__(self, package: bytes):
+        static = BytesIO()
+        with zipfile.ZipFile(BytesIO(package)) as source, \
+                zipfile.ZipFile(static, 'w', zipfile.ZIP_DEFLATED) as target:
+            for item in source.infolist():
+                if item.filename == DOCUMENT_PART:
+                    document_xml = source.read(item).decode('utf-8')
+                else:
+                    target.writestr(item, source.read(item))
+        self.static_package = static.getvalue()
+        
+        # Split the document around the body content so batches can repeat it
+        body_start = document_xml.index('<w:body>') + len('<w:body>')
+        sect_start = document_xml.rindex('<w:sectPr')
+        body_end = document_xml.rindex('</w:body>')
+        self.head = document_xml[:body_start]
+        self.section_properties = document_xml[sect_start:body_end]
+        self.tail = document_xml[body_end:]
+        # Even indexes are literal XML, odd indexes are field names
+        self.body = PLACEHOLDER_PATTERN.split(document_xml[body_start:sect_start])
+    
+    def render_body(self, values: Dict[str, str]) -> str:
+        pieces = self.body[:]
+        for i in range(1, len(pieces), 2):
+            pieces[i] = escape(values[pieces[i]])
+        return ''.join(pieces)
+    
+    def render(self, bodies: List[str], metric: str = 'capa.docx') -> BytesIO:
+        """Monta o pacote com uma seção por corpo, na ordem recebida."""
+        section_break = f'<w:p><w:pPr>{self.section_properties}</w:pPr></w:p>'
+        document_xml = (
+            self.head + section_break.join(bodies) + self.section_properties + self.tail
+        )
+        
+        with stage(f'{metric}.salvar', capas=len(bodies)):
+            buffer = BytesIO(self.static_package)
+            with zipfile.ZipFile(buffer, 'a', zipfile.ZIP_DEFLATED) as package:
+                package.writestr(DOCUMENT_PART, document_xml.encode('utf-8'))
+        registry.observe(f'{metric}.bytes', len(buffer.getbuffer()))
+        buffer.seek(0)
+        return buffer
+
 
 class DOCXGenerator:
     
+    # Built on first use and shared by every instance
+    _shared_template = None
+    
     def __init__(self):
         pass
     
+    @profiled('capa_docx', cover_name)
     def generate_receipt(self, data: Dict[str, Any]) -> Optional[BytesIO]:
         try:
-            doc = Document()
-            
-            sections = doc.sections
-            for section in sections:
-                section.orientation = WD_ORIENT.LANDSCAPE
-                section.page_width = Inches(11.69)
-                section.page_height = Inches(8.27)
-                section.left_margin = Cm(1.5)
-                section.right_margin = Cm(1.5)
-                section.top_margin = Cm(1.5)
-                section.bottom_margin = Cm(1.5)
-            
-            self._create_header(doc, data)
-            self._create_main_content(doc, data)
-            self._create_footer(doc, data)
-            
-            buffer = BytesIO()
-            doc.save(buffer)
-            buffer.seek(0)
-            
-            return buffer
+            template = self._get_template()
+            with stage('capa.docx.render'):
+                body = template.render_body(self._field_values(data))
+            return template.render([body])
+        
+        except Exception as e:
+            record_error('capa.docx', e)
+            return None
+    
+    def generate_batch(self, records: Iterable[Dict[str, Any]], group_by_loja: bool = True) -> Optional[BytesIO]:
+        """
+        Gera as capas de várias notas num único DOCX, uma seção por capa.
+        
+        Args:
+            records: Dados de cada nota, como em ``generate_receipt``
+            group_by_loja (bool): Ordena as capas por loja e NF-e
+        
+        Returns:
+            Optional[BytesIO]: DOCX com todas as capas, ou None em caso de erro
+        """
+        try:
+            records = list(records)
+            if not records:
+                return None
+            if group_by_loja:
+                records.sort(key=cover_sort_key)
             
+            template = self._get_template()
+            with stage('capa.docx.lote.render', capas=len(records)):
+                bodies = [template.render_body(self._field_values(data)) for data in records]
+            return template.render(bodies, 'capa.docx.lote')
+        
         except Exception as e:
-            print(f"Erro ao gerar DOCX: {e}")
+            record_error('capa.docx', e)
             return None
     
-    def _create_header(self, doc, data):
+    def _get_template(self) -> _DocxTemplate:
+        if DOCXGenerator._shared_template is None:
+            placeholders = {field: PLACEHOLDER % field for field in self._field_values({})}
+            with stage('capa.docx.modelo'):
+                DOCXGenerator._shared_template = _DocxTemplate(self._build_document(placeholders))
+        return DOCXGenerator._shared_template
+    
+    def _field_values(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """Textos variáveis da capa, já no formato em que aparecem no documento."""
+        values = {
+            'loja': data.get('loja', 'N/A'),
+            'destinatario': data.get('destinatario_nome', 'N/A'),
+            'endereco': f"{data.get('destinatario_endereco', 'N/A')}, {data.get('destinatario_bairro', 'N/A')}",
+            'cidade_uf': f"{data.get('destinatario_municipio', 'N/A')}/{data.get('destinatario_uf', 'N/A')}",
+            'cep': data.get('destinatario_cep', 'N/A'),
+            'remetente': data.get('remetente_nome', 'N/A'),
+            'origem': f"{data.get('remetente_municipio', 'N/A')}/{data.get('remetente_uf', 'N/A')}",
+            'data_emissao': data.get('data_emissao', 'N/A'),
+            'valor_total': data.get('valor_total', '0,00'),
+            'numero_nfe': data.get('numero_nfe', 'N/A'),
+            'serie': data.get('serie', 'N/A'),
+            'volume': data.get('volume_number', '1/1'),
+            'chave': str(data.get('chave_acesso', 'N/A'))[:20],
+        }
+        return {field: INVALID_XML_CHARS.sub('', str(value)) for field, value in values.items()}
+    
+    def _build_document(self, values: Dict[str, str]) -> bytes:
+        doc = Document()
+        
+        sections = doc.sections
+        for section in sections:
+            section.orientation = WD_ORIENT.LANDSCAPE
+            section.page_width = Inches(11.69)
+            section.page_height = Inches(8.27)
+            section.left_margin = Cm(1.5)
+            section.right_margin = Cm(1.5)
+            section.top_margin = Cm(1.5)
+            section.bottom_margin = Cm(1.5)
+        
+        self._create_header(doc, values)
+        self._create_main_content(doc, values)
+        self._create_footer(doc, values)
+        
+        buffer = BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+    
+    def _create_header(self, doc, values):
         header = doc.add_heading('CAPA DE RECEBIMENTO DE FRETE', 0)
         header.alignment = WD_ALIGN_PARAGRAPH.CENTER
         
         doc.add_paragraph()
         
-        loja_num = data.get('loja', 'N/A')
         store_info = doc.add_paragraph()
         store_info.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = store_info.add_run(f'LOJA: {loja_num}')
+        run = store_info.add_run(f"LOJA: {values['loja']}")
         run.bold = True
         run.font.size = Inches(0.16)
     
-    def _create_main_content(self, doc, data):
+    def _create_main_content(self, doc, values):
         doc.add_paragraph()
         
         table = doc.add_table(rows=8, cols=2)
         table.style = 'Table Grid'
         
         rows_data = [
-            ('DESTINATÁRIO:', data.get('destinatario_nome', 'N/A')),
-            ('ENDEREÇO:', f"{data.get('destinatario_endereco', 'N/A')}, {data.get('destinatario_bairro', 'N/A')}"),
-            ('CIDADE/UF:', f"{data.get('destinatario_municipio', 'N/A')}/{data.get('destinatario_uf', 'N/A')}"),
-            ('CEP:', data.get('destinatario_cep', 'N/A')),
-            ('REMETENTE:', data.get('remetente_nome', 'N/A')),
-            ('ORIGEM:', f"{data.get('remetente_municipio', 'N/A')}/{data.get('remetente_uf', 'N/A')}"),
-            ('DATA EMISSÃO:', data.get('data_emissao', 'N/A')),
-            ('VALOR TOTAL:', f"R$ {data.get('valor_total', '0,00')}")
+            ('DESTINATÁRIO:', values['destinatario']),
+            ('ENDEREÇO:', values['endereco']),
+            ('CIDADE/UF:', values['cidade_uf']),
+            ('CEP:', values['cep']),
+            ('REMETENTE:', values['remetente']),
+            ('ORIGEM:', values['origem']),
+            ('DATA EMISSÃO:', values['data_emissao']),
+            ('VALOR TOTAL:', f"R$ {values['valor_total']}")
         ]
         
         for i, (label, value) in enumerate(rows_data):
             row = table.rows[i]
             row.cells[0].text = label
-            row.cells[1].text = str(value)
+            row.cells[1].text = value
             
             row.cells[0].paragraphs[0].runs[0].bold = True
             
             for cell in row.cells:
                 cell.width = Inches(3)
     
-    def _create_footer(self, doc, data):
+    def _create_footer(self, doc, values):
         doc.add_paragraph()
         
         footer_table = doc.add_table(rows=2, cols=2)
         footer_table.style = 'Table Grid'
         
-        footer_table.rows[0].cells[0].text = f"NF-e Nº: {data.get('numero_nfe', 'N/A')}"
-        footer_table.rows[0].cells[1].text = f"SÉRIE: {data.get('serie', 'N/A')}"
-        footer_table.rows[1].cells[0].text = f"VOLUME: {data.get('volume_number', '1/1')}"
-        footer_table.rows[1].cells[1].text = f"CHAVE: {data.get('chave_acesso', 'N/A')[:20]}..."
+        footer_table.rows[0].cells[0].text = f"NF-e Nº: {values['numero_nfe']}"
+        footer_table.rows[0].cells[1].text = f"SÉRIE: {values['serie']}"
+        footer_table.rows[1].cells[0].text = f"VOLUME: {values['volume']}"
+        footer_table.rows[1].cells[1].text = f"CHAVE: {values['chave']}..."
         
         for row in footer_table.rows:
             for cell in row.cells:
@@ -97,4 +225,4 @@ class DOCXGenerator:
         
         doc.add_paragraph()
         signature = doc.add_paragraph('ASSINATURA DO RECEBEDOR: _' + '_' * 50)
-        signature.alignment = WD_ALIGN_PARAGRAPH.CENTER
\ No newline at end of file
+        signature.alignment = WD_ALIGN_PARAGRAPH.CENTER
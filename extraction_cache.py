@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+from danfe_extractor import EXTRACTOR_VERSION
+from danfe_record import DANFERecord
+from metrics import record_error
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'DANFE_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'gerador_capa', 'extraction')
+)
+
+# Pruning stops below the size limit, so the next writes do not scan the folder again
+PRUNE_TARGET = 0.9
+
+
+class ExtractionCache:
+    """
+    Cache de resultados do DANFEExtractor endereçado pelo conteúdo do PDF.
+
+    Os resultados ficam em memória com descarte LRU e são gravados também em
+    disco (um JSON por chave, no formato de ``DANFERecord.to_dict``),
+    respeitando um limite de tamanho e um TTL. O tamanho em disco é mantido
+    a cada gravação; a pasta só é varrida ao abrir o cache e quando o limite
+    estoura. Entradas vencidas são descartadas ao serem lidas. Os registros
+    são imutáveis, então a memória os devolve sem copiar.
+    """
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 max_disk_bytes: int = 200 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: 'OrderedDict[str, DANFERecord]' = OrderedDict()
+        self._lock = threading.Lock()
+        # File name -> size of each entry on disk, and their total
+        self._disk_sizes: Dict[str, int] = {}
+        self._disk_bytes = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._prune_disk()
+
+    @staticmethod
+    def make_key(pdf_bytes: BytesLike, variant: str = '') -> str:
+        """
+        Gera a chave do cache para um PDF.
+
+        Args:
+            pdf_bytes: Conteúdo do PDF
+            variant (str): Opções de extração que mudam o resultado
+
+        Returns:
+            str: SHA-256 do conteúdo, versão do extrator e variante
+        """
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        suffix = f"-{variant}" if variant else ''
+        return f"{digest}-v{EXTRACTOR_VERSION}{suffix}"
+
+    def get(self, key: str) -> Optional[DANFERecord]:
+        """Busca um resultado na memória e, se não houver, no disco."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            else:
+                data = self._read_disk(key)
+                if data is not None:
+                    self._remember(key, data)
+
+            if data is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: DANFERecord) -> None:
+        """Guarda um resultado na memória e no disco."""
+        with self._lock:
+            self._remember(key, data)
+            self._write_disk(key, data)
+
+    def clear(self) -> None:
+        """Remove todas as entradas da memória e do disco."""
+        with self._lock:
+            self._memory.clear()
+            for name in self._disk_entries():
+                self._remove(name)
+
+    def _remember(self, key: str, data: DANFERecord) -> None:
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[DANFERecord]:
+        if not self.cache_dir:
+            return None
+
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                self._remove(os.path.basename(path))
+                return None
+            with open(path, 'r', encoding='utf-8') as handle:
+                return DANFERecord.from_dict(json.load(handle))
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, data: DANFERecord) -> None:
+        if not self.cache_dir:
+            return
+
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+                json.dump(data.to_dict(), handle, ensure_ascii=False)
+            path = self._path(key)
+            os.replace(tmp_path, path)
+            self._count(os.path.basename(path), os.path.getsize(path))
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+        except (OSError, TypeError, ValueError) as e:
+            record_error('cache.gravacao', e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _disk_entries(self):
+        if not self.cache_dir:
+            return []
+        return [name for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+
+    def _count(self, name: str, size: int) -> None:
+        # Rewriting a key replaces its old size
+        self._disk_bytes += size - self._disk_sizes.get(name, 0)
+        self._disk_sizes[name] = size
+
+    def _prune_disk(self) -> None:
+        """
+        Remove entradas vencidas e, se o limite de tamanho estourou, as mais
+        antigas até ``PRUNE_TARGET`` dele. Também reconta o tamanho em disco
+        a partir da pasta, onde outros processos podem ter gravado.
+        """
+        now = time.time()
+        entries = []
+        self._disk_sizes = {}
+        self._disk_bytes = 0
+        for name in self._disk_entries():
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                self._remove(name)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, name))
+                self._count(name, stat.st_size)
+
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        for _, _, name in sorted(entries):
+            if self._disk_bytes <= self.max_disk_bytes * PRUNE_TARGET:
+                break
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        self._disk_bytes -= self._disk_sizes.pop(name, 0)
+        try:
+            os.unlink(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from danfe_extractor import DANFEExtractor, collect_worker_result
+from danfe_record import DANFERecord
+from extraction_cache import ExtractionCache
+from metrics import record_error
+
+# Per-file states shown while a job runs
+PENDING = 'na fila'
+DONE = 'concluído'
+FAILED = 'erro'
+CANCELLED = 'cancelado'
+
+
+class ExtractionJob:
+    """
+    Extração de um lote de PDFs em segundo plano.
+
+    Os PDFs vão para o pool de processos do extrator e uma thread guarda cada
+    resultado assim que chega. Quem acompanha o job consulta o andamento e
+    recolhe os resultados novos com ``take_results``, sem esperar o lote
+    inteiro. Um PDF com várias DANFEs emendadas rende um resultado por nota.
+    """
+
+    def __init__(self, extractor: DANFEExtractor, files: List[Tuple[str, str, Any]],
+                 cache: Optional[ExtractionCache] = None, lazy: bool = True,
+                 include_products: bool = False, split: bool = True):
+        """
+        Args:
+            extractor (DANFEExtractor): Extrator usado nos workers
+            files: ``(nome, chave do cache, conteúdo)`` de cada PDF
+            cache (Optional[ExtractionCache]): Onde guardar cada resultado;
+                PDFs com várias notas não são guardados
+            lazy (bool): Repassado para ``extract_from_pdf``
+            include_products (bool): Repassado para ``extract_from_pdf``
+            split (bool): Separa as notas de PDFs com várias DANFEs (ver
+                ``DANFEExtractor.submit_many``)
+        """
+        self.extractor = extractor
+        self.files = [(name, key) for name, key, _ in files]
+        # Released once submitted: the workers get their own copies
+        self._contents = [content for _, _, content in files]
+        self.cache = cache
+        self.lazy = lazy
+        self.include_products = include_products
+        self.split = split
+
+        self.statuses = [PENDING] * len(files)
+        self.completed = 0
+        self.failed = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+        self._results: List[Tuple[int, DANFERecord]] = []
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._futures: Dict[Future, int] = {}
+        self._thread = threading.Thread(target=self._run, name='danfe-extraction-job', daemon=True)
+
+    @property
+    def total(self) -> int:
+        return len(self.files)
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def start(self) -> 'ExtractionJob':
+        # Submitting happens on the job thread: splitting bundles reads their pages
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """Cancela o job: os PDFs que ainda não começaram saem da fila."""
+        self._cancel.set()
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+    def take_results(self) -> List[Tuple[int, DANFERecord]]:
+        """
+        Recolhe os resultados que chegaram desde a última chamada.
+
+        Returns:
+            List[Tuple[int, DANFERecord]]: Índice do arquivo em ``files`` e
+            os dados extraídos (só as extrações bem-sucedidas)
+        """
+        with self._lock:
+            results, self._results = self._results, []
+        return results
+
+    def _run(self) -> None:
+        try:
+            futures = self.extractor.submit_many(
+                self._contents, lazy=self.lazy, include_products=self.include_products, split=self.split,
+                names=[name for name, _ in self.files]
+            )
+            self._contents = None
+            with self._lock:
+                self._futures = futures
+            if self.cancelled:
+                self.cancel()
+
+            # Tasks per file (several for a bundle) and notes extracted so far
+            tasks = Counter(futures.values())
+            remaining = Counter(tasks)
+            extracted = Counter()
+            for future in as_completed(futures):
+                index = futures[future]
+                if future.cancelled():
+                    continue
+                try:
+                    results = collect_worker_result(future)
+                except Exception as e:
+                    record_error('extracao', e)
+                    results = [None]
+
+                records = [data for data in results if data is not None]
+                if self.cache is not None and tasks[index] == 1 and len(records) == len(results) == 1:
+                    self.cache.put(self.files[index][1], records[0])
+                remaining[index] -= 1
+                extracted[index] += len(records)
+                with self._lock:
+                    self._results.extend((index, data) for data in records)
+                    if remaining[index] == 0:
+                        self.statuses[index] = DONE if extracted[index] else FAILED
+                        self.completed += 1
+                        self.failed += not extracted[index]
+        except Exception as e:
+            self.error = str(e)
+            record_error('extracao.job', e)
+        finally:
+            with self._lock:
+                self.statuses = [CANCELLED if status == PENDING else status for status in self.statuses]
+            self.finished_at = time.time()
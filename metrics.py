@@ -0,0 +1,166 @@
+"""
+Instrumentação leve das etapas de extração e de geração das capas.
+
+Cada etapa medida com ``stage`` registra o tempo de relógio e de CPU num
+registro de métricas do processo (contadores e histogramas) e, com o log em
+DEBUG, uma linha JSON por etapa no logger ``gerador_capa``.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger('gerador_capa')
+
+# Recent samples kept per histogram for the percentiles
+SAMPLE_SIZE = 1024
+
+
+class Histogram:
+    """Contagem, soma, mínimo e máximo de todas as medidas, mais as mais recentes."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'contagem': self.count,
+            'soma': self.total,
+            'media': self.total / self.count if self.count else None,
+            'min': self.min,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'max': self.max,
+        }
+
+
+class MetricsRegistry:
+    """Contadores e histogramas do processo, seguros entre threads."""
+
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retrato das métricas atuais.
+
+        Returns:
+            Dict[str, Any]: ``contadores`` e ``histogramas`` (resumo de cada um),
+            em ordem alfabética
+        """
+        with self._lock:
+            return {
+                'contadores': dict(sorted(self.counters.items())),
+                'histogramas': {name: self.histograms[name].summary() for name in sorted(self.histograms)},
+            }
+
+    def export(self) -> Dict[str, Any]:
+        """Contadores e medidas recentes, para juntar a outro registro com ``merge``."""
+        with self._lock:
+            return {
+                'contadores': dict(self.counters),
+                'medidas': {name: list(histogram.samples) for name, histogram in self.histograms.items()},
+            }
+
+    def merge(self, exported: Dict[str, Any]) -> None:
+        """Soma ao registro o que ``export`` devolveu em outro processo."""
+        for name, value in exported.get('contadores', {}).items():
+            self.increment(name, value)
+        for name, values in exported.get('medidas', {}).items():
+            for value in values:
+                self.observe(name, value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def dump(self, path: str) -> None:
+        """Grava o retrato das métricas em JSON."""
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(self.snapshot(), handle, ensure_ascii=False, indent=2)
+
+
+# Registry of this process; extraction workers send theirs back with each result
+registry = MetricsRegistry()
+
+
+def log_event(event: str, level: int = logging.DEBUG, **fields: Any) -> None:
+    """Escreve uma linha de log estruturada (JSON), se o nível estiver ativo."""
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({'evento': event, **fields}, ensure_ascii=False, default=str))
+
+
+def record_error(name: str, error: Exception) -> None:
+    """Conta o erro da etapa e o registra no log."""
+    registry.increment(f"{name}.erros")
+    log_event('erro', logging.ERROR, etapa=name, erro=str(error), tipo=type(error).__name__)
+
+
+@contextmanager
+def stage(name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Mede uma etapa: tempo de relógio e de CPU em ms.
+
+    Os campos passados (e os acrescentados no dicionário devolvido, como
+    tamanho em bytes ou número de páginas) vão para a linha de log.
+
+    Args:
+        name (str): Nome da etapa; os histogramas ficam em ``<nome>.wall_ms``
+            e ``<nome>.cpu_ms``
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield fields
+    finally:
+        wall_ms = (time.perf_counter() - wall_start) * 1e3
+        cpu_ms = (time.thread_time() - cpu_start) * 1e3
+        registry.observe(f"{name}.wall_ms", wall_ms)
+        registry.observe(f"{name}.cpu_ms", cpu_ms)
+        log_event('etapa', etapa=name, wall_ms=round(wall_ms, 3), cpu_ms=round(cpu_ms, 3), **fields)
+
+
+def timed(name: str):
+    """Decorador que mede cada chamada da função como a etapa ``name``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
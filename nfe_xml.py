@@ -0,0 +1,226 @@
+"""
+Leitura direta do XML da NF-e (``nfeProc`` ou ``NFe``), sem passar pelo PDF.
+
+O XML é lido em streaming com ``iterparse``: os grupos ``ide``, ``emit``,
+``dest``, ``total`` e ``infAdic`` viram os mesmos campos que o extrator
+tira da DANFE, no mesmo formato de texto (CNPJ e CEP como a DANFE imprime,
+data em DD/MM/AAAA, moeda com vírgula), e cada item ``det`` é convertido e
+descartado assim que termina, então notas com milhares de itens não ficam
+inteiras na memória.
+"""
+import os
+import xml.etree.ElementTree as ET
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from utils import format_cnpj, format_currency
+
+NFE_NAMESPACE = 'http://www.portalfiscal.inf.br/nfe'
+
+# Bytes read from the start of a file by is_nfe_xml's callers
+HEAD_SIZE = 1024
+
+XMLSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# Groups whose leaf values are kept, by tag; det items are read separately
+GROUPS = frozenset(('ide', 'emit', 'enderEmit', 'dest', 'enderDest', 'ICMSTot', 'infAdic', 'infProt'))
+
+_NS = f'{{{NFE_NAMESPACE}}}'
+
+
+def _local(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def is_nfe_xml(head: bytes) -> bool:
+    """
+    Indica se o começo de um arquivo parece o XML de uma NF-e.
+
+    Serve para descartar, sem ler o arquivo todo, XMLs de outros documentos
+    (CT-e, MDF-e, eventos) que chegam junto com as notas.
+
+    Args:
+        head (bytes): Primeiros bytes do arquivo (``HEAD_SIZE`` basta)
+
+    Returns:
+        bool: True se houver o namespace da NF-e
+    """
+    head = head.removeprefix(b'\xef\xbb\xbf').lstrip()
+    return head.startswith(b'<') and NFE_NAMESPACE.encode() in head
+
+
+def _stream(source: XMLSource) -> Union[str, BinaryIO]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    if hasattr(source, 'read'):
+        return source
+    return os.fspath(source)
+
+
+def _danfe_cnpj(digits: str) -> str:
+    # The DANFE prints the CNPJ with a leading zero (006.626.253/0001-51); keep records from both sources alike
+    return f"0{format_cnpj(digits)}"
+
+
+def _cpf(digits: str) -> str:
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+
+def _cep(digits: str) -> str:
+    digits = digits.zfill(8)
+    return f"{digits[:2]}.{digits[2:5]}-{digits[5:]}"
+
+
+def _date(value: str) -> str:
+    # dhEmi (AAAA-MM-DDThh:mm:ss-03:00) or dEmi (AAAA-MM-DD) of older layouts
+    return date.fromisoformat(value[:10]).strftime('%d/%m/%Y')
+
+
+def _currency(value: Optional[str]) -> str:
+    try:
+        return format_currency(Decimal(value)) if value else ''
+    except InvalidOperation:
+        return ''
+
+
+def _quantity(value: Optional[str]) -> str:
+    # qCom has four decimals in the XML; the DANFE prints whole quantities without them
+    try:
+        quantity = Decimal(value)
+    except (InvalidOperation, TypeError):
+        return ''
+    if quantity == quantity.to_integral_value():
+        return str(int(quantity))
+    return f"{quantity.normalize():f}".replace('.', ',')
+
+
+def _address(group: Dict[str, str]) -> str:
+    parts = [group.get('xLgr'), group.get('nro'), group.get('xCpl')]
+    return ', '.join(part for part in parts if part)
+
+
+def _party(values: Dict[str, Dict[str, str]], group: str, prefix: str) -> Dict[str, str]:
+    party = values.get(group, {})
+    address = values.get(f"ender{group.capitalize()}", {})
+    if party.get('CNPJ'):
+        document = _danfe_cnpj(party['CNPJ'])
+    elif party.get('CPF'):
+        document = _cpf(party['CPF'])
+    else:
+        document = None
+
+    return {
+        f'{prefix}_nome': party.get('xNome'),
+        f'{prefix}_endereco': _address(address),
+        f'{prefix}_bairro': address.get('xBairro'),
+        f'{prefix}_municipio': address.get('xMun'),
+        f'{prefix}_uf': address.get('UF'),
+        f'{prefix}_cep': _cep(address['CEP']) if address.get('CEP') else None,
+        f'{prefix}_cnpj': document,
+        f'{prefix}_ie': party.get('IE'),
+    }
+
+
+def _product(det: ET.Element) -> Dict[str, str]:
+    prod = det.find(f'{_NS}prod')
+    if prod is None:
+        return {}
+
+    def text(name: str) -> str:
+        return (prod.findtext(f'{_NS}{name}') or '').strip()
+
+    # ICMS is one of ICMS00, ICMS10, ..., ICMSSN102...: origin plus CST or CSOSN, as printed on the DANFE
+    cst = ''
+    icms = det.find(f'{_NS}imposto/{_NS}ICMS')
+    if icms is not None and len(icms):
+        group = icms[0]
+        code = group.findtext(f'{_NS}CST') or group.findtext(f'{_NS}CSOSN') or ''
+        cst = f"{group.findtext(f'{_NS}orig') or ''}{code}"
+
+    return {
+        'codigo': text('cProd'),
+        'descricao': text('xProd'),
+        'ncm': text('NCM'),
+        'cst': cst,
+        'cfop': text('CFOP'),
+        'unidade': text('uCom'),
+        'quantidade': _quantity(text('qCom')),
+        'valor_unitario': _currency(text('vUnCom')),
+        'valor_total': _currency(text('vProd')),
+    }
+
+
+def parse_nfe_xml(source: XMLSource, include_products: bool = True) -> Dict[str, Any]:
+    """
+    Lê o XML de uma NF-e.
+
+    Args:
+        source (XMLSource): Caminho do XML ou seu conteúdo em memória
+            (bytes, bytearray, memoryview ou stream binário)
+        include_products (bool): Converte os itens ``det`` em ``produtos``;
+            sem eles os itens são só descartados
+
+    Returns:
+        Dict[str, Any]: Campos no formato do dicionário do extrator, sem
+        ``brand`` e ``loja``; campos ausentes no XML ficam 'N/A'
+
+    Raises:
+        ValueError: Se o arquivo não for o XML de uma NF-e
+    """
+    values: Dict[str, Dict[str, str]] = {}
+    products: List[Dict[str, str]] = []
+    path: List[str] = []
+    chave = None
+    root_tag = None
+
+    try:
+        for event, element in ET.iterparse(_stream(source), events=('start', 'end')):
+            tag = _local(element.tag)
+            if event == 'start':
+                if root_tag is None:
+                    root_tag = element.tag
+                    if not root_tag.startswith(_NS):
+                        raise ValueError("O arquivo não é o XML de uma NF-e")
+                if tag == 'infNFe' and element.get('Id'):
+                    # Id="NFe" followed by the 44 digits of the key
+                    chave = element.get('Id')[-44:]
+                path.append(tag)
+                continue
+
+            path.pop()
+            parent = path[-1] if path else None
+            if tag == 'det':
+                if include_products:
+                    products.append(_product(element))
+                # Done with the item: drop its subtree so memory stays flat
+                element.clear()
+            elif parent in GROUPS and 'det' not in path and element.text and element.text.strip():
+                values.setdefault(parent, {})[tag] = element.text.strip()
+    except ET.ParseError as e:
+        raise ValueError(f"XML inválido: {e}") from e
+
+    ide = values.get('ide', {})
+    if root_tag is None or not (chave or ide.get('nNF')):
+        raise ValueError("O arquivo não é o XML de uma NF-e")
+
+    emission = ide.get('dhEmi') or ide.get('dEmi')
+    data = {
+        'numero_nfe': ide.get('nNF'),
+        'serie': ide.get('serie'),
+        'chave_acesso': chave or values.get('infProt', {}).get('chNFe'),
+        'data_emissao': _date(emission) if emission else None,
+        'valor_total': _currency(values.get('ICMSTot', {}).get('vNF')),
+        'natureza_operacao': ide.get('natOp'),
+        'informacoes_complementares': values.get('infAdic', {}).get('infCpl'),
+    }
+    data.update(_party(values, 'emit', 'remetente'))
+    data.update(_party(values, 'dest', 'destinatario'))
+
+    data = {name: value if value else 'N/A' for name, value in data.items()}
+    if data['informacoes_complementares'] == 'N/A':
+        del data['informacoes_complementares']
+    if include_products:
+        data['produtos'] = products
+    return data
@@ -0,0 +1,190 @@
+"""
+Perfilamento opcional (cProfile) da extração e da geração das capas.
+
+Desligado por padrão. Liga com variáveis de ambiente ou pelo app:
+
+    DANFE_PROFILE=1            liga o perfilamento
+    DANFE_PROFILE_EVERY=20     perfila um a cada 20 documentos (padrão: 1)
+    DANFE_PROFILE_DIR=perfis   pasta dos arquivos (padrão: ~/.cache/gerador_capa/profiles)
+    DANFE_PROFILE_TOP=30       funções no resumo (padrão: 25)
+
+Cada documento amostrado gera ``<nome>.<etapa>.prof`` (abre com pstats ou
+snakeviz) e ``<nome>.<etapa>.txt``, com as funções mais pesadas, onde
+``<nome>`` vem do arquivo de entrada (com as páginas da nota, como em
+``lote.p3-5``, nos PDFs com várias DANFEs).
+"""
+import cProfile
+import functools
+import hashlib
+import inspect
+import io
+import os
+import pstats
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from metrics import record_error
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'gerador_capa', 'profiles')
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'sim', 'on')
+
+
+class Profiler:
+    """Configuração e amostragem do perfilamento neste processo."""
+
+    def __init__(self):
+        self.enabled = _env_flag('DANFE_PROFILE')
+        self.every = max(1, int(os.environ.get('DANFE_PROFILE_EVERY', '1')))
+        self.output_dir = os.environ.get('DANFE_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+        self.top = int(os.environ.get('DANFE_PROFILE_TOP', '25'))
+
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._active = threading.local()
+
+    def configure(self, enabled: Optional[bool] = None, every: Optional[int] = None,
+                  output_dir: Optional[str] = None, top: Optional[int] = None) -> None:
+        """Muda a configuração em tempo de execução (por exemplo, pelo app)."""
+        if enabled is not None:
+            self.enabled = enabled
+        if every is not None:
+            self.every = max(1, every)
+        if output_dir is not None:
+            self.output_dir = output_dir
+        if top is not None:
+            self.top = top
+
+    def sample(self, stage: str) -> bool:
+        """Diz se esta chamada de ``stage`` deve ser perfilada (uma a cada ``every``)."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            count = self._counts.get(stage, 0)
+            self._counts[stage] = count + 1
+        return count % self.every == 0
+
+    def task_settings(self, stage: str) -> Dict[str, Any]:
+        """
+        Configuração a aplicar num worker para uma tarefa.
+
+        A amostragem é decidida aqui, no processo que distribui as tarefas,
+        para que "um a cada N" valha para o lote inteiro e não por worker.
+        """
+        return {
+            'enabled': self.sample(stage), 'every': 1,
+            'output_dir': self.output_dir, 'top': self.top,
+        }
+
+    def run(self, stage: str, name: str, func, /, *args, **kwargs):
+        """Executa ``func`` sob o cProfile e grava o perfil e o resumo."""
+        # Positional-only: the profiled method may take a ``name`` of its own
+        if getattr(self._active, 'running', False):
+            # Nested profiled call: the outer profile already covers it
+            return func(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this process (e.g. a debugger)
+            return func(*args, **kwargs)
+
+        self._active.running = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._active.running = False
+            try:
+                self._save(profile, stage, name)
+            except OSError as e:
+                record_error('perfil', e)
+
+    def _save(self, profile: cProfile.Profile, stage: str, name: str) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{name}.{stage}")
+        profile.dump_stats(f"{base}.prof")
+
+        summary = io.StringIO()
+        summary.write(f"{name} - {stage}\n\n")
+        stats = pstats.Stats(profile, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        with open(f"{base}.txt", 'w', encoding='utf-8') as handle:
+            handle.write(summary.getvalue())
+
+
+# Settings of this process; workers receive theirs with each task
+profiler = Profiler()
+
+
+def _source_name(source: Any) -> str:
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.splitext(os.path.basename(source))[0]
+    name = getattr(source, 'name', None)
+    if isinstance(name, str):
+        return os.path.splitext(os.path.basename(name))[0]
+    if hasattr(source, 'getbuffer'):
+        source = source.getbuffer()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"pdf-{hashlib.sha256(source).hexdigest()[:12]}"
+    return 'documento'
+
+
+def document_name(source: Any, pages: Optional[range] = None, name: Optional[str] = None, **_) -> str:
+    """
+    Nome usado nos arquivos de perfil de um PDF ou XML.
+
+    Args:
+        source: Caminho do arquivo ou seu conteúdo em memória
+        pages (Optional[range]): Páginas da nota, num PDF com várias DANFEs
+        name (Optional[str]): Nome original do arquivo (o do upload, no app)
+
+    Returns:
+        str: ``name`` ou o nome do arquivo, sem extensão, seguido das páginas
+        da nota (``lote.p3-5``); sem nome, os primeiros dígitos do SHA-256
+        do conteúdo
+    """
+    base = os.path.splitext(os.path.basename(name))[0] if name else _source_name(source)
+    if pages is not None:
+        # One profile per note of a bundle instead of each overwriting the last
+        base = f"{base}.p{pages.start + 1}-{pages.stop}"
+    return base
+
+
+def cover_name(data: Dict[str, Any], **_) -> str:
+    """Nome dos perfis de uma capa: o PDF de origem e a NF-e, ou a NF-e e a loja."""
+    note = re.sub(r'[^\w.-]', '_', f"NF{data.get('numero_nfe', 'S_N')}")
+    filename = data.get('filename')
+    if filename:
+        # The notes split from one bundle share its filename
+        return f"{os.path.splitext(os.path.basename(str(filename)))[0]}.{note}"
+    return re.sub(r'[^\w.-]', '_', f"{note}_Loja{data.get('loja', 'S_N')}")
+
+
+def profiled(stage: str, name_of):
+    """
+    Decorador de método: perfila as chamadas amostradas.
+
+    Args:
+        stage (str): Nome da etapa, usado na amostragem e nos arquivos
+        name_of: Função que recebe o primeiro argumento da chamada (o PDF ou
+            os dados da nota), mais os demais por nome, e devolve o nome do
+            documento
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, subject, *args, **kwargs):
+            if not profiler.sample(stage):
+                return method(self, subject, *args, **kwargs)
+            # Only bound for sampled calls: the name can depend on the pages or the upload name
+            arguments = dict(list(signature.bind(self, subject, *args, **kwargs).arguments.items())[2:])
+            name = name_of(subject, **arguments)
+            return profiler.run(stage, name, method, self, subject, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,32 +1,90 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Flowable
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
 from io import BytesIO
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
+
+from metrics import record_error, registry, stage
+from profiling import cover_name, profiled
+from utils import cover_sort_key
+
+PAGE_SIZE = (A4[1], A4[0])  # Landscape orientation
+MARGIN = 1.5*cm
+FRAME_WIDTH = PAGE_SIZE[0] - 2*MARGIN
+PAGE_CENTER = PAGE_SIZE[0] / 2
+
+# Geometry of the platypus layout, reproduced by the fast renderer. x positions
+# follow from the centred tables (25 cm main block, 8 + 6 + 8 cm bottom row);
+# baselines were measured on the platypus output.
+MAIN_X = MARGIN + (FRAME_WIDTH - 25*cm) / 2
+MAIN_WIDTH = 25*cm
+MAIN_TOP = 450.409
+MAIN_LEADING = 24
+BOTTOM_X = MARGIN + (FRAME_WIDTH - 22*cm) / 2
+BOTTOM_BOX = (68.063, 148.063)
+BOTTOM_LABEL_Y = 115.063
+BOTTOM_VALUE_Y = 81.063
+FRAGIL_Y = 83.063
+STORE_Y = 498.756
+CELL_PADDING = 6
+
+# Main block lines drawn by the fast renderer; None marks the static labels.
+DESTINATARIO_LINES = 5
+REMETENTE_FIRST_LINE = 9
+
+
+class _OutlineEntry(Flowable):
+    """Marca a página atual no sumário (bookmarks) do PDF, sem ocupar espaço."""
+    
+    def __init__(self, title: str, key: str, level: int = 0):
+        super().__init__()
+        self.title = title
+        self.key = key
+        self.level = level
+        self.width = self.height = 0
+    
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=self.level)
+
 
 class ReceiptGenerator:
     
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
+    # Built on first use and shared by every instance
+    _shared_styles = None
+    
+    def __init__(self, fast: bool = False):
+        """
+        Args:
+            fast (bool): Desenha a capa direto no canvas, com a parte fixa
+                (rótulos, quadros, FRÁGIL, SUPORTE TECNICO) num form XObject
+                reaproveitado em todas as páginas. Capas cujo texto não cabe
+                numa linha voltam para o leiaute do platypus
+        """
+        if ReceiptGenerator._shared_styles is None:
+            ReceiptGenerator._shared_styles = self._setup_custom_styles(getSampleStyleSheet())
+        self.styles = ReceiptGenerator._shared_styles
+        self.fast = fast
     
-    def _setup_custom_styles(self):
-        self.styles.add(ParagraphStyle(
+    def _setup_custom_styles(self, styles):
+        styles.add(ParagraphStyle(
             name='CustomTitle',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=16,
             spaceAfter=20,
             alignment=TA_CENTER,
             textColor=colors.black
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='SectionHeader',
-            parent=self.styles['Heading2'],
+            parent=styles['Heading2'],
             fontSize=12,
             spaceBefore=15,
             spaceAfter=8,
@@ -35,9 +93,9 @@ class ReceiptGenerator:
         ))
         
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomNormal',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=20,
             # Adicione a linha abaixo
             leading=24, 
@@ -46,49 +104,244 @@ class ReceiptGenerator:
         ))
         
 
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='Signature',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=20,
             alignment=TA_CENTER,
             spaceBefore=20
         ))
+        
+        return styles
     
+    @profiled('capa_pdf', cover_name)
     def generate_receipt(self, data: Dict[str, Any]) -> Optional[BytesIO]:
+        if self.fast and self._fits_fast_layout(data):
+            return self._render_fast([data])
+        
         try:
             buffer = BytesIO()
             
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=(A4[1], A4[0]),  # Landscape orientation
-                rightMargin=1.5*cm,
-                leftMargin=1.5*cm,
-                topMargin=1.5*cm,
-                bottomMargin=1.5*cm
-            )
+            doc = self._create_document(buffer)
             
             
-            story = []
+            story = self._create_cover(data)
             
             
-            story.extend(self._create_store_header(data))
+            with stage('capa.pdf.render', modo='platypus'):
+                doc.build(story)
+            registry.observe('capa.pdf.bytes', buffer.tell())
             
+            buffer.seek(0)
+            return buffer
             
-            story.extend(self._create_main_info_section(data))
+        except Exception as e:
+            record_error('capa.pdf', e)
+            return None
+    
+    def generate_batch(self, records: Iterable[Dict[str, Any]], group_by_loja: bool = True) -> Optional[BytesIO]:
+        """
+        Gera as capas de várias notas num único PDF, uma por página.
+        
+        O documento é montado de uma vez só, com fontes e recursos
+        compartilhados entre as páginas, e ganha um marcador por NF-e.
+        
+        Args:
+            records: Dados de cada nota, como em ``generate_receipt``
+            group_by_loja (bool): Ordena as capas por loja e NF-e e agrupa os
+                marcadores por loja, para imprimir tudo de uma vez na doca
             
+        Returns:
+            Optional[BytesIO]: PDF com todas as capas, ou None em caso de erro
+        """
+        try:
+            records = list(records)
+            if not records:
+                return None
+            if group_by_loja:
+                records.sort(key=cover_sort_key)
+            
+            if self.fast and all(self._fits_fast_layout(data) for data in records):
+                return self._render_fast(records, group_by_loja)
             
-            story.extend(self._create_bottom_section(data))
+            buffer = BytesIO()
+            doc = self._create_document(buffer)
             
+            story = []
+            current_loja = None
+            for i, data in enumerate(records):
+                loja = data.get('loja', 'N/A')
+                nf_number = data.get('numero_nfe', 'N/A')
+                
+                if i:
+                    story.append(PageBreak())
+                if group_by_loja:
+                    if loja != current_loja:
+                        story.append(_OutlineEntry(f"Loja {loja}", f"loja-{i}"))
+                        current_loja = loja
+                    story.append(_OutlineEntry(f"NF-e {nf_number}", f"capa-{i}", level=1))
+                else:
+                    story.append(_OutlineEntry(f"NF-e {nf_number} - Loja {loja}", f"capa-{i}"))
+                
+                story.extend(self._create_cover(data))
             
-            doc.build(story)
+            with stage('capa.pdf.lote.render', modo='platypus', capas=len(records)):
+                doc.build(story)
+            registry.observe('capa.pdf.lote.bytes', buffer.tell())
             
             buffer.seek(0)
             return buffer
             
         except Exception as e:
-            print(f"Erro ao gerar PDF: {str(e)}")
+            record_error('capa.pdf', e)
             return None
     
+    def _create_document(self, buffer: BytesIO) -> SimpleDocTemplate:
+        return SimpleDocTemplate(
+            buffer,
+            pagesize=PAGE_SIZE,
+            rightMargin=MARGIN,
+            leftMargin=MARGIN,
+            topMargin=MARGIN,
+            bottomMargin=MARGIN
+        )
+    
+    def _main_lines(self, data: Dict[str, Any]) -> List[str]:
+        """Linhas variáveis do bloco principal, na ordem em que aparecem."""
+        return [
+            data.get('destinatario_nome', 'N/A'),
+            f"{data.get('destinatario_endereco', 'N/A')} - {data.get('destinatario_bairro', 'N/A')}",
+            f"{data.get('destinatario_municipio', 'N/A')} – {data.get('destinatario_uf', 'N/A')} – CEP.: {data.get('destinatario_cep', 'N/A')}",
+            f"CNPJ: {data.get('destinatario_cnpj', 'N/A')} – I.E: {data.get('destinatario_ie', 'N/A')}",
+            data.get('remetente_nome', 'N/A'),
+            f"{data.get('remetente_endereco', 'N/A')} - {data.get('remetente_bairro', 'N/A')} - {data.get('remetente_municipio', 'N/A')} – {data.get('remetente_uf', 'N/A')}",
+            f"CEP: {data.get('remetente_cep', 'N/A')} CNPJ: {data.get('remetente_cnpj', 'N/A')} – I.E.: {data.get('remetente_ie', 'N/A')}",
+        ]
+    
+    def _fits_fast_layout(self, data: Dict[str, Any]) -> bool:
+        """Verifica se nenhum texto quebraria linha, o que mudaria o leiaute do platypus."""
+        if any(stringWidth(str(line), 'Helvetica', 20) > MAIN_WIDTH for line in self._main_lines(data)):
+            return False
+        
+        box_width = 8*cm - 2*CELL_PADDING
+        nf_width = stringWidth('Nº ', 'Helvetica', 20) + stringWidth(str(data.get('numero_nfe', 'N/A')), 'Helvetica-Bold', 24)
+        volume_width = stringWidth('«Nº» ', 'Helvetica', 20) + stringWidth(str(data.get('volume_number', '1/1')), 'Helvetica-Bold', 24)
+        store_width = stringWidth(f"LOJA {data.get('loja', 'N/A')}", 'Helvetica-Bold', 48)
+        return nf_width <= box_width and volume_width <= box_width and store_width <= FRAME_WIDTH - 2*CELL_PADDING
+    
+    def _render_fast(self, records: List[Dict[str, Any]], group_by_loja: bool = False) -> Optional[BytesIO]:
+        """Desenha as capas direto no canvas, reutilizando a parte fixa como form XObject."""
+        metric = 'capa.pdf' if len(records) == 1 else 'capa.pdf.lote'
+        try:
+            buffer = BytesIO()
+            canv = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+            
+            with stage(f'{metric}.render', modo='rapido', capas=len(records)):
+                canv.beginForm('capa_estatica')
+                self._draw_static_parts(canv)
+                canv.endForm()
+                
+                current_loja = None
+                for i, data in enumerate(records):
+                    loja = data.get('loja', 'N/A')
+                    nf_number = data.get('numero_nfe', 'N/A')
+                    
+                    if len(records) > 1:
+                        canv.bookmarkPage(f"capa-{i}")
+                        if group_by_loja:
+                            if loja != current_loja:
+                                canv.addOutlineEntry(f"Loja {loja}", f"capa-{i}", level=0)
+                                current_loja = loja
+                            canv.addOutlineEntry(f"NF-e {nf_number}", f"capa-{i}", level=1)
+                        else:
+                            canv.addOutlineEntry(f"NF-e {nf_number} - Loja {loja}", f"capa-{i}", level=0)
+                    
+                    canv.doForm('capa_estatica')
+                    self._draw_variable_parts(canv, data)
+                    canv.showPage()
+            
+            with stage(f'{metric}.salvar'):
+                canv.save()
+            registry.observe(f'{metric}.bytes', buffer.tell())
+            buffer.seek(0)
+            return buffer
+            
+        except Exception as e:
+            record_error('capa.pdf', e)
+            return None
+    
+    def _draw_static_parts(self, canv: canvas.Canvas) -> None:
+        # Platypus paints text in RGB, not the canvas' default gray
+        canv.setFillColorRGB(0, 0, 0)
+        canv.setFont('Helvetica', 20)
+        canv.drawString(MAIN_X, MAIN_TOP, "DESTINATÁRIO:")
+        canv.drawString(MAIN_X, MAIN_TOP - (REMETENTE_FIRST_LINE - 1) * MAIN_LEADING, "REMETENTE:")
+        
+        canv.setFillColor(colors.red)
+        canv.setFont('Helvetica-Bold', 20)
+        canv.drawString(MAIN_X, MAIN_TOP - (DESTINATARIO_LINES + 1) * MAIN_LEADING, "SUPORTE TECNICO")
+        canv.setFont('Helvetica-Bold', 36)
+        canv.drawCentredString(PAGE_CENTER, FRAGIL_Y, "FRÁGIL")
+        
+        canv.setFillColorRGB(0, 0, 0)
+        canv.setFont('Helvetica', 20)
+        canv.drawString(BOTTOM_X + CELL_PADDING, BOTTOM_LABEL_Y, "SOB NOTA FISCAL")
+        canv.drawString(BOTTOM_X + 14*cm + CELL_PADDING, BOTTOM_LABEL_Y, "Nº DE VOLUME")
+        
+        # Same stroke as the table GRID: 1pt, round caps
+        canv.setStrokeColor(colors.black)
+        canv.setLineWidth(1)
+        canv.setLineCap(1)
+        bottom, top = BOTTOM_BOX
+        for x0 in (BOTTOM_X, BOTTOM_X + 14*cm):
+            x1 = x0 + 8*cm
+            canv.lines([(x0, top, x1, top), (x0, bottom, x1, bottom), (x0, bottom, x0, top), (x1, bottom, x1, top)])
+    
+    def _draw_variable_parts(self, canv: canvas.Canvas, data: Dict[str, Any]) -> None:
+        canv.setFillColor(colors.red)
+        canv.setFont('Helvetica-Bold', 48)
+        canv.drawCentredString(PAGE_CENTER, STORE_Y, f"LOJA {data.get('loja', 'N/A')}")
+        
+        # Label and value share one text object, as in the platypus paragraph, so
+        # viewers advance past the label with the same font widths
+        volume = canv.beginText(BOTTOM_X + 14*cm + CELL_PADDING, BOTTOM_VALUE_Y)
+        volume.setFont('Helvetica', 20)
+        volume.textOut("«Nº» ")
+        volume.setFont('Helvetica-Bold', 24)
+        volume.textOut(str(data.get('volume_number', '1/1')))
+        canv.drawText(volume)
+        
+        canv.setFillColorRGB(0, 0, 0)
+        nf = canv.beginText(BOTTOM_X + CELL_PADDING, BOTTOM_VALUE_Y)
+        nf.setFont('Helvetica', 20)
+        nf.textOut("Nº ")
+        nf.setFillColor(colors.blue)
+        nf.setFont('Helvetica-Bold', 24)
+        nf.textOut(str(data.get('numero_nfe', 'N/A')))
+        canv.drawText(nf)
+        
+        canv.setFillColorRGB(0, 0, 0)
+        canv.setFont('Helvetica', 20)
+        lines = self._main_lines(data)
+        for i, line in enumerate(lines[:DESTINATARIO_LINES - 1], start=1):
+            canv.drawString(MAIN_X, MAIN_TOP - i * MAIN_LEADING, str(line))
+        for i, line in enumerate(lines[DESTINATARIO_LINES - 1:], start=REMETENTE_FIRST_LINE):
+            canv.drawString(MAIN_X, MAIN_TOP - i * MAIN_LEADING, str(line))
+    
+    def _create_cover(self, data: Dict[str, Any]) -> List:
+        story = []
+        
+        
+        story.extend(self._create_store_header(data))
+        
+        
+        story.extend(self._create_main_info_section(data))
+        
+        
+        story.extend(self._create_bottom_section(data))
+        
+        return story
+    
     def _create_store_header(self, data: Dict[str, Any]) -> list:
     
         story = []
@@ -0,0 +1,147 @@
+"""
+Motores de extração de texto usados pelo DANFEExtractor.
+
+Todos entregam o mesmo formato: o texto de cada página como ``str``, uma
+página de cada vez. Os extratores de campos trabalham sobre esse texto sem
+saber qual motor o produziu.
+"""
+import pdfplumber
+import pypdfium2
+from io import BytesIO
+from typing import Any, Iterator
+
+from metrics import stage
+
+DEFAULT_ENGINE = 'pdfplumber'
+
+
+def _as_file(source: Any) -> Any:
+    """Envolve conteúdos em memória num stream; caminhos e streams passam direto."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    return source
+
+
+class TextDocument:
+    """PDF aberto por um motor de texto."""
+
+    engine = ''
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def iter_page_texts(self) -> Iterator[str]:
+        """Extrai o texto das páginas sob demanda, uma de cada vez."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self) -> 'TextDocument':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PdfplumberDocument(TextDocument):
+    """Texto com layout do pdfminer; expõe ``pdf`` para a leitura por quadros."""
+
+    engine = 'pdfplumber'
+
+    def __init__(self, source: Any):
+        self.pdf = pdfplumber.open(_as_file(source))
+
+    def __len__(self) -> int:
+        return len(self.pdf.pages)
+
+    def iter_pages(self) -> Iterator[pdfplumber.page.Page]:
+        """Percorre as páginas, uma de cada vez."""
+        for page in self.pdf.pages:
+            yield page
+            # Drop the page's parsed layout objects before moving to the next one
+            page.close()
+
+    def iter_page_texts(self) -> Iterator[str]:
+        for page in self.iter_pages():
+            with stage('texto.pagina', motor=self.engine):
+                page_text = page.extract_text() or ""
+            yield page_text
+
+    def close(self) -> None:
+        self.pdf.close()
+
+
+class PdfiumDocument(TextDocument):
+    """Texto nativo do PDFium: bem mais rápido, mas sem posição dos caracteres."""
+
+    engine = 'pypdfium2'
+
+    def __init__(self, source: Any):
+        self.pdf = pypdfium2.PdfDocument(_as_file(source))
+
+    def __len__(self) -> int:
+        return len(self.pdf)
+
+    def iter_page_texts(self) -> Iterator[str]:
+        for page in self.pdf:
+            with stage('texto.pagina', motor=self.engine):
+                text_page = page.get_textpage()
+                page_text = text_page.get_text_range()
+                text_page.close()
+                page.close()
+            # PDFium ends lines with CRLF
+            yield page_text.replace('\r\n', '\n')
+
+    def close(self) -> None:
+        self.pdf.close()
+
+
+def copy_pages(source: Any, pages: range) -> bytes:
+    """
+    Copia páginas de um PDF para um PDF novo, em memória.
+
+    Feito pelo PDFium, custa menos de 1 ms mesmo num PDF de centenas de
+    páginas, enquanto abrir o PDF inteiro no pdfplumber percorre todas elas.
+
+    Args:
+        source: Caminho do PDF ou seu conteúdo em memória
+        pages (range): Índices (a partir de 0) das páginas
+
+    Returns:
+        bytes: O PDF só com essas páginas
+    """
+    original = pypdfium2.PdfDocument(_as_file(source))
+    copy = pypdfium2.PdfDocument.new()
+    try:
+        copy.import_pages(original, list(pages))
+        buffer = BytesIO()
+        copy.save(buffer)
+        return buffer.getvalue()
+    finally:
+        copy.close()
+        original.close()
+
+
+ENGINES = {
+    PdfplumberDocument.engine: PdfplumberDocument,
+    PdfiumDocument.engine: PdfiumDocument,
+}
+
+
+def open_document(source: Any, engine: str = DEFAULT_ENGINE) -> TextDocument:
+    """
+    Abre um PDF com o motor de texto pedido.
+
+    Args:
+        source: Caminho do PDF ou seu conteúdo em memória
+        engine (str): Nome do motor (chave de ``ENGINES``)
+
+    Returns:
+        TextDocument: Documento aberto, para usar com ``with``
+    """
+    try:
+        document_class = ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Motor de texto desconhecido: {engine}")
+    return document_class(source)
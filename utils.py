@@ -1,5 +1,7 @@
 import re
-from typing import Optional
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional
 
 def clean_text(text: str) -> str:
     if not text:
@@ -11,10 +13,7 @@ def clean_text(text: str) -> str:
     
     return text.strip()
 
-def parse_currency(value: str) -> str:
-    if not value:
-        return "0,00"
-    
+def _normalize_number(value: str) -> str:
     # Remove any non-numeric characters except dots and commas
     cleaned = re.sub(r'[^\d.,]', '', str(value))
     
@@ -38,6 +37,14 @@ def parse_currency(value: str) -> str:
         else:
             cleaned = cleaned.replace(',', '')
     
+    return cleaned
+
+def parse_currency(value: str) -> str:
+    if not value:
+        return "0,00"
+    
+    cleaned = _normalize_number(value)
+    
     try:
         # Convert to float and back to ensure valid number
         float_value = float(cleaned)
@@ -92,6 +99,54 @@ def parse_date(date_str: str) -> str:
     
     return date_str
 
+def currency_to_decimal(value: str) -> Optional[Decimal]:
+    """
+    Converte um valor monetário em texto para Decimal.
+    
+    Args:
+        value (str): Valor no formato brasileiro (1.234,56) ou americano (1,234.56)
+        
+    Returns:
+        Optional[Decimal]: Valor exato, ou None se o texto não for um número
+    """
+    if not value:
+        return None
+    
+    try:
+        return Decimal(_normalize_number(value))
+    except InvalidOperation:
+        return None
+
+def format_currency(value: Decimal) -> str:
+    """
+    Formata um valor como moeda brasileira, como ``parse_currency``.
+    
+    Args:
+        value (Decimal): Valor
+        
+    Returns:
+        str: Valor com duas casas, ponto nos milhares e vírgula decimal
+    """
+    return f"{value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+def date_from_text(value: str) -> Optional[date]:
+    """
+    Converte uma data em texto para ``date``.
+    
+    Args:
+        value (str): Data em qualquer formato aceito por ``parse_date``
+        
+    Returns:
+        Optional[date]: Data, ou None se o texto não for uma data válida
+    """
+    if not value:
+        return None
+    
+    try:
+        return datetime.strptime(parse_date(value), '%d/%m/%Y').date()
+    except ValueError:
+        return None
+
 def extract_numeric_value(text: str) -> Optional[float]:
     """
     Extrai valor numérico de uma string.
@@ -157,3 +212,99 @@ def validate_access_key(key: str) -> bool:
     # Remove spaces and check if it's 44 digits
     clean_key = re.sub(r'\s', '', key)
     return len(clean_key) == 44 and clean_key.isdigit()
+
+# Códigos IBGE das UFs, usados nos dois primeiros dígitos da chave de acesso
+UF_CODES = {
+    '11': 'RO', '12': 'AC', '13': 'AM', '14': 'RR', '15': 'PA', '16': 'AP', '17': 'TO',
+    '21': 'MA', '22': 'PI', '23': 'CE', '24': 'RN', '25': 'PB', '26': 'PE', '27': 'AL',
+    '28': 'SE', '29': 'BA', '31': 'MG', '32': 'ES', '33': 'RJ', '35': 'SP', '41': 'PR',
+    '42': 'SC', '43': 'RS', '50': 'MS', '51': 'MT', '52': 'GO', '53': 'DF',
+}
+
+def format_cnpj(digits: str) -> str:
+    """
+    Formata um CNPJ no padrão XX.XXX.XXX/XXXX-XX.
+    
+    Args:
+        digits (str): CNPJ com ou sem pontuação
+        
+    Returns:
+        str: CNPJ formatado
+    """
+    digits = re.sub(r'\D', '', digits or '')[-14:].zfill(14)
+    return f"{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}"
+
+def access_key_check_digit(key: str) -> str:
+    """
+    Calcula o dígito verificador (módulo 11) da chave de acesso.
+    
+    Args:
+        key (str): Os 43 primeiros dígitos da chave
+        
+    Returns:
+        str: Dígito verificador
+    """
+    total = 0
+    weight = 2
+    for digit in reversed(key):
+        total += int(digit) * weight
+        weight = 2 if weight == 9 else weight + 1
+    
+    rest = total % 11
+    return '0' if rest < 2 else str(11 - rest)
+
+def decode_access_key(key: str) -> Optional[Dict[str, str]]:
+    """
+    Decodifica a chave de acesso da NF-e, conferindo o dígito verificador.
+    
+    Args:
+        key (str): Chave de acesso, com ou sem espaços
+        
+    Returns:
+        Optional[Dict[str, str]]: UF, ano/mês de emissão, CNPJ do emitente,
+        modelo, série e número da nota, ou None se a chave for inválida
+    """
+    if not validate_access_key(key):
+        return None
+    
+    clean_key = re.sub(r'\s', '', key)
+    if access_key_check_digit(clean_key[:43]) != clean_key[43]:
+        return None
+    
+    uf = UF_CODES.get(clean_key[:2])
+    month = int(clean_key[4:6])
+    if not uf or not 1 <= month <= 12:
+        return None
+    
+    return {
+        'chave': clean_key,
+        'uf_codigo': clean_key[:2],
+        'uf': uf,
+        'ano': f"20{clean_key[2:4]}",
+        'mes': clean_key[4:6],
+        'cnpj': format_cnpj(clean_key[6:20]),
+        'modelo': clean_key[20:22],
+        'serie': str(int(clean_key[22:25])),
+        'numero': str(int(clean_key[25:34])),
+        'tipo_emissao': clean_key[34],
+        'codigo_numerico': clean_key[35:43],
+        'digito': clean_key[43],
+    }
+
+def cover_sort_key(data: Dict) -> tuple:
+    """
+    Chave de ordenação das capas de um lote: por loja e depois por NF-e.
+    
+    Args:
+        data (Dict): Dados extraídos da nota
+        
+    Returns:
+        tuple: Chave para ``sorted``; notas sem loja vão para o fim
+    """
+    loja = str(data.get('loja', 'N/A'))
+    nf_number = str(data.get('numero_nfe', ''))
+    # Numbers sort numerically
+    return (
+        not loja.isdigit(), int(loja) if loja.isdigit() else 0, loja,
+        int(nf_number) if nf_number.isdigit() else 0, nf_number,
+    )